@@ -1,8 +1,19 @@
 import os
+import atexit
 import csv
+import gzip
+import hashlib
+import io
+import itertools
 import json
 import re
+import shutil
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import pyodbc
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import openpyxl
@@ -12,17 +23,32 @@ try:
 except Exception:
     COLOR_INDEX = None
 import calendar
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request
 from flask_cors import CORS
 from datetime import datetime, date, timedelta
 from dotenv import load_dotenv
 from decimal import Decimal
+from collections import OrderedDict
+from functools import lru_cache
+from contextlib import contextmanager
 try:
     import win32com.client as win32
     import pythoncom
 except Exception:
     win32 = None
     pythoncom = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 # Load .env
 load_dotenv()
@@ -38,6 +64,40 @@ if os.path.exists(SETTINGS_PATH):
     except Exception as e:
         print(f"[CONFIG] Warning: Could not load settings.json: {e}")
 
+# Plant registry: settings.json "plants.sites" maps a plant name to its data
+# directory ("dir", laid out like this repo) and overrides for the
+# dataSources/behavior/windows/database sections. The server keeps a
+# PlantContext per plant; the plant's compute worker is started with PVS_PLANT
+# set and runs this module with that plant's settings overlaid (as does a
+# script run with PVS_PLANT set).
+_PLANTS = SETTINGS.get('plants', {}) if isinstance(SETTINGS, dict) else {}
+PVS_PLANT_SITES = _PLANTS.get('sites') or {}
+PVS_PLANT = os.getenv('PVS_PLANT', '').strip()
+PVS_PLANT_DIR = None
+
+
+def _plant_settings(name: str) -> tuple[dict, str]:
+    """settings.json with plant ``name``'s overrides applied, and the plant's data directory."""
+    site = PVS_PLANT_SITES.get(name)
+    if not isinstance(site, dict):
+        raise RuntimeError(f"unknown plant '{name}' (settings.json plants.sites)")
+    settings = {
+        **SETTINGS,
+        **{
+            section: {**(SETTINGS.get(section) or {}), **(site.get(section) or {})}
+            for section in ('dataSources', 'behavior', 'windows', 'database')
+        },
+    }
+    plant_dir = site.get('dir') or os.path.dirname(__file__)
+    if not os.path.isabs(plant_dir):
+        plant_dir = os.path.join(os.path.dirname(__file__), plant_dir)
+    return settings, plant_dir
+
+
+if PVS_PLANT:
+    SETTINGS, PVS_PLANT_DIR = _plant_settings(PVS_PLANT)
+    print(f"[CONFIG] Plant {PVS_PLANT}: data directory {PVS_PLANT_DIR}")
+
 app = Flask(__name__)
 CORS(app)
 app.config['TEMPLATES_AUTO_RELOAD'] = True
@@ -51,13 +111,15 @@ DB_CONFIG = {
     'username': os.getenv('DB_USERNAME', 'PowerBI'),
     'password': os.getenv('DB_PASSWORD', 'P0werB1'),
 }
+if PVS_PLANT:
+    DB_CONFIG.update({k: v for k, v in (SETTINGS.get('database') or {}).items() if k in ('server', 'database') and v})
 
 # Server config
 FLASK_HOST = os.getenv('FLASK_HOST', '0.0.0.0')
 PVS_PORT = int(os.getenv('PVS_PORT', '5051'))
 
 # PVS config
-_BASE_DIR = os.path.dirname(__file__)
+_BASE_DIR = PVS_PLANT_DIR or os.path.dirname(__file__)
 _planned_default = os.path.join('PVS', 'Planned_qtys.xlsx')
 _map_default = os.path.join('PVS', 'ProdLine_Project_Map.csv')
 
@@ -109,6 +171,19 @@ if PVS_LTP_FORMULAS_XLSX and not os.path.isabs(PVS_LTP_FORMULAS_XLSX):
     PVS_LTP_FORMULAS_XLSX = os.path.join(_BASE_DIR, PVS_LTP_FORMULAS_XLSX)
 PVS_LTP_FORMULAS_SHEET = _DATA_SOURCES.get('ltpFormulasSheetName', 'LTP_Formulas')
 
+PVS_MASTER_LIST_CSV = _DATA_SOURCES.get('masterListCsv', os.path.join('PVS', 'master_list.csv'))
+if PVS_MASTER_LIST_CSV and not os.path.isabs(PVS_MASTER_LIST_CSV):
+    PVS_MASTER_LIST_CSV = os.path.join(_BASE_DIR, PVS_MASTER_LIST_CSV)
+
+PVS_HISTORY_DIR = _DATA_SOURCES.get('historyDir', os.path.join('PVS', 'History'))
+if PVS_HISTORY_DIR and not os.path.isabs(PVS_HISTORY_DIR):
+    PVS_HISTORY_DIR = os.path.join(_BASE_DIR, PVS_HISTORY_DIR)
+
+# Directory of the published snapshot.json; point leader and followers at the same share
+PVS_SNAPSHOT_DIR = (None if PVS_PLANT else os.getenv('PVS_SNAPSHOT_DIR')) or _DATA_SOURCES.get('snapshotDir', 'PVS')
+if PVS_SNAPSHOT_DIR and not os.path.isabs(PVS_SNAPSHOT_DIR):
+    PVS_SNAPSHOT_DIR = os.path.join(_BASE_DIR, PVS_SNAPSHOT_DIR)
+
 # Monthly OLK workbook (for monthly OLK targets by prod line)
 PVS_OLK_XLSX = _DATA_SOURCES.get(
     'monthlyOlkExcel',
@@ -129,6 +204,20 @@ PVS_LTP_WORKDAYS_PER_WEEK = int(_BEHAVIOR.get('ltpWorkdaysPerWeek', 5) or 5)
 PVS_SHOW_WEEKEND_ON_MONDAY = bool(_BEHAVIOR.get('showWeekendDataOnMonday', True))
 PVS_REGENERATE_INPUTS = bool(_BEHAVIOR.get('regenerateInputsOnCompute', True))
 PVS_EXPORT_LTP_REF_EXTRACT = bool(_BEHAVIOR.get('exportLtpRefExtractOnCompute', True))
+PVS_EXPORT_PAGE_CSVS = bool(_BEHAVIOR.get('exportPageCsvsOnCompute', True))
+PVS_HISTORY_ENABLED = bool(_BEHAVIOR.get('historyEnabled', True))
+PVS_KEEP_GENERATIONS = max(int(_BEHAVIOR.get('keepGenerations', 5) or 5), 2)
+PVS_PROJECTION_RUN_RATE_DAYS = max(int(_BEHAVIOR.get('projectionRunRateDays', 5) or 5), 1)
+_WINDOWS = SETTINGS.get('windows', {}) if isinstance(SETTINGS, dict) else {}
+PVS_FISCAL_YEAR_START_MONTH = min(max(int(_WINDOWS.get('fiscalYearStartMonth', 10) or 10), 1), 12)
+WINDOW_TYPES = ('rolling', 'week', 'qtd', 'ytd')
+PVS_WINDOW_DEFS: dict[str, dict] = {}
+for _name, _spec in (_WINDOWS.get('definitions') or {}).items():
+    _type = str((_spec or {}).get('type', '')).strip().lower() if isinstance(_spec, dict) else ''
+    if _type not in WINDOW_TYPES or (_type == 'rolling' and int(_spec.get('days', 0) or 0) < 1):
+        print(f"[CONFIG] Warning: Ignoring window '{_name}': {_spec}")
+        continue
+    PVS_WINDOW_DEFS[str(_name)] = {**_spec, 'type': _type}
 PVS_LTP_REF_EXTRACT_CSV = _DATA_SOURCES.get('ltpRefExtractCsv', os.path.join('PVS', 'Debug', 'LTP_ref_extract.csv'))
 if PVS_LTP_REF_EXTRACT_CSV and not os.path.isabs(PVS_LTP_REF_EXTRACT_CSV):
     PVS_LTP_REF_EXTRACT_CSV = os.path.join(_BASE_DIR, PVS_LTP_REF_EXTRACT_CSV)
@@ -140,6 +229,20 @@ PVS_PROD_TR_TYPES = [
     for t in (_BEHAVIOR.get('productionTrTypes') or ['RCT-WO'])
     if str(t).strip()
 ]
+PVS_PRODUCTION_PROBE = bool(_BEHAVIOR.get('productionChangeProbe', True))
+PVS_PIPELINE_WORKERS = max(int(_BEHAVIOR.get('pipelineWorkers', 4) or 4), 1)
+PVS_COMPUTE_WORKER = bool(_BEHAVIOR.get('computeWorker', True))
+PVS_WORKER_TIMEOUT_S = float(_BEHAVIOR.get('workerTimeoutSeconds', 600) or 600)
+PVS_WORKER_MAX_RSS_MB = float(_BEHAVIOR.get('workerMaxRssMb', 1536) or 0)
+PVS_WORKER_MAX_RUNS = max(int(_BEHAVIOR.get('workerMaxRuns', 50) or 50), 1)
+PVS_WARM_START = bool(_BEHAVIOR.get('warmStart', True))
+# 'standalone' (default), 'leader' (also refreshes on a timer for followers) or
+# 'follower' (serves the leader's published snapshot, never runs the pipeline)
+PVS_ROLE = str(os.getenv('PVS_ROLE') or _BEHAVIOR.get('role') or 'standalone').strip().lower()
+PVS_LEADER_REFRESH_S = float(_BEHAVIOR.get('leaderRefreshSeconds', 300) or 300)
+PVS_FOLLOWER_POLL_S = float(_BEHAVIOR.get('followerPollSeconds', 5) or 0)
+# A probe result younger than this is reused instead of querying tr_hist again (0 = probe every run)
+PVS_PROBE_MAX_AGE_S = float(_BEHAVIOR.get('productionProbeMaxAgeSeconds', PVS_LEADER_REFRESH_S) or 0)
 
 SEW_NAME_OVERRIDES = {
     'BJA',
@@ -166,6 +269,66 @@ GROUP_OVERRIDES = {
 }
 
 
+class ReferenceRegistry:
+    """Process-wide cache of parsed reference files.
+
+    ref.csv, master_list.csv, ProdLine_Project_Map.csv and the OLK sources
+    are parsed once into their lookup structures and reloaded only when the
+    file's mtime or size changes. Entries are keyed by (kind, path) so
+    several structures derived from one file are cached independently.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries: dict[tuple[str, str], tuple[tuple[int, int] | None, object]] = {}
+
+    @staticmethod
+    def fingerprint(path: str) -> tuple[int, int] | None:
+        try:
+            st = os.stat(path)
+        except (OSError, TypeError, ValueError):
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def get(self, kind: str, path: str, loader):
+        key = (kind, os.path.abspath(path) if path else '')
+        fp = self.fingerprint(path) if path else None
+        hit = self._entries.get(key)
+        if hit is not None and hit[0] == fp:
+            return hit[1]
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None and hit[0] == fp:
+                return hit[1]
+            value = loader(path)
+            self._entries[key] = (fp, value)
+            return value
+
+    def derive(self, kind: str, paths, builder):
+        """Cache ``builder()`` until any of ``paths`` changes on disk."""
+        paths = tuple(paths)
+        key = (kind, '|'.join(os.path.abspath(p) if p else '' for p in paths))
+        fp = tuple(self.fingerprint(p) if p else None for p in paths)
+        hit = self._entries.get(key)
+        if hit is not None and hit[0] == fp:
+            return hit[1]
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None and hit[0] == fp:
+                return hit[1]
+            value = builder()
+            self._entries[key] = (fp, value)
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+REFERENCE = ReferenceRegistry()
+
+
+@lru_cache(maxsize=16384)
 def norm_code(code: str) -> str:
     s = (code or '')
     s = s.replace('\xa0', ' ')
@@ -178,6 +341,10 @@ def norm_code(code: str) -> str:
 
 def load_map_csv(path: str) -> dict[str, str]:
     """Return dict: {prod_line_code -> project_name} with uppercase codes."""
+    return REFERENCE.get('prodline_map', path, _read_map_csv)
+
+
+def _read_map_csv(path: str) -> dict[str, str]:
     mapping: dict[str, str] = {}
     if not os.path.exists(path):
         return mapping
@@ -198,6 +365,10 @@ def load_olk_csv(path: str) -> dict[str, float]:
                  <page_num>,<label>,<qty>
     Labels are dashboard display names (e.g. BJA, CDPO - SEW, Volvo - ASSY).
     """
+    return REFERENCE.get('olk_csv', path, _read_olk_csv)
+
+
+def _read_olk_csv(path: str) -> dict[str, float]:
     data: dict[str, float] = {}
     if not path or not os.path.exists(path):
         print(f"[OLK] OLK CSV not found: {path}")
@@ -236,6 +407,10 @@ def load_monthly_olk(path: str) -> dict[str, float]:
     Reads the "Monthly OLK" sheet and uses columns "Row Labels" (prod line
     codes such as B_FG, Q_FG, etc.) and "Sum of Monthly OLK" for the qty.
     """
+    return REFERENCE.get('olk_xlsx', path, _read_monthly_olk)
+
+
+def _read_monthly_olk(path: str) -> dict[str, float]:
     data: dict[str, float] = {}
     if not path or not os.path.exists(path):
         print(f"[OLK] Monthly OLK workbook not found: {path}")
@@ -332,6 +507,94 @@ def _get_tr_hist_columns(conn) -> set[str]:
     return cols
 
 
+def _tr_type_filter(tr_types) -> tuple[str, list[str]]:
+    """WHERE fragment and parameters comparing the stored tr_type with ``tr_types`` as given (index-friendly)."""
+    types = [str(t) for t in tr_types if str(t)]
+    return f"tr.tr_type IN ({','.join('?' for _ in types)})", types
+
+
+def _read_production_sql_tr_types(sql_path: str) -> list[str]:
+    """tr_type values PVS-Production.sql filters on (``tr.[tr_type] = ''rct-wo''`` or an IN list)."""
+    try:
+        with open(sql_path, 'r', encoding='utf-8-sig') as f:
+            text = f.read()
+    except (OSError, TypeError):
+        return []
+    out: list[str] = []
+    for m in re.finditer(r"tr_type\]?\s*(?:=|IN\s*\()([^)\n]*)", text, re.IGNORECASE):
+        for value in re.findall(r"'+([^']+)'+", m.group(1)):
+            if value not in out:
+                out.append(value)
+    return out
+
+
+def _production_sql_tr_types() -> list[str]:
+    return REFERENCE.get('production_sql_tr_types', PVS_PROD_SQL_PATH, _read_production_sql_tr_types)
+
+
+# (start, end, tr_types) -> (monotonic time, result) of recent successful probes
+_PROBE_RESULTS: dict[tuple, tuple[float, list[str | None]]] = {}
+_PROBE_LOCK = threading.Lock()
+
+
+def _production_probe(start_d: date, end_d: date, tr_types) -> list[str | None] | None:
+    """Cheap change signal for the production receipts of ``tr_types`` in ``start_d..end_d``.
+
+    Returns [COUNT, MAX(tr_trnbr), MAX(tr_effdate)] over the receipt rows,
+    or None when probing is disabled or fails, in which case callers run
+    the full query. Callers pass the tr_type literals of the query the
+    probe gates. They are compared with the stored column as given
+    (``tr.tr_type IN (...)``, no functions on the column), so SQL Server
+    can seek an index on tr_type/tr_effdate instead of scanning the month;
+    the comparison follows the column's collation like the gated query's.
+    A result younger than PVS_PROBE_MAX_AGE_S is returned without a query.
+    """
+    if not PVS_PRODUCTION_PROBE:
+        return None
+    if not tr_types:
+        print("[DB] WARNING: No tr_type known for the gated production query; not probing")
+        return None
+    key = (start_d, end_d, tuple(tr_types))
+    with _PROBE_LOCK:
+        hit = _PROBE_RESULTS.get(key)
+    if hit is not None and time.monotonic() - hit[0] < PVS_PROBE_MAX_AGE_S:
+        return hit[1]
+    result = _query_production_probe(start_d, end_d, tr_types)
+    if result is not None:
+        now = time.monotonic()
+        with _PROBE_LOCK:
+            for old in [k for k, (t, _) in _PROBE_RESULTS.items() if now - t >= PVS_PROBE_MAX_AGE_S]:
+                del _PROBE_RESULTS[old]
+            _PROBE_RESULTS[key] = (now, result)
+    return result
+
+
+def _query_production_probe(start_d: date, end_d: date, tr_types) -> list[str | None] | None:
+    conn = None
+    try:
+        conn = get_db_connection()
+        trnbr = 'MAX(tr.tr_trnbr)' if 'tr_trnbr' in _get_tr_hist_columns(conn) else 'NULL'
+        type_sql, type_params = _tr_type_filter(tr_types)
+        sql = (
+            f"SELECT COUNT(*), {trnbr}, MAX(tr.tr_effdate) "
+            "FROM dbo.tr_hist tr "
+            f"WHERE {type_sql} "
+            "AND tr.tr_effdate >= ? AND tr.tr_effdate < DATEADD(day, 1, ?) "
+            "AND tr.tr_qty_loc > 0"
+        )
+        cur = conn.cursor()
+        cur.execute(sql, *type_params, start_d, end_d)
+        row = cur.fetchone()
+        cur.close()
+        return [None if v is None else str(v) for v in row]
+    except Exception as e:
+        print(f"[DB] WARNING: Production change probe failed: {e}")
+        return None
+    finally:
+        if conn is not None:
+            conn.close()
+
+
 def _parse_date_ddmmyyyy(s: str) -> date | None:
     s = s.strip()
     if not s:
@@ -411,32 +674,272 @@ def _split_sql_batches(sql_text: str) -> list[str]:
     return batches
 
 
-def _run_production_sql_and_overwrite_csvs(sql_path: str) -> bool:
+PAGE_KINDS = ('PROJECT', 'SEW', 'ASSY')
+# History name of the legacy (non-page) path's production, kept per prod-line code
+LEGACY_HISTORY_KIND = 'LINES'
+PAGE_CSV_NAMES = {'PROJECT': '1_PVS_per_Project.csv', 'SEW': '2_PVS_per_SEW.csv', 'ASSY': '3_PVS_per_ASSY.csv'}
+# Page series are published as immutable generations: each export writes a fresh
+# PVS/_generations/<id>/ directory (binary series store plus optional CSVs) and
+# then swaps the CURRENT pointer file, so readers always see one complete set of
+# files without taking a lock. Exports run in the web process, the compute
+# worker and the scripts, so publish and prune hold an OS file lock; ids sort
+# by start time and CURRENT never moves to an older id. The tracked CSVs under
+# PVS/Production and PVS/Planned are only read before the first publish.
+PVS_GENERATIONS_DIR = os.path.join(_BASE_DIR, 'PVS', '_generations')
+PVS_GENERATION_POINTER = os.path.join(PVS_GENERATIONS_DIR, 'CURRENT')
+PVS_GENERATION_LOCK = os.path.join(PVS_GENERATIONS_DIR, '.lock')
+# Marker of a generation still being written; prune leaves it alone unless stale
+_GENERATION_WRITING = '.writing'
+_GENERATION_STALE_S = 3600
+PAGE_CSV_DIRS = ('Production', 'Planned/Day', 'Planned/Week', 'Planned/Month')
+_PAGE_STORE_LOCK = threading.Lock()
+# Per-process sequence in generation ids; next() on a count is atomic across threads
+_GENERATION_SEQ = itertools.count(1)
+# Longest wait for a cross-process file lock before giving up with TimeoutError
+_FILE_LOCK_TIMEOUT_S = 300
+
+
+def _current_generation_dir(generations_dir: str = PVS_GENERATIONS_DIR) -> str | None:
+    """Directory of the published page-store generation, or None before the first publish."""
+    try:
+        with open(os.path.join(generations_dir, 'CURRENT'), 'r', encoding='utf-8') as f:
+            gen_id = f.read().strip()
+    except OSError:
+        return None
+    gen_dir = os.path.join(generations_dir, gen_id) if gen_id else ''
+    return gen_dir if gen_dir and os.path.isdir(gen_dir) else None
+
+
+def _page_store_root() -> str:
+    """Root that holds series/, Production/ and Planned/ for readers: the current generation or legacy PVS/."""
+    return _current_generation_dir() or os.path.join(_BASE_DIR, 'PVS')
+
+
+@contextmanager
+def _file_lock(path: str, timeout_s: float = _FILE_LOCK_TIMEOUT_S):
+    """Exclusive lock on ``path`` that also holds across processes.
+
+    Raises TimeoutError when another holder keeps it for ``timeout_s``.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    deadline = time.monotonic() + timeout_s
+    with open(path, 'a+b') as f:
+        if msvcrt is not None:
+            while True:
+                f.seek(0)
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ~10s; keep waiting until the deadline
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f"could not lock {path} within {timeout_s:.0f}s")
+        elif fcntl is not None:
+            while True:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f"could not lock {path} within {timeout_s:.0f}s")
+                    time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            elif fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _new_generation_dir() -> str:
+    gen_id = f"{datetime.now():%Y%m%dT%H%M%S%f}-{os.getpid()}-{next(_GENERATION_SEQ):04d}"
+    gen_dir = os.path.join(PVS_GENERATIONS_DIR, gen_id)
+    os.makedirs(gen_dir)
+    open(os.path.join(gen_dir, _GENERATION_WRITING), 'wb').close()
+    return gen_dir
+
+
+def _publish_generation(gen_dir: str) -> bool:
+    """Point CURRENT at ``gen_dir`` with an atomic temp-file replace, then prune old generations.
+
+    A generation older than the published one (a slower exporter that
+    started earlier) is discarded instead; returns False in that case.
+    """
+    gen_id = os.path.basename(gen_dir)
+    with _file_lock(PVS_GENERATION_LOCK):
+        current = _current_generation_dir()
+        if current and os.path.basename(current) > gen_id:
+            print(f"[PVS] Generation {gen_id} is older than published {os.path.basename(current)}; discarding")
+            shutil.rmtree(gen_dir, ignore_errors=True)
+            return False
+        try:
+            os.remove(os.path.join(gen_dir, _GENERATION_WRITING))
+        except OSError:
+            pass
+        tmp = f"{PVS_GENERATION_POINTER}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(gen_id)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, PVS_GENERATION_POINTER)
+        print(f"[PVS] Published generation {gen_id}")
+        _prune_generations(gen_dir)
+    return True
+
+
+def content_hash(content: str | bytes) -> str:
+    """SHA-256 of rendered output; equal hashes mean byte-identical files."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+
+_OUTPUT_HASHES: dict[str, tuple[tuple[int, int] | None, str]] = {}
+
+
+def _file_content_hash(path: str) -> str | None:
+    """Hash of the file at ``path``, re-read only when its mtime/size changed."""
+    fp = ReferenceRegistry.fingerprint(path)
+    if fp is None:
+        return None
+    key = os.path.abspath(path)
+    hit = _OUTPUT_HASHES.get(key)
+    if hit is not None and hit[0] == fp:
+        return hit[1]
+    with open(path, 'rb') as f:
+        digest = content_hash(f.read())
+    _OUTPUT_HASHES[key] = (fp, digest)
+    return digest
+
+
+def write_if_changed(path: str, content: str, fsync: bool = False) -> bool:
+    """Write ``content`` to ``path`` unless the file already holds exactly that content.
+
+    The file is replaced atomically, so readers see either the old or the
+    new content, never a partial write. Returns True when it was (re)written.
+    """
+    digest = content_hash(content)
+    if _file_content_hash(path) == digest:
+        return False
+    out_dir = os.path.dirname(path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(content.encode('utf-8'))
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        for attempt in range(3):
+            try:
+                os.replace(tmp, path)
+                break
+            except PermissionError:
+                # Windows refuses to replace a file a reader has open; it is only held briefly.
+                if attempt == 2:
+                    raise
+                time.sleep(0.05)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    _OUTPUT_HASHES[os.path.abspath(path)] = (ReferenceRegistry.fingerprint(path), digest)
+    return True
+
+
+def _generation_manifest(gen_dir: str | None) -> dict[str, object]:
+    """``{'generation', 'content_hash', 'files': {relpath: sha256}}`` of a published generation."""
+    if not gen_dir:
+        return {}
+    try:
+        with open(os.path.join(gen_dir, 'manifest.json'), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def page_store_version(generations_dir: str = PVS_GENERATIONS_DIR) -> dict[str, object]:
+    """Cheap change signal for downstream consumers: current generation id and its content hash."""
+    manifest = _generation_manifest(_current_generation_dir(generations_dir))
+    return {
+        'generation': manifest.get('generation'),
+        'content_hash': manifest.get('content_hash'),
+    }
+
+
+def report_version() -> dict[str, object]:
+    """page_store_version() plus the report date a run today would produce.
+
+    Scripts record it after a run and compare it before the next one: while
+    it is unchanged, nothing has published new page data for the same
+    report date, so the full compute can be skipped.
+    """
+    return {'date': _report_dates(date.today())[0].isoformat(), **page_store_version()}
+
+
+def _prune_generations(current_dir: str):
+    """Remove generations older than the newest kept ones (caller holds the generation lock).
+
+    Only ids before ``current_dir`` are candidates, and one still being
+    written by another process is skipped until its marker goes stale.
+    """
+    try:
+        names = sorted(
+            n for n in os.listdir(PVS_GENERATIONS_DIR)
+            if os.path.isdir(os.path.join(PVS_GENERATIONS_DIR, n))
+        )
+    except OSError:
+        return
+    current = os.path.basename(current_dir)
+    now = time.time()
+    for name in names[:-PVS_KEEP_GENERATIONS]:
+        if name >= current:
+            continue
+        path = os.path.join(PVS_GENERATIONS_DIR, name)
+        try:
+            marker_age = now - os.path.getmtime(os.path.join(path, _GENERATION_WRITING))
+        except OSError:
+            marker_age = None
+        if marker_age is not None and marker_age < _GENERATION_STALE_S:
+            continue
+        failed: list[str] = []
+        shutil.rmtree(path, onerror=lambda _fn, p, _exc: failed.append(p))
+        if failed:
+            print(f"[PVS] WARNING: Could not remove {len(failed)} path(s) of old generation {name}: {failed[0]}")
+
+
+def _run_production_sql(sql_path: str) -> dict[str, list[tuple[str, list[float]]]] | None:
+    """Run the production pivot SQL and return its result sets as page rows.
+
+    Each page (PROJECT, SEW, ASSY) maps to ``[(label, per-day values), ...]``
+    in master-list order with extras appended, values rounded to 2 decimals
+    exactly as the production CSVs store them. Returns None on failure.
+    """
     if not sql_path or not os.path.exists(sql_path):
         print(f"[SQL] Production SQL not found: {sql_path}")
-        return False
+        return None
 
     try:
         with open(sql_path, 'r', encoding='utf-8-sig') as f:
             sql_text = f.read()
     except Exception as e:
         print(f"[SQL] ERROR reading production SQL: {e}")
-        return False
+        return None
 
     batches = _split_sql_batches(sql_text)
     if not batches:
         print("[SQL] No executable SQL batches found")
-        return False
+        return None
 
-    prod_dir = os.path.join(_BASE_DIR, 'PVS', 'Production')
-    os.makedirs(prod_dir, exist_ok=True)
-    out_paths = [
-        os.path.join(prod_dir, '1_PVS_per_Project.csv'),
-        os.path.join(prod_dir, '2_PVS_per_SEW.csv'),
-        os.path.join(prod_dir, '3_PVS_per_ASSY.csv'),
-    ]
-    master = _load_master_list(os.path.join(_BASE_DIR, 'PVS', 'master_list.csv'))
-    master_by_rs = [master.get('PROJECT') or [], master.get('SEW') or [], master.get('ASSY') or []]
+    master = _load_master_list(PVS_MASTER_LIST_CSV)
+    master_by_rs = [master.get(kind) or [] for kind in PAGE_KINDS]
+    pages: dict[str, list[tuple[str, list[float]]]] = {}
 
     conn = None
     try:
@@ -461,47 +964,42 @@ def _run_production_sql_and_overwrite_csvs(sql_path: str) -> bool:
         while True:
             cols = [c[0] for c in (cur.description or [])]
             rows = cur.fetchall() if cols else []
-            if cols and rs_idx < len(out_paths):
-                out_path = out_paths[rs_idx]
+            if cols and rs_idx < len(PAGE_KINDS):
                 day_count = max(len(cols) - 1, 0)
-                by_norm: dict[str, tuple[str, list[str]]] = {}
+                by_norm: dict[int, tuple[str, list[float]]] = {}
                 for r in rows:
                     label = str(r[0] or '').strip()
                     if not label:
                         continue
-                    vals: list[str] = []
+                    vals: list[float] = []
                     for v in r[1:]:
                         try:
-                            vals.append(f"{float(v or 0):.2f}")
+                            vals.append(round(float(v or 0), 2))
                         except Exception:
-                            vals.append("0.00")
+                            vals.append(0.0)
                     if len(vals) < day_count:
-                        vals.extend(["0.00"] * (day_count - len(vals)))
-                    by_norm[_norm_key(label)] = (label, vals)
+                        vals.extend([0.0] * (day_count - len(vals)))
+                    by_norm[LABELS.norm_id(label)] = (label, vals)
 
-                padded: list[tuple[str, list[str]]] = []
+                padded: list[tuple[str, list[float]]] = []
                 canon = master_by_rs[rs_idx] if rs_idx < len(master_by_rs) else []
                 if canon:
+                    canon_ids = LABELS.norm_ids(canon)
                     for c in canon:
-                        k = _norm_key(c)
+                        k = LABELS.norm_id(c)
                         if k in by_norm:
                             padded.append(by_norm[k])
                         else:
-                            padded.append((c, ["0.00"] * day_count))
+                            padded.append((c, [0.0] * day_count))
                     # append extras at end
                     for k, (lbl, vals) in by_norm.items():
-                        if k not in {_norm_key(c) for c in canon}:
+                        if k not in canon_ids:
                             padded.append((lbl, vals))
                 else:
                     padded = [v for v in by_norm.values()]
 
-                with open(out_path, 'w', newline='', encoding='utf-8') as f:
-                    for lbl, vals in padded:
-                        if not lbl:
-                            continue
-                        f.write(','.join([lbl] + vals) + "\n")
-                    f.write("\n")
-                print(f"[SQL] Wrote {out_path} ({len(padded)} rows)")
+                pages[PAGE_KINDS[rs_idx]] = [(lbl, vals) for lbl, vals in padded if lbl]
+                print(f"[SQL] Fetched {PAGE_KINDS[rs_idx]} production ({len(padded)} rows)")
                 rs_idx += 1
 
             try:
@@ -518,10 +1016,10 @@ def _run_production_sql_and_overwrite_csvs(sql_path: str) -> bool:
             pass
         if rs_idx < 3:
             print(f"[SQL] WARNING: expected 3 result sets, got {rs_idx}")
-        return rs_idx >= 1
+        return pages if rs_idx >= 1 else None
     except Exception as e:
         print(f"[SQL] ERROR executing production SQL: {e}")
-        return False
+        return None
     finally:
         try:
             if conn is not None:
@@ -530,6 +1028,14 @@ def _run_production_sql_and_overwrite_csvs(sql_path: str) -> bool:
             pass
 
 
+def _render_production_csv(rows: list[tuple[str, list[float]]]) -> str:
+    with io.StringIO() as f:
+        for lbl, vals in rows:
+            f.write(','.join([lbl] + [f"{v:.2f}" for v in vals]) + "\n")
+        f.write("\n")
+        return f.getvalue()
+
+
 def _export_ltp_ref_extract_csv(
     out_path: str,
     directory: str,
@@ -674,19 +1180,13 @@ def _export_ltp_ref_extract_csv(
             if k not in row_lookup:
                 row_lookup[k] = row_idx
 
-        meta_rows: list[dict[str, str]] = []
-        with open(ref_csv, 'r', newline='', encoding='utf-8-sig') as f:
-            rdr = csv.DictReader(f)
-            for r in rdr:
-                meta_rows.append({k: (str(v or '').strip()) for k, v in (r or {}).items()})
-
-        out_dir = os.path.dirname(out_path)
-        if out_dir:
-            os.makedirs(out_dir, exist_ok=True)
+        meta_rows: list[dict[str, str]] = [
+            {k: (str(v or '').strip()) for k, v in r.items()} for r in _ref_csv_rows(ref_csv)
+        ]
 
         base_headers = ['PROJECT', 'SEW', 'ASSY', 'Production Line', 'Model', 'SEW/ASSY', 'Project_Key']
         date_headers_out = [d.isoformat() for _, d in date_cols]
-        with open(out_path, 'w', newline='', encoding='utf-8') as f:
+        with io.StringIO() as f:
             f.write(','.join(base_headers + date_headers_out) + "\n")
             written = 0
             missing = 0
@@ -722,13 +1222,17 @@ def _export_ltp_ref_extract_csv(
                             out_row.append('0')
                 f.write(','.join(out_row) + "\n")
                 written += 1
+            content = f.getvalue()
 
+        changed = write_if_changed(out_path, content)
         if missing:
             print(f"[LTP-EXTRACT] Missing mappings ({missing}):")
             for k in missing_keys:
                 print(f"  - {k}")
-        else:
+        elif changed:
             print(f"[LTP-EXTRACT] Wrote {out_path} ({written} ref rows, 0 missing mappings)")
+        else:
+            print(f"[LTP-EXTRACT] {out_path} unchanged ({written} ref rows)")
         return True
     finally:
         try:
@@ -1068,12 +1572,216 @@ def load_planned_from_ltp_formulas_xlsx(path: str, sheet_name: str = 'LTP_Formul
     return planned
 
 
-def _ltp_looks_weekly(planned: dict[str, dict[date, int]]) -> bool:
-    all_dates: list[date] = []
-    for v in planned.values():
-        if not v:
-            continue
-        all_dates.extend(list(v.keys()))
+class SeriesMatrix:
+    """Dense label x day container for plan/production series.
+
+    ``values[i, j]`` holds the quantity of ``labels[i]`` on ``start + j days``.
+    All page series (plan and production) use float64; integer plan
+    quantities are represented exactly.
+    """
+
+    __slots__ = ('labels', 'index', 'start', 'values')
+
+    def __init__(self, labels: list[str], start: date, values: np.ndarray):
+        self.labels = list(labels)
+        self.index = {lbl: i for i, lbl in enumerate(self.labels)}
+        self.start = start
+        self.values = values
+
+    @classmethod
+    def empty(cls, start: date, end: date | None = None) -> 'SeriesMatrix':
+        n_days = (end - start).days + 1 if end is not None and end >= start else 0
+        return cls([], start, np.zeros((0, n_days), dtype=np.float64))
+
+    @classmethod
+    def from_dict(
+        cls,
+        series: dict[str, dict[date, float]],
+        start: date | None = None,
+        end: date | None = None,
+    ) -> 'SeriesMatrix':
+        all_dates = [d for per_day in (series or {}).values() for d in (per_day or {})]
+        if start is None:
+            start = min(all_dates) if all_dates else date.today()
+        if end is None:
+            end = max(all_dates) if all_dates else start
+        labels = list((series or {}).keys())
+        n_days = max((end - start).days + 1, 0)
+        values = np.zeros((len(labels), n_days), dtype=np.float64)
+        for i, lbl in enumerate(labels):
+            for d, v in (series.get(lbl) or {}).items():
+                j = (d - start).days
+                if 0 <= j < n_days:
+                    values[i, j] += float(v or 0)
+        return cls(labels, start, values)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def __contains__(self, label: object) -> bool:
+        return label in self.index
+
+    @property
+    def n_days(self) -> int:
+        return int(self.values.shape[1])
+
+    @property
+    def end(self) -> date:
+        return self.start + timedelta(days=self.n_days - 1)
+
+    def dates(self) -> list[date]:
+        return [self.start + timedelta(days=j) for j in range(self.n_days)]
+
+    def active_dates(self) -> list[date]:
+        """Dates on which at least one label has a non-zero value."""
+        cols = np.flatnonzero(np.any(self.values != 0, axis=0)) if len(self) else []
+        return [self.start + timedelta(days=int(j)) for j in cols]
+
+    def row(self, label: str) -> np.ndarray:
+        i = self.index.get(label)
+        if i is None:
+            return np.zeros(self.n_days, dtype=np.float64)
+        return self.values[i]
+
+    def to_dict(self) -> dict[str, dict[date, float]]:
+        out: dict[str, dict[date, float]] = {}
+        for i, lbl in enumerate(self.labels):
+            cols = np.flatnonzero(self.values[i])
+            out[lbl] = {self.start + timedelta(days=int(j)): float(self.values[i, j]) for j in cols}
+        return out
+
+    def reindex(self, start: date, end: date) -> 'SeriesMatrix':
+        """Return the same labels on the calendar ``start..end`` (zero-filled)."""
+        n_days = max((end - start).days + 1, 0)
+        out = np.zeros((len(self.labels), n_days), dtype=np.float64)
+        off = (self.start - start).days
+        src_lo = max(0, -off)
+        src_hi = min(self.n_days, n_days - off)
+        if src_hi > src_lo:
+            out[:, src_lo + off:src_hi + off] = self.values[:, src_lo:src_hi]
+        return SeriesMatrix(self.labels, start, out)
+
+    def positions(self, labels: list[str]) -> np.ndarray:
+        """Row index of each label in ``labels`` (-1 where the label is absent)."""
+        return np.fromiter((self.index.get(lbl, -1) for lbl in labels), dtype=np.intp, count=len(labels))
+
+    def take(self, labels: list[str]) -> np.ndarray:
+        """Rows for ``labels`` in that order (zeros where a label is absent)."""
+        pos = self.positions(labels)
+        out = np.zeros((len(labels), self.n_days), dtype=np.float64)
+        found = pos >= 0
+        out[found] = self.values[pos[found]]
+        return out
+
+    def merge(self, other: 'SeriesMatrix') -> 'SeriesMatrix':
+        """Element-wise sum over the union of labels and calendars."""
+        if not len(other):
+            return self
+        if not len(self):
+            return other
+        start = min(self.start, other.start)
+        end = max(self.end, other.end)
+        labels = list(self.labels) + [lbl for lbl in other.labels if lbl not in self.index]
+        index = {lbl: i for i, lbl in enumerate(labels)}
+        out = np.zeros((len(labels), (end - start).days + 1), dtype=np.float64)
+        for src in (self, other):
+            off = (src.start - start).days
+            rows = np.fromiter((index[lbl] for lbl in src.labels), dtype=np.intp, count=len(src.labels))
+            out[rows, off:off + src.n_days] += src.values
+        return SeriesMatrix(labels, start, out)
+
+    def scale(self, factors: np.ndarray) -> 'SeriesMatrix':
+        """Apply per-label multipliers, rounding to whole units like the LTP plan."""
+        factors = np.asarray(factors, dtype=np.float64).reshape(-1, 1)
+        return SeriesMatrix(self.labels, self.start, np.round(self.values * factors))
+
+    def canonicalize(self, canonical: list[str]) -> 'SeriesMatrix':
+        """Fold labels onto their canonical spelling and add missing canonical rows."""
+        if not canonical:
+            return self
+        canon_by_norm = {LABELS.norm_id(c): c for c in canonical}
+        labels: list[str] = []
+        index: dict[str, int] = {}
+        targets = np.empty(len(self.labels), dtype=np.intp)
+        for i, lbl in enumerate(self.labels):
+            target = canon_by_norm.get(LABELS.norm_id(lbl)) or str(lbl)
+            if target not in index:
+                index[target] = len(labels)
+                labels.append(target)
+            targets[i] = index[target]
+        for c in canonical:
+            if c not in index:
+                index[c] = len(labels)
+                labels.append(c)
+        out = np.zeros((len(labels), self.n_days), dtype=np.float64)
+        np.add.at(out, targets, self.values)
+        return SeriesMatrix(labels, self.start, out)
+
+    def expand_weekly(self, workdays_per_week: int) -> 'SeriesMatrix':
+        """Spread weekly buckets (keyed on week start) over the first N workdays."""
+        if workdays_per_week <= 0 or not len(self):
+            return self
+        q = np.where(self.values > 0, np.trunc(self.values), 0.0)
+        base = np.floor_divide(q, workdays_per_week)
+        rem = q - base * workdays_per_week
+        out = np.zeros((len(self.labels), self.n_days + workdays_per_week - 1), dtype=np.float64)
+        for i in range(workdays_per_week):
+            out[:, i:i + self.n_days] += base + (rem > i)
+        return SeriesMatrix(self.labels, self.start, out)
+
+
+class WindowSums:
+    """Per-label prefix sums over a SeriesMatrix.
+
+    Built once per series; the sum over any inclusive date window is then a
+    single column subtraction for all labels at once.
+    """
+
+    __slots__ = ('series', 'cum')
+
+    def __init__(self, series: SeriesMatrix):
+        self.series = series
+        self.cum = np.zeros((len(series), series.n_days + 1), dtype=np.float64)
+        np.cumsum(series.values, axis=1, out=self.cum[:, 1:])
+
+    def _bounds(self, start_d: date, end_d: date) -> tuple[int, int]:
+        n = self.series.n_days
+        lo = min(max((start_d - self.series.start).days, 0), n)
+        hi = min(max((end_d - self.series.start).days + 1, lo), n)
+        return lo, hi
+
+    def window(self, start_d: date, end_d: date) -> np.ndarray:
+        lo, hi = self._bounds(start_d, end_d)
+        return self.cum[:, hi] - self.cum[:, lo]
+
+    def windows(self, bounds: list[tuple[date, date]], labels: list[str] | None = None) -> np.ndarray:
+        """Return a (labels x windows) array of sums.
+
+        When ``labels`` is given, rows follow that order and labels missing
+        from the series are zero.
+        """
+        pairs = [self._bounds(s, e) for s, e in bounds]
+        lo = np.array([p[0] for p in pairs], dtype=np.intp)
+        hi = np.array([p[1] for p in pairs], dtype=np.intp)
+        sums = self.cum[:, hi] - self.cum[:, lo]
+        if labels is None:
+            return sums
+        pos = self.series.positions(labels)
+        out = np.zeros((len(labels), len(bounds)), dtype=np.float64)
+        found = pos >= 0
+        out[found] = sums[pos[found]]
+        return out
+
+
+def _ltp_looks_weekly(planned: 'dict[str, dict[date, int]] | SeriesMatrix') -> bool:
+    if isinstance(planned, SeriesMatrix):
+        all_dates = planned.active_dates()
+    else:
+        all_dates = []
+        for v in planned.values():
+            if not v:
+                continue
+            all_dates.extend(list(v.keys()))
 
     uniq = sorted(set(all_dates))
     if len(uniq) < 3:
@@ -1090,33 +1798,8 @@ def _ltp_looks_weekly(planned: dict[str, dict[date, int]]) -> bool:
     return near_week_ratio >= 0.5
 
 
-def _expand_weekly_plan_to_daily(
-    planned_weekly: dict[str, dict[date, int]],
-    workdays_per_week: int,
-) -> dict[str, dict[date, int]]:
-    if workdays_per_week <= 0:
-        return planned_weekly
-
-    expanded: dict[str, dict[date, int]] = {}
-    for code, days in planned_weekly.items():
-        if not days:
-            continue
-        out = expanded.setdefault(code, {})
-        for week_start, qty in days.items():
-            try:
-                q = int(qty or 0)
-            except Exception:
-                q = 0
-            if q <= 0:
-                continue
-            base = q // workdays_per_week
-            rem = q % workdays_per_week
-            for i in range(workdays_per_week):
-                d = week_start + timedelta(days=i)
-                add = base + (1 if i < rem else 0)
-                if add:
-                    out[d] = out.get(d, 0) + add
-    return expanded
+def _expand_weekly_plan_to_daily(planned_weekly: SeriesMatrix, workdays_per_week: int) -> SeriesMatrix:
+    return planned_weekly.expand_weekly(workdays_per_week)
 
 
 def _normalize_ltp_text(value: object) -> str:
@@ -1130,6 +1813,12 @@ def _normalize_ltp_text(value: object) -> str:
 
 
 def _normalize_ltp_key(value: object) -> str:
+    # Coerce before the cached call: 1, 1.0 and True hash alike but render differently.
+    return _normalize_ltp_key_str(str(value or ''))
+
+
+@lru_cache(maxsize=16384)
+def _normalize_ltp_key_str(value: str) -> str:
     return _normalize_ltp_text(value).upper()
 
 
@@ -1216,108 +1905,130 @@ def _infer_type_from_context(ws, row_idx: int) -> str:
     return ''
 
 
+def _ref_csv_rows(path: str) -> list[dict[str, str]]:
+    """Raw ref.csv rows, parsed once per file version and shared by all ref.csv lookups."""
+    return REFERENCE.get('ref_rows', path, _read_ref_csv_rows)
+
+
+def _read_ref_csv_rows(path: str) -> list[dict[str, str]]:
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        return [dict(r) for r in csv.DictReader(f) if r]
+
+
 def _load_ltp_reference(path: str):
+    return REFERENCE.get('ltp_reference', path, _build_ltp_reference)
+
+
+def _build_ltp_reference(path: str):
     ref_triplet: dict[tuple[str, str, str], list[str]] = {}
     ref_pair: dict[tuple[str, str], list[str]] = {}
     if not path or not os.path.exists(path):
         print(f"[LTP] Reference CSV not found: {path}")
         return ref_triplet, ref_pair
 
-    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
-        rdr = csv.DictReader(f)
-        for row in rdr:
-            code = norm_code(row.get('Prod Line') or row.get('prod_line') or row.get('prod line') or '')
-            project = _normalize_ltp_key(
-                row.get('Production Line')
-                or row.get('production line')
-                or row.get('Project')
-                or row.get('project')
-                or ''
-            )
-            model = _normalize_ltp_key(row.get('Model') or row.get('model') or '')
-            row_type = _normalize_ltp_type(row.get('SEW/ASSY') or row.get('sew/assy') or row.get('type') or '')
-            if not code or not project or not model:
-                continue
-            if row_type:
-                key = (project, model, row_type)
-                codes = ref_triplet.setdefault(key, [])
-                if code not in codes:
-                    codes.append(code)
-            pair_codes = ref_pair.setdefault((project, model), [])
-            if code not in pair_codes:
-                pair_codes.append(code)
+    for row in _ref_csv_rows(path):
+        code = norm_code(row.get('Prod Line') or row.get('prod_line') or row.get('prod line') or '')
+        project = _normalize_ltp_key(
+            row.get('Production Line')
+            or row.get('production line')
+            or row.get('Project')
+            or row.get('project')
+            or ''
+        )
+        model = _normalize_ltp_key(row.get('Model') or row.get('model') or '')
+        row_type = _normalize_ltp_type(row.get('SEW/ASSY') or row.get('sew/assy') or row.get('type') or '')
+        if not code or not project or not model:
+            continue
+        if row_type:
+            key = (project, model, row_type)
+            codes = ref_triplet.setdefault(key, [])
+            if code not in codes:
+                codes.append(code)
+        pair_codes = ref_pair.setdefault((project, model), [])
+        if code not in pair_codes:
+            pair_codes.append(code)
     return ref_triplet, ref_pair
 
 
 def _load_ref_meta(path: str) -> dict[str, dict[str, str]]:
+    return REFERENCE.get('ref_meta', path, _build_ref_meta)
+
+
+def _build_ref_meta(path: str) -> dict[str, dict[str, str]]:
     meta: dict[str, dict[str, str]] = {}
     if not path or not os.path.exists(path):
         return meta
 
-    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
-        rdr = csv.DictReader(f)
-        for row in rdr:
-            code = norm_code(row.get('Prod Line') or row.get('prod_line') or row.get('prod line') or '')
-            if not code:
-                continue
+    for row in _ref_csv_rows(path):
+        code = norm_code(row.get('Prod Line') or row.get('prod_line') or row.get('prod line') or '')
+        if not code:
+            continue
 
-            project_group = (row.get('PROJECT') or row.get('project_group') or row.get('Project Group') or '')
-            sew_label = (row.get('SEW') or '')
-            assy_label = (row.get('ASSY') or '')
-            row_type = _normalize_ltp_type(row.get('SEW/ASSY') or row.get('sew/assy') or row.get('type') or '')
-
-            m = meta.setdefault(code, {})
-            if project_group and not m.get('project_group'):
-                m['project_group'] = str(project_group).strip()
-            if row_type and not m.get('type'):
-                m['type'] = row_type
-            if sew_label and not m.get('sew'):
-                m['sew'] = str(sew_label).strip()
-            if assy_label and not m.get('assy'):
-                m['assy'] = str(assy_label).strip()
+        project_group = (row.get('PROJECT') or row.get('project_group') or row.get('Project Group') or '')
+        sew_label = (row.get('SEW') or '')
+        assy_label = (row.get('ASSY') or '')
+        row_type = _normalize_ltp_type(row.get('SEW/ASSY') or row.get('sew/assy') or row.get('type') or '')
+
+        m = meta.setdefault(code, {})
+        if project_group and not m.get('project_group'):
+            m['project_group'] = str(project_group).strip()
+        if row_type and not m.get('type'):
+            m['type'] = row_type
+        if sew_label and not m.get('sew'):
+            m['sew'] = str(sew_label).strip()
+        if assy_label and not m.get('assy'):
+            m['assy'] = str(assy_label).strip()
     return meta
 
 
 def _load_ltp_page_reference(path: str) -> dict[tuple[str, str, str], dict[str, str | float]]:
+    return REFERENCE.get('ltp_page_reference', path, _build_ltp_page_reference)
+
+
+def _build_ltp_page_reference(path: str) -> dict[tuple[str, str, str], dict[str, str | float]]:
     ref: dict[tuple[str, str, str], dict[str, str | float]] = {}
     if not path or not os.path.exists(path):
         print(f"[LTP] Reference CSV not found: {path}")
         return ref
 
-    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
-        rdr = csv.DictReader(f)
-        for row in rdr:
-            project = _normalize_ltp_key(
-                row.get('Production Line')
-                or row.get('production line')
-                or row.get('Project')
-                or row.get('project')
-                or ''
-            )
-            model = _normalize_ltp_key(row.get('Model') or row.get('model') or '')
-            row_type = _normalize_ltp_type(row.get('SEW/ASSY') or row.get('sew/assy') or row.get('type') or '')
-            if not project or not model or not row_type:
-                continue
+    for row in _ref_csv_rows(path):
+        project = _normalize_ltp_key(
+            row.get('Production Line')
+            or row.get('production line')
+            or row.get('Project')
+            or row.get('project')
+            or ''
+        )
+        model = _normalize_ltp_key(row.get('Model') or row.get('model') or '')
+        row_type = _normalize_ltp_type(row.get('SEW/ASSY') or row.get('sew/assy') or row.get('type') or '')
+        if not project or not model or not row_type:
+            continue
 
-            # Parse LTP multiplier (default 1.0 if not specified or invalid)
-            multiplier_raw = row.get('LTP multiplier') or row.get('ltp multiplier') or ''
-            try:
-                multiplier = float(multiplier_raw) if multiplier_raw else 1.0
-                if multiplier <= 0:
-                    multiplier = 1.0
-            except (ValueError, TypeError):
+        # Parse LTP multiplier (default 1.0 if not specified or invalid)
+        multiplier_raw = row.get('LTP multiplier') or row.get('ltp multiplier') or ''
+        try:
+            multiplier = float(multiplier_raw) if multiplier_raw else 1.0
+            if multiplier <= 0:
                 multiplier = 1.0
-
-            ref[(project, model, row_type)] = {
-                'PROJECT': str(row.get('PROJECT') or '').strip(),
-                'SEW': str(row.get('SEW') or '').strip(),
-                'ASSY': str(row.get('ASSY') or '').strip(),
-                'multiplier': multiplier,
-            }
+        except (ValueError, TypeError):
+            multiplier = 1.0
+
+        ref[(project, model, row_type)] = {
+            'PROJECT': str(row.get('PROJECT') or '').strip(),
+            'SEW': str(row.get('SEW') or '').strip(),
+            'ASSY': str(row.get('ASSY') or '').strip(),
+            'multiplier': multiplier,
+        }
 
     return ref
 
 
+# Unmapped LTP rows seen by the latest workbook read, per loader ('pages' or 'codes').
+_LTP_UNMAPPED: dict[str, list[dict[str, str]]] = {'pages': [], 'codes': []}
+
+
 def load_planned_pages_from_ltp(
     directory: str,
     sheet_name: str,
@@ -1329,11 +2040,13 @@ def load_planned_pages_from_ltp(
     date_end_col: str,
     workdays_per_week: int,
     fallback_csv: str | None = None,
-) -> dict[str, dict[str, dict[date, int]]]:
+) -> dict[str, SeriesMatrix]:
     """Return planned quantities aggregated to page labels:
-    { 'PROJECT': {label: {date: qty}}, 'SEW': {...}, 'ASSY': {...} }
+    { 'PROJECT': SeriesMatrix, 'SEW': SeriesMatrix, 'ASSY': SeriesMatrix }
     """
-    result: dict[str, dict[str, dict[date, int]]] = {'PROJECT': {}, 'SEW': {}, 'ASSY': {}}
+    result: dict[str, SeriesMatrix] = {k: SeriesMatrix.empty(date.today()) for k in ('PROJECT', 'SEW', 'ASSY')}
+    unmapped: list[dict[str, str]] = []
+    _LTP_UNMAPPED['pages'] = unmapped
 
     workbook_path = _find_ltp_workbook(directory, keywords)
     if not workbook_path:
@@ -1396,6 +2109,19 @@ def load_planned_pages_from_ltp(
                 for col in range(start_col_idx, end_col_idx + 1):
                     date_headers.append(_coerce_header_to_date(ws.cell(row=date_row, column=col).value))
 
+        # Calendar axis spanning all header dates; each sheet column maps to one day slot.
+        header_days = [d for d in date_headers if d]
+        if not header_days:
+            print("[LTP] No date columns detected; planned page exports skipped")
+            return result
+        cal_start = min(header_days)
+        n_days = (max(header_days) - cal_start).days + 1
+        col_slots: list[tuple[int, int]] = []
+        for offset, col in enumerate(range(start_col_idx, end_col_idx + 1)):
+            d = date_headers[offset] if offset < len(date_headers) else None
+            if d:
+                col_slots.append((col, (d - cal_start).days))
+
         ref_pages = _load_ltp_page_reference(ref_csv)
         target_label = (label or '').strip().lower()
 
@@ -1428,6 +2154,7 @@ def load_planned_pages_from_ltp(
                     print(f"[LTP] ERROR: Label '{label}' not found in sheet '{resolved_sheet}'; planned page exports skipped")
                     return result
 
+        rows_by_page: dict[str, dict[str, np.ndarray]] = {'PROJECT': {}, 'SEW': {}, 'ASSY': {}}
         for row_idx in range(1, ws.max_row + 1):
             if label_col_idx is not None:
                 label_raw = ws.cell(row=row_idx, column=label_col_idx).value
@@ -1467,13 +2194,11 @@ def load_planned_pages_from_ltp(
                     print(f"[LTP] INFO: Using {other} label mapping for {project_key}/{model_key} (inferred {row_type})")
                 else:
                     print(f"[LTP] WARNING: No label mapping for {project_key}/{model_key} ({row_type})")
+                    unmapped.append({'project': project_key, 'model': model_key, 'type': row_type, 'reason': 'no label mapping'})
                     continue
 
-            per_day: dict[date, int] = {}
-            for offset, col in enumerate(range(start_col_idx, end_col_idx + 1)):
-                d = date_headers[offset] if offset < len(date_headers) else None
-                if not d:
-                    continue
+            per_day = np.zeros(n_days, dtype=np.float64)
+            for col, slot in col_slots:
                 val = ws.cell(row=row_idx, column=col).value
                 try:
                     if val is None or (isinstance(val, float) and pd.isna(val)):
@@ -1482,40 +2207,40 @@ def load_planned_pages_from_ltp(
                         qty = int(round(float(val)))
                 except Exception:
                     qty = 0
-                if qty:
-                    per_day[d] = per_day.get(d, 0) + qty
+                per_day[slot] += qty
 
-            if not per_day:
+            if not per_day.any():
                 continue
 
             # Apply LTP multiplier from ref.csv (CV=2x, PZ1D=7x, default=1x)
             multiplier = float(labels.get('multiplier', 1.0) or 1.0)
             if multiplier != 1.0:
-                per_day = {d: int(round(qty * multiplier)) for d, qty in per_day.items()}
+                per_day = np.round(per_day * multiplier)
                 print(f"[LTP] Applied multiplier {multiplier}x for {project_key}/{model_key} ({row_type})")
 
-            proj_label = (labels.get('PROJECT') or project_key).strip()
-            if proj_label:
-                bucket = result['PROJECT'].setdefault(proj_label, {})
-                for d, qty in per_day.items():
-                    bucket[d] = bucket.get(d, 0) + qty
-
-            sew_label = (labels.get('SEW') or '').strip()
-            if sew_label:
-                bucket = result['SEW'].setdefault(sew_label, {})
-                for d, qty in per_day.items():
-                    bucket[d] = bucket.get(d, 0) + qty
-
-            assy_label = (labels.get('ASSY') or '').strip()
-            if assy_label:
-                bucket = result['ASSY'].setdefault(assy_label, {})
-                for d, qty in per_day.items():
-                    bucket[d] = bucket.get(d, 0) + qty
+            for key, page_label in (
+                ('PROJECT', (labels.get('PROJECT') or project_key).strip()),
+                ('SEW', (labels.get('SEW') or '').strip()),
+                ('ASSY', (labels.get('ASSY') or '').strip()),
+            ):
+                if not page_label:
+                    continue
+                bucket = rows_by_page[key].get(page_label)
+                if bucket is None:
+                    rows_by_page[key][page_label] = per_day.copy()
+                else:
+                    bucket += per_day
 
         for key in ('PROJECT', 'SEW', 'ASSY'):
-            series = result.get(key) or {}
-            if series and _ltp_looks_weekly(series):
-                result[key] = _expand_weekly_plan_to_daily(series, workdays_per_week)
+            page_rows = rows_by_page[key]
+            if page_rows:
+                values = np.vstack(list(page_rows.values()))
+            else:
+                values = np.zeros((0, n_days), dtype=np.float64)
+            series = SeriesMatrix(list(page_rows.keys()), cal_start, values)
+            if len(series) and _ltp_looks_weekly(series):
+                series = _expand_weekly_plan_to_daily(series, workdays_per_week)
+            result[key] = series
     finally:
         try:
             wb.close()
@@ -1525,71 +2250,91 @@ def load_planned_pages_from_ltp(
     return result
 
 
-def _write_monthly_csv_by_label(out_path: str, series_by_label: dict[str, dict[date, int]], month_start: date):
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+def _render_monthly_csv_by_label(series: SeriesMatrix, month_start: date) -> str:
     days_in_month = calendar.monthrange(month_start.year, month_start.month)[1]
-    dates = [month_start.replace(day=i) for i in range(1, days_in_month + 1)]
+    month = series.reindex(month_start, month_start.replace(day=days_in_month))
+    dates = month.dates()
 
-    with open(out_path, 'w', newline='', encoding='utf-8') as f:
+    with io.StringIO() as f:
         f.write('Label,' + ','.join(d.isoformat() for d in dates) + "\n")
-        for label in sorted(series_by_label.keys(), key=lambda s: str(s).upper()):
-            per_day = series_by_label.get(label, {})
+        for label in sorted(month.labels, key=lambda s: str(s).upper()):
             row = [str(label)]
-            for d in dates:
-                row.append(f"{float(per_day.get(d, 0) or 0):.2f}")
+            row.extend(f"{v:.2f}" for v in month.row(label))
             f.write(','.join(row) + "\n")
         f.write("\n")
+        return f.getvalue()
 
 
-def _write_weekly_csv_by_label(out_path: str, series_by_label: dict[str, dict[date, int]], month_start: date):
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+def _render_weekly_csv_by_label(series: SeriesMatrix, month_start: date) -> str:
     days_in_month = calendar.monthrange(month_start.year, month_start.month)[1]
     month_end = month_start.replace(day=days_in_month)
-    week_starts: list[date] = []
-    seen: set[date] = set()
-    for d in daterange(month_start, month_end):
-        ws = monday_of_week(d)
-        if ws not in seen:
-            seen.add(ws)
-            week_starts.append(ws)
-    week_starts.sort()
-
-    with open(out_path, 'w', newline='', encoding='utf-8') as f:
+    first_week = monday_of_week(month_start)
+    n_weeks = (monday_of_week(month_end) - first_week).days // 7 + 1
+    week_starts = [first_week + timedelta(days=7 * i) for i in range(n_weeks)]
+    weekly = WindowSums(series).windows([(ws, ws + timedelta(days=6)) for ws in week_starts])
+
+    with io.StringIO() as f:
         f.write('Label,' + ','.join(d.isoformat() for d in week_starts) + "\n")
-        for label in sorted(series_by_label.keys(), key=lambda s: str(s).upper()):
-            per_day = series_by_label.get(label, {})
+        for label in sorted(series.labels, key=lambda s: str(s).upper()):
             row = [str(label)]
-            for ws in week_starts:
-                we = ws + timedelta(days=6)
-                row.append(f"{float(aggregate(per_day, ws, we) or 0):.2f}")
+            row.extend(f"{v:.2f}" for v in weekly[series.index[label]])
             f.write(','.join(row) + "\n")
         f.write("\n")
+        return f.getvalue()
 
 
-def _write_month_total_csv_by_label(out_path: str, series_by_label: dict[str, dict[date, int]], month_start: date):
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+def _render_month_total_csv_by_label(series: SeriesMatrix, month_start: date) -> str:
     days_in_month = calendar.monthrange(month_start.year, month_start.month)[1]
     month_end = month_start.replace(day=days_in_month)
     month_key = f"{month_start.year:04d}-{month_start.month:02d}"
+    totals = WindowSums(series).window(month_start, month_end)
 
-    with open(out_path, 'w', newline='', encoding='utf-8') as f:
+    with io.StringIO() as f:
         f.write('Label,' + month_key + "\n")
-        for label in sorted(series_by_label.keys(), key=lambda s: str(s).upper()):
-            per_day = series_by_label.get(label, {})
-            total = float(aggregate(per_day, month_start, month_end) or 0)
-            f.write(f"{label},{total:.2f}\n")
+        for label in sorted(series.labels, key=lambda s: str(s).upper()):
+            f.write(f"{label},{float(totals[series.index[label]]):.2f}\n")
         f.write("\n")
+        return f.getvalue()
 
 
-def _load_monthly_per_day_csv(path: str, month_start: date) -> dict[str, dict[date, float]]:
-    """Parse monthly per-day CSV format: Label,Day1,Day2,... into {label: {date: qty}}."""
-    series: dict[str, dict[date, float]] = {}
-    if not path or not os.path.exists(path):
-        return series
+def _page_series_from_rows(rows, month_start: date) -> SeriesMatrix:
+    """Build a month-calendar SeriesMatrix from ``(label, per-day values)`` rows.
+
+    Values beyond the month are dropped, short rows are zero-padded and
+    repeated labels are summed, matching how the page CSVs were always read.
+    """
+    days_in_month = calendar.monthrange(month_start.year, month_start.month)[1]
+    labels: list[str] = []
+    index: dict[str, int] = {}
+    out: list[np.ndarray] = []
+    for label, vals in rows:
+        vals = np.asarray(vals[:days_in_month], dtype=np.float64)
+        i = index.get(label)
+        if i is None:
+            index[label] = i = len(labels)
+            labels.append(label)
+            out.append(np.zeros(days_in_month, dtype=np.float64))
+        out[i][:len(vals)] += vals
+
+    values = np.vstack(out) if out else np.zeros((0, days_in_month), dtype=np.float64)
+    return SeriesMatrix(labels, month_start, values)
+
+
+def _month_page_series(series: SeriesMatrix, month_start: date) -> SeriesMatrix:
+    """The month view of a plan page as the Planned/Day CSV carries it: month calendar, labels sorted."""
+    days_in_month = calendar.monthrange(month_start.year, month_start.month)[1]
+    month = series.reindex(month_start, month_start.replace(day=days_in_month))
+    order = sorted(range(len(month.labels)), key=lambda i: str(month.labels[i]).upper())
+    return SeriesMatrix([month.labels[i] for i in order], month_start, month.values[order])
+
 
+def _load_monthly_per_day_csv(path: str, month_start: date) -> SeriesMatrix:
+    """Parse monthly per-day CSV format: Label,Day1,Day2,... into a SeriesMatrix."""
     days_in_month = calendar.monthrange(month_start.year, month_start.month)[1]
-    dates = [month_start.replace(day=i) for i in range(1, days_in_month + 1)]
+    if not path or not os.path.exists(path):
+        return SeriesMatrix.empty(month_start, month_start.replace(day=days_in_month))
 
+    rows: list[tuple[str, np.ndarray]] = []
     with open(path, 'r', newline='', encoding='utf-8-sig') as f:
         for raw in f:
             line = (raw or '').strip()
@@ -1604,43 +2349,572 @@ def _load_monthly_per_day_csv(path: str, month_start: date) -> dict[str, dict[da
             if len(parts) > 1 and re.match(r'^\d{4}-\d{2}-\d{2}$', parts[1] or ''):
                 continue
 
-            label = str(parts[0]).lstrip('\ufeff').strip()
-            per_day = series.setdefault(label, {})
-            for idx, d in enumerate(dates, start=1):
-                if idx >= len(parts):
-                    break
-                try:
-                    v = float(parts[idx] or 0)
-                except Exception:
-                    v = 0.0
-                if v:
-                    per_day[d] = per_day.get(d, 0.0) + v
+            cells = parts[1:days_in_month + 1]
+            try:
+                vals = np.array([float(c or 0) for c in cells], dtype=np.float64)
+            except ValueError:
+                vals = np.array([_safe_float(c) for c in cells], dtype=np.float64)
 
-    return series
+            rows.append((str(parts[0]).lstrip('\ufeff').strip(), vals))
 
+    return _page_series_from_rows(rows, month_start)
 
-def _norm_key(s: str) -> str:
-    s2 = (s or '')
-    s2 = s2.replace('\ufeff', '')
-    s2 = s2.replace('\xa0', ' ')
-    s2 = s2.strip().upper()
-    s2 = ' '.join(s2.split())
-    s2 = re.sub(r'\s*-\s*', ' - ', s2)
-    s2 = ' '.join(s2.split())
-    return s2
 
+def _render_series_npy(series: SeriesMatrix) -> bytes:
+    """Serialize the values of ``series`` as a .npy file (labels/start go in the .json sidecar)."""
+    with io.BytesIO() as buf:
+        np.save(buf, np.ascontiguousarray(series.values, dtype=np.float64), allow_pickle=False)
+        return buf.getvalue()
 
-def _base_label_name(name: str) -> str:
-    s = _norm_key(name)
-    for suf in (' - SEW', ' - ASSY'):
-        if s.endswith(suf):
-            s = s[:-len(suf)].strip()
-            break
-    if ' - ' in s:
-        s = s.split(' - ')[0].strip()
-    while s.endswith('-'):
-        s = s[:-1].strip()
-    return s
+
+def _render_series_index(series: SeriesMatrix) -> str:
+    return json.dumps({'start': series.start.isoformat(), 'labels': list(series.labels)}, ensure_ascii=False)
+
+
+def _load_series_npy(npy_path: str) -> SeriesMatrix | None:
+    """Memory-map a series written by _render_series_npy; None when the pair of files is missing.
+
+    The map is read-only: every SeriesMatrix operation builds new arrays, so a
+    page is only copied where it is reindexed or merged. On Windows an open map
+    keeps the file in use, so pruning skips that generation until a later run.
+    """
+    index_path = os.path.splitext(npy_path)[0] + '.json'
+    if not os.path.exists(npy_path) or not os.path.exists(index_path):
+        return None
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        values = np.load(npy_path, mmap_mode='r', allow_pickle=False)
+        labels = list(index.get('labels') or [])
+        if values.ndim != 2 or values.shape[0] != len(labels):
+            print(f"[STORE] WARNING: {npy_path} does not match its label index; ignoring")
+            return None
+        return SeriesMatrix(labels, date.fromisoformat(index['start']), values)
+    except Exception as e:
+        print(f"[STORE] WARNING: Could not load {npy_path}: {e}")
+        return None
+
+
+def _month_bounds(d: date) -> tuple[date, date]:
+    start = d.replace(day=1)
+    return start, start.replace(day=calendar.monthrange(start.year, start.month)[1])
+
+
+class HistoryStore:
+    """Month-partitioned history of page-level plan and production series.
+
+    Layout: ``<root>/YYYY-MM/<side>_<PAGE>.npz`` holds the compacted month
+    (``side`` is ``plan`` or ``prod``) and ``seg-<n>-<side>_<PAGE>.npz``
+    files are appended by each pipeline run. A segment replaces the values
+    of its covered day range, so applying one twice is harmless; once a
+    partition collects more than ``max_segments`` segments they are folded
+    into the compacted file. Queries only open the partitions a date range
+    touches. The web process, the compute workers and the backfill script
+    all write partitions, so appends and compactions hold the partition's
+    OS file lock (``.lock``).
+    """
+
+    def __init__(self, root: str, max_segments: int = 4):
+        self.root = root
+        self.max_segments = max_segments
+        self._lock = threading.Lock()
+        self._seq = 0
+
+    def _partition_dir(self, month: date) -> str:
+        return os.path.join(self.root, f"{month.year:04d}-{month.month:02d}")
+
+    @staticmethod
+    def _partition_lock(part_dir: str):
+        return _file_lock(os.path.join(part_dir, '.lock'))
+
+    def months(self) -> list[date]:
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return []
+        out: list[date] = []
+        for name in names:
+            if re.match(r'^\d{4}-\d{2}$', name):
+                out.append(date(int(name[:4]), int(name[5:]), 1))
+        return sorted(out)
+
+    @staticmethod
+    def _write_npz(path: str, series: SeriesMatrix, covered: tuple[date, date], days: np.ndarray | None = None):
+        """Write one segment, or with ``days`` (recorded-day mask from series.start) a compacted month."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        extra = {} if days is None else {'days': np.asarray(days, dtype=bool)}
+        with open(tmp, 'wb') as f:
+            np.savez(
+                f,
+                values=np.ascontiguousarray(series.values, dtype=np.float64),
+                labels=np.array(series.labels, dtype=np.str_),
+                meta=np.array([series.start.isoformat(), covered[0].isoformat(), covered[1].isoformat()]),
+                **extra,
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _read_npz(path: str) -> tuple[SeriesMatrix, tuple[date, date]]:
+        with np.load(path, allow_pickle=False) as z:
+            meta = [date.fromisoformat(str(s)) for s in z['meta']]
+            series = SeriesMatrix([str(s) for s in z['labels']], meta[0], z['values'])
+        return series, (meta[1], meta[2])
+
+    @staticmethod
+    def _apply(base: SeriesMatrix, seg: SeriesMatrix, covered: tuple[date, date]) -> SeriesMatrix:
+        """Overlay ``seg`` on ``base``: days in ``covered`` take the segment's values (absent labels -> 0)."""
+        labels = list(base.labels) + [lbl for lbl in seg.labels if lbl not in base.index]
+        out = base.reindex(base.start, base.end).values
+        if len(labels) > len(base.labels):
+            out = np.vstack([out, np.zeros((len(labels) - len(base.labels), base.n_days), dtype=np.float64)])
+        lo = max((covered[0] - base.start).days, 0)
+        hi = min((covered[1] - base.start).days + 1, base.n_days)
+        if hi > lo:
+            out[:, lo:hi] = 0.0
+            index = {lbl: i for i, lbl in enumerate(labels)}
+            rows = np.fromiter((index[lbl] for lbl in seg.labels), dtype=np.intp, count=len(seg.labels))
+            day0 = base.start + timedelta(days=lo)
+            out[rows, lo:hi] = seg.reindex(day0, base.start + timedelta(days=hi - 1)).values
+        return SeriesMatrix(labels, base.start, out)
+
+    @staticmethod
+    def _npz_days(path: str, month_start: date, month_end: date) -> np.ndarray:
+        """Days of the month a segment or compacted file records (its covered range, or its stored mask)."""
+        mask = np.zeros((month_end - month_start).days + 1, dtype=bool)
+        with np.load(path, allow_pickle=False) as z:
+            meta = [date.fromisoformat(str(s)) for s in z['meta']]
+            if 'days' in z.files:
+                # Compacted month (its series starts on month_start); older ones without a mask count as whole.
+                return np.asarray(z['days'], dtype=bool)
+        lo = max((meta[1] - month_start).days, 0)
+        hi = min((meta[2] - month_start).days + 1, len(mask))
+        if hi > lo:
+            mask[lo:hi] = True
+        return mask
+
+    def _month_days(self, side: str, kind: str, month_start: date) -> np.ndarray:
+        month_end = _month_bounds(month_start)[1]
+        part_dir = self._partition_dir(month_start)
+        name = f"{side}_{kind}"
+        for _attempt in range(3):
+            mask = np.zeros((month_end - month_start).days + 1, dtype=bool)
+            try:
+                base_path = os.path.join(part_dir, f"{name}.npz")
+                if os.path.exists(base_path):
+                    mask |= self._npz_days(base_path, month_start, month_end)
+                for seg_name in self._segments(part_dir, name):
+                    mask |= self._npz_days(os.path.join(part_dir, seg_name), month_start, month_end)
+                return mask
+            except FileNotFoundError:
+                # A compaction swapped files under us; the new base carries the segment's days.
+                continue
+        return mask
+
+    def coverage(self, side: str, kind: str, start_d: date, end_d: date) -> np.ndarray:
+        """Per day of ``start_d..end_d``: True when some write recorded it (zero production included)."""
+        out = np.zeros(max((end_d - start_d).days + 1, 0), dtype=bool)
+        available = set(self.months())
+        month = start_d.replace(day=1)
+        while month <= end_d:
+            month_end = _month_bounds(month)[1]
+            if month in available:
+                days = self._month_days(side, kind, month)
+                lo, hi = max(month, start_d), min(month_end, end_d)
+                out[(lo - start_d).days:(hi - start_d).days + 1] = days[(lo - month).days:(hi - month).days + 1]
+            month = month_end + timedelta(days=1)
+        return out
+
+    def recorded(self, side: str, kind: str) -> set[date]:
+        """Months holding a compacted file or a segment of ``side``/``kind``."""
+        name = f"{side}_{kind}"
+        out: set[date] = set()
+        for month in self.months():
+            part_dir = self._partition_dir(month)
+            if os.path.exists(os.path.join(part_dir, f"{name}.npz")) or self._segments(part_dir, name):
+                out.add(month)
+        return out
+
+    def _segments(self, part_dir: str, name: str) -> list[str]:
+        try:
+            names = os.listdir(part_dir)
+        except OSError:
+            return []
+        suffix = f"-{name}.npz"
+        return sorted(n for n in names if n.startswith('seg-') and n.endswith(suffix))
+
+    def read_month(self, side: str, kind: str, month: date) -> SeriesMatrix:
+        month_start, month_end = _month_bounds(month)
+        part_dir = self._partition_dir(month_start)
+        name = f"{side}_{kind}"
+        for _attempt in range(3):
+            state = SeriesMatrix.empty(month_start, month_end)
+            try:
+                base_path = os.path.join(part_dir, f"{name}.npz")
+                if os.path.exists(base_path):
+                    series, covered = self._read_npz(base_path)
+                    state = self._apply(state, series, covered)
+                for seg_name in self._segments(part_dir, name):
+                    series, covered = self._read_npz(os.path.join(part_dir, seg_name))
+                    state = self._apply(state, series, covered)
+                return state
+            except FileNotFoundError:
+                # A compaction swapped files under us; the new base already holds the segment.
+                continue
+        return state
+
+    def append(self, side: str, kind: str, series: SeriesMatrix, covered: tuple[date, date] | None = None):
+        """Record ``series`` for the days in ``covered`` (default: its whole calendar), one segment per month."""
+        if not series.n_days:
+            return
+        covered = covered or (series.start, series.end)
+        name = f"{side}_{kind}"
+        with self._lock:
+            month = covered[0].replace(day=1)
+            while month <= covered[1]:
+                month_start, month_end = _month_bounds(month)
+                lo, hi = max(covered[0], month_start), min(covered[1], month_end)
+                part = series.reindex(month_start, month_end)
+                part_dir = self._partition_dir(month_start)
+                with self._partition_lock(part_dir):
+                    current = self.read_month(side, kind, month_start)
+                    merged = self._apply(current, part, (lo, hi))
+                    # Also record unchanged values (e.g. zeros) on days nothing has recorded yet.
+                    recorded = self._month_days(side, kind, month_start)[(lo - month_start).days:(hi - month_start).days + 1]
+                    changed = not np.array_equal(merged.values, current.values) or merged.labels != current.labels
+                    if changed or not recorded.all():
+                        self._seq += 1
+                        seg = os.path.join(part_dir, f"seg-{time.time_ns():020d}{self._seq:04d}-{name}.npz")
+                        self._write_npz(seg, part, (lo, hi))
+                        if len(self._segments(part_dir, name)) > self.max_segments:
+                            self._compact(part_dir, name, month_start)
+                month = month_end + timedelta(days=1)
+
+    def _compact(self, part_dir: str, name: str, month_start: date):
+        """Fold the segments of ``name`` into its month file (caller holds the partition lock)."""
+        side, kind = name.split('_', 1)
+        segs = self._segments(part_dir, name)
+        state = self.read_month(side, kind, month_start)
+        days = self._month_days(side, kind, month_start)
+        self._write_npz(os.path.join(part_dir, f"{name}.npz"), state, (state.start, state.end), days)
+        for seg_name in segs:
+            try:
+                os.remove(os.path.join(part_dir, seg_name))
+            except OSError:
+                pass
+
+    def compact(self):
+        """Fold all pending segments into their month files."""
+        with self._lock:
+            for month_start in self.months():
+                part_dir = self._partition_dir(month_start)
+                with self._partition_lock(part_dir):
+                    for side in ('plan', 'prod'):
+                        for kind in PAGE_KINDS + (LEGACY_HISTORY_KIND,):
+                            name = f"{side}_{kind}"
+                            if self._segments(part_dir, name):
+                                self._compact(part_dir, name, month_start)
+
+    def _snapshot_path(self, as_of: date) -> str:
+        return os.path.join(self._partition_dir(as_of.replace(day=1)), f"snapshot-{as_of.isoformat()}.json")
+
+    def write_snapshot(self, as_of: date, snapshot: dict[str, object]) -> bool:
+        """Store the computed snapshot of report date ``as_of``; returns True when it changed."""
+        return write_if_changed(self._snapshot_path(as_of), json.dumps(snapshot, sort_keys=True))
+
+    def read_snapshot(self, as_of: date) -> dict[str, object] | None:
+        try:
+            with open(self._snapshot_path(as_of), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def query(self, side: str, kind: str, start_d: date, end_d: date) -> SeriesMatrix:
+        """Series for ``start_d..end_d``, reading only the month partitions the range touches."""
+        out = SeriesMatrix.empty(start_d, end_d)
+        if end_d < start_d:
+            return out
+        available = set(self.months())
+        month = start_d.replace(day=1)
+        while month <= end_d:
+            if month in available:
+                out = self._apply(out, self.read_month(side, kind, month), _month_bounds(month))
+            month = _month_bounds(month)[1] + timedelta(days=1)
+        return out
+
+    def version(self, start_d: date, end_d: date) -> str:
+        """Fingerprint of the series files (name, mtime, size) of the partitions ``start_d..end_d`` touches.
+
+        Files are listed one by one rather than trusting the directory
+        mtime, which SMB shares do not keep reliably; '' when none exist.
+        """
+        parts = []
+        for month in self.months():
+            if start_d.replace(day=1) <= month <= end_d:
+                try:
+                    with os.scandir(self._partition_dir(month)) as it:
+                        files = sorted(
+                            (e.name, e.stat().st_mtime_ns, e.stat().st_size) for e in it if e.name.endswith('.npz')
+                        )
+                except OSError:
+                    continue
+                parts.append([f"{month:%Y-%m}", files])
+        return content_hash(json.dumps(parts)) if parts else ''
+
+
+HISTORY = HistoryStore(PVS_HISTORY_DIR)
+
+
+def _safe_float(s: str) -> float:
+    try:
+        return float(s or 0)
+    except Exception:
+        return 0.0
+
+
+@lru_cache(maxsize=16384)
+def _norm_key(s: str) -> str:
+    s2 = (s or '')
+    s2 = s2.replace('\ufeff', '')
+    s2 = s2.replace('\xa0', ' ')
+    s2 = s2.strip().upper()
+    s2 = ' '.join(s2.split())
+    s2 = re.sub(r'\s*-\s*', ' - ', s2)
+    s2 = ' '.join(s2.split())
+    return s2
+
+
+@lru_cache(maxsize=16384)
+def _base_label_name(name: str) -> str:
+    s = _norm_key(name)
+    for suf in (' - SEW', ' - ASSY'):
+        if s.endswith(suf):
+            s = s[:-len(suf)].strip()
+            break
+    if ' - ' in s:
+        s = s.split(' - ')[0].strip()
+    while s.endswith('-'):
+        s = s[:-1].strip()
+    return s
+
+
+class LabelTable:
+    """Interning table for dashboard labels and prod-line codes.
+
+    Each distinct string gets a stable integer ID. The normalized key
+    (``_norm_key``), base name and project group of every label are
+    computed once, so joins and membership tests run on integer IDs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: dict[str, int] = {}
+        self.labels: list[str] = []
+        self._norm: list[int] = []
+        self._base: dict[int, str] = {}
+        self._group: dict[int, str] = {}
+
+    def intern(self, label: str) -> int:
+        label = str(label)
+        i = self._ids.get(label)
+        if i is None:
+            with self._lock:
+                i = self._ids.get(label)
+                if i is None:
+                    i = len(self.labels)
+                    self.labels.append(label)
+                    self._norm.append(-1)
+                    self._ids[label] = i
+        return i
+
+    def norm_id(self, label: str) -> int:
+        """ID of the normalized form of ``label``; equal for spellings that _norm_key folds together."""
+        i = self.intern(label)
+        n = self._norm[i]
+        if n < 0:
+            n = self.intern(_norm_key(self.labels[i]))
+            self._norm[i] = n
+            self._norm[n] = n
+        return n
+
+    def norm_ids(self, labels) -> set[int]:
+        return {self.norm_id(lbl) for lbl in labels}
+
+    def norm_key(self, label: str) -> str:
+        return self.labels[self.norm_id(label)]
+
+    def base_name(self, label: str) -> str:
+        n = self.norm_id(label)
+        base = self._base.get(n)
+        if base is None:
+            base = self._base[n] = _base_label_name(self.labels[n])
+        return base
+
+    def group_name(self, label: str) -> str:
+        """Dashboard group of a PROJECT-page label (GROUP_OVERRIDES applied)."""
+        n = self.norm_id(label)
+        group = self._group.get(n)
+        if group is None:
+            base = self.base_name(label)
+            group = self._group[n] = GROUP_OVERRIDES.get(base) or base
+        return group
+
+
+LABELS = LabelTable()
+
+
+class GroupTable:
+    """Group membership of dashboard members (page labels or prod-line codes).
+
+    ``resolve(member)`` returns the member's (display, category, group,
+    OLK project key); it runs once per member, after which a member list
+    maps to integer group and (group, OLK key) pair IDs. Tables are cached
+    per reference-data version (see ``_page_group_table`` and
+    ``_code_group_table``), so the string heuristics do not run per request.
+    """
+
+    def __init__(self, resolve):
+        self._resolve = resolve
+        self._lock = threading.Lock()
+        self._members: dict[str, tuple[str, str, int, int]] = {}
+        self.groups: list[str] = []
+        self._group_ids: dict[str, int] = {}
+        self._pair_ids: dict[tuple[int, str], int] = {}
+        self.pair_group: list[int] = []
+
+    def member(self, key: str) -> tuple[str, str, int, int]:
+        """(display, category, group ID, pair ID) of ``key``."""
+        hit = self._members.get(key)
+        if hit is not None:
+            return hit
+        with self._lock:
+            hit = self._members.get(key)
+            if hit is None:
+                display, category, group, olk_key = self._resolve(key)
+                g = self._group_ids.get(group)
+                if g is None:
+                    g = self._group_ids[group] = len(self.groups)
+                    self.groups.append(group)
+                pair = self._pair_ids.get((g, olk_key))
+                if pair is None:
+                    pair = self._pair_ids[(g, olk_key)] = len(self.pair_group)
+                    self.pair_group.append(g)
+                hit = self._members[key] = (display, category, g, pair)
+        return hit
+
+    def displays(self, keys: list[str]) -> list[str]:
+        return [self.member(k)[0] for k in keys]
+
+    def categories(self, keys: list[str]) -> list[str]:
+        return [self.member(k)[1] for k in keys]
+
+    def index(self, keys: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Group IDs and pair IDs of ``keys`` as integer arrays."""
+        members = [self.member(k) for k in keys]
+        group_ids = np.fromiter((m[2] for m in members), dtype=np.intp, count=len(members))
+        pair_ids = np.fromiter((m[3] for m in members), dtype=np.intp, count=len(members))
+        return group_ids, pair_ids
+
+
+def _group_project_key(disp_name: str) -> str:
+    s = (disp_name or '').strip().upper()
+    if ' - ' in s:
+        s = s.split(' - ')[0].strip()
+    for suf in (' - SEW', '- SEW', ' - ASSY', '- ASSY'):
+        if s.endswith(suf):
+            s = s[:-len(suf)].strip()
+            break
+    while s.endswith('-'):
+        s = s[:-1].strip()
+    return s
+
+
+def _page_group_table() -> GroupTable:
+    """PROJECT-page labels: grouped by base name with GROUP_OVERRIDES, OLK keyed by base name."""
+    def _resolve(label: str) -> tuple[str, str, str, str]:
+        return label, 'PROJECT', LABELS.group_name(label), LABELS.base_name(label)
+
+    return REFERENCE.derive('page_group_table', (PVS_MASTER_LIST_CSV,), lambda: GroupTable(_resolve))
+
+
+def _code_group_table() -> GroupTable:
+    """Prod-line codes: display and category from ref.csv/the line map, group from ref.csv or the display base."""
+    def _build() -> GroupTable:
+        mapping = load_map_csv(PVS_MAP_CSV)
+        ref_meta = _load_ref_meta(PVS_LTP_REF_CSV)
+
+        def _resolve(code: str) -> tuple[str, str, str, str]:
+            m = ref_meta.get(code, {})
+            t = (m.get('type') or '').strip().upper()
+            if t == 'SEW':
+                disp = m.get('sew') or mapping.get(code, code)
+            elif t == 'ASSY':
+                disp = m.get('assy') or mapping.get(code, code)
+            else:
+                disp = mapping.get(code, code)
+
+            # Determine category (SEW, ASSY, or OTHER)
+            if t in ('SEW', 'ASSY'):
+                category = t
+            else:
+                disp_upper = str(disp).upper()
+                normalized_name = disp_upper.replace('-', ' ').strip()
+                if normalized_name in SEW_NAME_OVERRIDES or 'SEW' in disp_upper:
+                    category = 'SEW'
+                elif 'ASSY' in disp_upper:
+                    category = 'ASSY'
+                else:
+                    category = 'OTHER'
+
+            group_name = ((ref_meta.get(str(code), {}) if code else {}).get('project_group') or '').strip()
+            if not group_name:
+                disp_upper = disp.upper()
+                base = disp.split(' - ')[0].strip().upper() if ' - ' in disp else disp_upper
+                # Overrides first; SEW/ASSY pairs and single lines group under their base name
+                group_name = GROUP_OVERRIDES.get(base) or base
+            return disp, category, group_name, _group_project_key(disp)
+
+        return GroupTable(_resolve)
+
+    return REFERENCE.derive('code_group_table', (PVS_MAP_CSV, PVS_LTP_REF_CSV), _build)
+
+
+class SubstringMatcher:
+    """Resolve which of an ordered list of keys occurs inside a string.
+
+    All keys are compiled into one regex alternation and scanned in a single
+    pass. When several keys occur, the one earliest in the list wins, which
+    is what the former ``for k in keys: if k in s: break`` loops returned.
+    """
+
+    __slots__ = ('keys', 'values', '_index', '_pattern')
+
+    def __init__(self, pairs):
+        self.keys: list[str] = []
+        self.values: list = []
+        self._index: dict[str, int] = {}
+        for key, value in pairs:
+            if not key or key in self._index:
+                continue
+            self._index[key] = len(self.keys)
+            self.keys.append(key)
+            self.values.append(value)
+        self._pattern = (
+            re.compile('(?=(' + '|'.join(re.escape(k) for k in self.keys) + '))') if self.keys else None
+        )
+
+    def first(self, text: str):
+        if self._pattern is None or not text:
+            return None
+        best = -1
+        for m in self._pattern.finditer(text):
+            i = self._index[m.group(1)]
+            if best < 0 or i < best:
+                best = i
+                if best == 0:
+                    break
+        return self.values[best] if best >= 0 else None
 
 
 def _build_olk_norm_by_label(mapping: dict[str, str], raw_olk: dict[str, float] | None) -> dict[str, float]:
@@ -1656,8 +2930,8 @@ def _build_olk_norm_by_label(mapping: dict[str, str], raw_olk: dict[str, float]
         code_to_disp[_norm_key(code)] = disp
         disp_norm_to_disp[_norm_key(disp)] = disp
 
-    code_keys = list(code_to_disp.keys())
-    disp_keys = list(disp_norm_to_disp.keys())
+    code_matcher = SubstringMatcher(code_to_disp.items())
+    disp_matcher = SubstringMatcher(disp_norm_to_disp.items())
 
     for key, val in raw_olk.items():
         if not val:
@@ -1669,15 +2943,9 @@ def _build_olk_norm_by_label(mapping: dict[str, str], raw_olk: dict[str, float]
         elif key_norm in disp_norm_to_disp:
             target_disp = disp_norm_to_disp[key_norm]
         else:
-            for ck in code_keys:
-                if ck and ck in key_norm:
-                    target_disp = code_to_disp.get(ck)
-                    break
+            target_disp = code_matcher.first(key_norm)
         if target_disp is None:
-            for dk in disp_keys:
-                if dk and dk in key_norm:
-                    target_disp = disp_norm_to_disp.get(dk)
-                    break
+            target_disp = disp_matcher.first(key_norm)
 
         out_key = _norm_key(target_disp) if target_disp else key_norm
         out[out_key] = out.get(out_key, 0.0) + float(val or 0.0)
@@ -1685,6 +2953,121 @@ def _build_olk_norm_by_label(mapping: dict[str, str], raw_olk: dict[str, float]
     return out
 
 
+def _olk_norm_by_label() -> dict[str, float]:
+    """OLK.csv targets keyed by normalized dashboard label, rebuilt only when the map or OLK.csv change."""
+    return REFERENCE.derive(
+        'olk_norm_by_label',
+        (PVS_MAP_CSV, PVS_OLK_CSV),
+        lambda: _build_olk_norm_by_label(load_map_csv(PVS_MAP_CSV), load_olk_csv(PVS_OLK_CSV)),
+    )
+
+
+def _olk_pair_base(name: str) -> str:
+    s = (name or '').strip().upper()
+    for suf in (' - SEW', '- SEW', ' - ASSY', '- ASSY'):
+        if s.endswith(suf):
+            s = s[:-len(suf)]
+            break
+    s = s.strip()
+    while s.endswith('-'):
+        s = s[:-1].strip()
+    return s
+
+
+def _build_olk_by_code(
+    mapping: dict[str, str],
+    ref_meta: dict[str, dict[str, str]],
+    raw_olk: dict[str, float] | None,
+) -> dict[str, float]:
+    olk_by_code: dict[str, float] = {}
+    if not raw_olk:
+        return olk_by_code
+
+    # Build reverse map: display name -> code
+    display_to_code: dict[str, str] = {}
+    for code_key, disp_name in mapping.items():
+        if not disp_name:
+            continue
+        display_to_code[disp_name.upper()] = code_key
+
+    for code_key, m in ref_meta.items():
+        for label in (m.get('sew'), m.get('assy'), m.get('project_group')):
+            if label:
+                display_to_code[str(label).strip().upper()] = code_key
+
+    code_matcher = SubstringMatcher((code_key, code_key) for code_key in mapping.keys())
+    disp_matcher = SubstringMatcher(
+        (disp_name.upper(), code_key) for code_key, disp_name in mapping.items() if disp_name
+    )
+
+    for key, val in raw_olk.items():
+        if not val:
+            continue
+
+        key_norm = (key or "").strip().upper()
+        target_code: str | None = None
+
+        # 1) Exact match on prod line code
+        if key_norm in mapping:
+            target_code = key_norm
+        else:
+            # 2) Exact match on display / project name
+            target_code = display_to_code.get(key_norm)
+
+        # 3) Fuzzy match: key contains a known code (e.g. "Z_FG - CDPO")
+        if target_code is None:
+            target_code = code_matcher.first(key_norm)
+
+        # 4) Fuzzy match: key contains a known display name
+        if target_code is None:
+            target_code = disp_matcher.first(key_norm)
+
+        if target_code is not None:
+            olk_by_code[target_code] = olk_by_code.get(target_code, 0.0) + float(val or 0.0)
+        else:
+            # Fallback: keep under original key so at least it's not lost
+            olk_by_code[key_norm] = olk_by_code.get(key_norm, 0.0) + float(val or 0.0)
+
+    # SEW/ASSY pairs share one OLK target: fill the missing side from its partner
+    pairs: dict[str, dict[str, str]] = {}
+    for code_key, disp_name in mapping.items():
+        if not disp_name:
+            continue
+        disp_u = disp_name.strip().upper()
+        if 'SEW' in disp_u:
+            pairs.setdefault(_olk_pair_base(disp_u), {})['SEW'] = code_key
+        elif 'ASSY' in disp_u:
+            pairs.setdefault(_olk_pair_base(disp_u), {})['ASSY'] = code_key
+
+    for pair in pairs.values():
+        sew_code = pair.get('SEW')
+        assy_code = pair.get('ASSY')
+        if not sew_code or not assy_code:
+            continue
+        sew_val = float(olk_by_code.get(sew_code, 0.0) or 0.0)
+        assy_val = float(olk_by_code.get(assy_code, 0.0) or 0.0)
+        if sew_val <= 0 and assy_val > 0:
+            olk_by_code[sew_code] = assy_val
+        elif assy_val <= 0 and sew_val > 0:
+            olk_by_code[assy_code] = sew_val
+    return olk_by_code
+
+
+def _olk_by_code() -> dict[str, float]:
+    """Monthly OLK targets by prod line code for the legacy view.
+
+    Prefers PVS/OLK.csv (display labels) and falls back to Monthly_OLK.xlsx.
+    Resolved once per version of the map, ref.csv and OLK sources.
+    """
+    def _build() -> dict[str, float]:
+        raw_olk = load_olk_csv(PVS_OLK_CSV)
+        if not raw_olk:
+            raw_olk = load_monthly_olk(PVS_OLK_XLSX)
+        return _build_olk_by_code(load_map_csv(PVS_MAP_CSV), _load_ref_meta(PVS_LTP_REF_CSV), raw_olk)
+
+    return REFERENCE.derive('olk_by_code', (PVS_MAP_CSV, PVS_LTP_REF_CSV, PVS_OLK_CSV, PVS_OLK_XLSX), _build)
+
+
 def _olk_lookup(label: str, olk_norm: dict[str, float]) -> float:
     if not label or not olk_norm:
         return 0.0
@@ -1698,6 +3081,10 @@ def _olk_lookup(label: str, olk_norm: dict[str, float]) -> float:
 
 
 def _load_master_list(path: str) -> dict[str, list[str]]:
+    return REFERENCE.get('master_list', path, _read_master_list)
+
+
+def _read_master_list(path: str) -> dict[str, list[str]]:
     res: dict[str, list[str]] = {'PROJECT': [], 'SEW': [], 'ASSY': []}
     if not path or not os.path.exists(path):
         return res
@@ -1713,214 +3100,563 @@ def _load_master_list(path: str) -> dict[str, list[str]]:
     return res
 
 
-def _canonicalize_series(
-    series: dict[str, dict[date, float]],
-    canonical: list[str],
-) -> dict[str, dict[date, float]]:
-    if not canonical:
-        return series
-    canon_by_norm = {_norm_key(c): c for c in canonical}
-    out: dict[str, dict[date, float]] = {}
-    for label, per_day in (series or {}).items():
-        key_norm = _norm_key(str(label))
-        target = canon_by_norm.get(key_norm) or str(label)
-        tgt = out.setdefault(target, {})
-        for d, v in (per_day or {}).items():
-            tgt[d] = float(tgt.get(d, 0.0) or 0.0) + float(v or 0.0)
-    for c in canonical:
-        out.setdefault(c, {})
+def _canonicalize_series(series: SeriesMatrix, canonical: list[str]) -> SeriesMatrix:
+    return series.canonicalize(canonical)
+
+
+# Window column order used by the metrics engine.
+METRIC_WINDOWS = ('daily', 'wtd', 'mtd')
+
+
+def _adherence_pct(delta: np.ndarray, schedule: np.ndarray) -> np.ndarray:
+    """Clamped delta/schedule percentage; NaN where there is no schedule."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(schedule > 0, (delta / schedule) * 100.0, np.nan)
+    return np.clip(pct, -PVS_ADHERENCE_CLAMP, PVS_ADHERENCE_CLAMP)
+
+
+def _olk_adherence_pct(production: np.ndarray, olk: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(olk > 0, (production / olk) * 100.0, 0.0)
+
+
+def _segment_sum(ids: np.ndarray, values: np.ndarray, n_segments: int) -> np.ndarray:
+    """Sum the rows of ``values`` (n x k) into ``n_segments`` buckets by ``ids``."""
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    out = np.zeros((n_segments, values.shape[1]), dtype=np.float64)
+    for k in range(values.shape[1]):
+        out[:, k] = np.bincount(ids, weights=values[:, k], minlength=n_segments)
     return out
 
 
-def _compute_metrics_from_page_csvs(
-    as_of: date,
-    daily_start: date,
-    start_week: date,
-    start_month: date,
-) -> dict[str, object] | None:
-    prod_dir = os.path.join(_BASE_DIR, 'PVS', 'Production')
-    plan_dir = os.path.join(_BASE_DIR, 'PVS', 'Planned', 'Day')
-    if not os.path.exists(os.path.join(plan_dir, '1_PVS_per_Project.csv')):
-        plan_dir = os.path.join(_BASE_DIR, 'PVS', 'Planned')
+# Column order of the end-of-month projection arrays.
+PROJECTION_FIELDS = ('schedule', 'production', 'run_rate', 'remaining_days')
 
-    planned_project_raw = _load_monthly_per_day_csv(os.path.join(plan_dir, '1_PVS_per_Project.csv'), start_month)
-    planned_sew_raw = _load_monthly_per_day_csv(os.path.join(plan_dir, '2_PVS_per_SEW.csv'), start_month)
-    planned_assy_raw = _load_monthly_per_day_csv(os.path.join(plan_dir, '3_PVS_per_ASSY.csv'), start_month)
 
-    produced_project_raw = _load_monthly_per_day_csv(os.path.join(prod_dir, '1_PVS_per_Project.csv'), start_month)
-    produced_sew_raw = _load_monthly_per_day_csv(os.path.join(prod_dir, '2_PVS_per_SEW.csv'), start_month)
-    produced_assy_raw = _load_monthly_per_day_csv(os.path.join(prod_dir, '3_PVS_per_ASSY.csv'), start_month)
+def _eom_projection(planned: SeriesMatrix, produced: SeriesMatrix, labels: list[str], as_of: date) -> np.ndarray:
+    """End-of-month projection per label as a (labels x PROJECTION_FIELDS) array.
 
-    if not (planned_project_raw or planned_sew_raw or planned_assy_raw or produced_project_raw or produced_sew_raw or produced_assy_raw):
-        return None
+    The run rate is the mean daily production over the last
+    ``PVS_PROJECTION_RUN_RATE_DAYS`` working days up to ``as_of``, where a
+    working day is one with any plan or production on the page. Remaining
+    days are the days after ``as_of`` on which the label is still planned;
+    the projection is MTD production plus run rate times remaining days.
+    """
+    month_start, month_end = _month_bounds(as_of)
+    plan = planned.reindex(month_start, month_end)
+    prod = produced.reindex(month_start, month_end)
+    plan_v = plan.take(labels)
+    prod_v = prod.take(labels)
+    cut = (as_of - month_start).days + 1
+    worked = (plan.values[:, :cut].sum(axis=0) > 0) | (prod.values[:, :cut].sum(axis=0) > 0)
+    recent = np.flatnonzero(worked)[-PVS_PROJECTION_RUN_RATE_DAYS:]
+    if len(recent):
+        run_rate = prod_v[:, recent].sum(axis=1) / len(recent)
+    else:
+        run_rate = np.zeros(len(labels), dtype=np.float64)
+    remaining = (plan_v[:, cut:] > 0).sum(axis=1).astype(np.float64)
+    projected = prod_v[:, :cut].sum(axis=1) + run_rate * remaining
+    out = np.column_stack([np.trunc(plan_v.sum(axis=1)), projected, run_rate, remaining])
+    return out.reshape(len(labels), len(PROJECTION_FIELDS))
 
-    master = _load_master_list(os.path.join(_BASE_DIR, 'PVS', 'master_list.csv'))
-    canonical_project = master.get('PROJECT') or []
-    canonical_sew = master.get('SEW') or []
-    canonical_assy = master.get('ASSY') or []
 
-    canon_proj_norm = {_norm_key(x) for x in canonical_project}
-    canon_sew_norm = {_norm_key(x) for x in canonical_sew}
-    canon_assy_norm = {_norm_key(x) for x in canonical_assy}
+def _projection_out(schedule, production, run_rate, remaining_days, adherence, adh_olk) -> dict[str, object]:
+    return {
+        'schedule': int(round(schedule)),
+        'production': round(production, 2),
+        'run_rate': round(run_rate, 2),
+        'remaining_days': int(remaining_days),
+        'adherence_pct': round(adherence, 1) if adherence == adherence else None,
+        'adh_olk_pct': round(adh_olk, 1),
+    }
 
-    plan_proj_norm = {_norm_key(k) for k in planned_project_raw.keys()}
-    plan_sew_norm = {_norm_key(k) for k in planned_sew_raw.keys()}
-    plan_assy_norm = {_norm_key(k) for k in planned_assy_raw.keys()}
-    prod_proj_norm = {_norm_key(k) for k in produced_project_raw.keys()}
-    prod_sew_norm = {_norm_key(k) for k in produced_sew_raw.keys()}
-    prod_assy_norm = {_norm_key(k) for k in produced_assy_raw.keys()}
 
-    if canonical_project:
-        missing = [c for c in canonical_project if _norm_key(c) not in plan_proj_norm]
-        if missing:
-            print(f"[CSV] Missing planned PROJECT rows: {missing}")
-        missing = [c for c in canonical_project if _norm_key(c) not in prod_proj_norm]
-        if missing:
-            print(f"[CSV] Missing production PROJECT rows: {missing}")
-        extra = [k for k in planned_project_raw.keys() if _norm_key(k) not in canon_proj_norm]
-        if extra:
-            print(f"[CSV] Extra planned PROJECT rows (not in master): {extra}")
-        extra = [k for k in produced_project_raw.keys() if _norm_key(k) not in canon_proj_norm]
-        if extra:
-            print(f"[CSV] Extra production PROJECT rows (not in master): {extra}")
-
-    if canonical_sew:
-        missing = [c for c in canonical_sew if _norm_key(c) not in plan_sew_norm]
-        if missing:
-            print(f"[CSV] Missing planned SEW rows: {missing}")
-        missing = [c for c in canonical_sew if _norm_key(c) not in prod_sew_norm]
-        if missing:
-            print(f"[CSV] Missing production SEW rows: {missing}")
-        extra = [k for k in planned_sew_raw.keys() if _norm_key(k) not in canon_sew_norm]
-        if extra:
-            print(f"[CSV] Extra planned SEW rows (not in master): {extra}")
-        extra = [k for k in produced_sew_raw.keys() if _norm_key(k) not in canon_sew_norm]
-        if extra:
-            print(f"[CSV] Extra production SEW rows (not in master): {extra}")
-
-    if canonical_assy:
-        missing = [c for c in canonical_assy if _norm_key(c) not in plan_assy_norm]
-        if missing:
-            print(f"[CSV] Missing planned ASSY rows: {missing}")
-        missing = [c for c in canonical_assy if _norm_key(c) not in prod_assy_norm]
-        if missing:
-            print(f"[CSV] Missing production ASSY rows: {missing}")
-        extra = [k for k in planned_assy_raw.keys() if _norm_key(k) not in canon_assy_norm]
-        if extra:
-            print(f"[CSV] Extra planned ASSY rows (not in master): {extra}")
-        extra = [k for k in produced_assy_raw.keys() if _norm_key(k) not in canon_assy_norm]
-        if extra:
-            print(f"[CSV] Extra production ASSY rows (not in master): {extra}")
-
-    planned_project = _canonicalize_series(planned_project_raw, canonical_project)
-    planned_sew = _canonicalize_series(planned_sew_raw, canonical_sew)
-    planned_assy = _canonicalize_series(planned_assy_raw, canonical_assy)
-    produced_project = _canonicalize_series(produced_project_raw, canonical_project)
-    produced_sew = _canonicalize_series(produced_sew_raw, canonical_sew)
-    produced_assy = _canonicalize_series(produced_assy_raw, canonical_assy)
-
-    mapping = load_map_csv(PVS_MAP_CSV)
-    olk_norm = _build_olk_norm_by_label(mapping, load_olk_csv(PVS_OLK_CSV))
-
-    def adherence(delta: float, schedule: float) -> float | None:
-        if schedule <= 0:
-            return None
-        pct = (delta / schedule) * 100.0
-        if pct > PVS_ADHERENCE_CLAMP:
-            return PVS_ADHERENCE_CLAMP
-        if pct < -PVS_ADHERENCE_CLAMP:
-            return -PVS_ADHERENCE_CLAMP
-        return pct
+def _window_out(schedule, production, delta, adherence) -> dict[str, object]:
+    return {
+        'schedule': schedule,
+        'production': round(production, 2),
+        'delta': round(delta, 2),
+        'adherence_pct': round(adherence, 1) if adherence == adherence else None,
+    }
+
+
+def _compute_row_metrics(
+    codes: list[str],
+    lines: list[str],
+    categories: list[str],
+    plan_w: np.ndarray,
+    prod_w: np.ndarray,
+    olk: np.ndarray,
+    projection: np.ndarray | None = None,
+    extra_windows: tuple[str, ...] = (),
+) -> tuple[list[dict[str, object]], dict[str, object], dict[str, dict[str, float]]]:
+    """Vectorized row metrics plus category totals.
+
+    ``plan_w``/``prod_w`` are (rows x METRIC_WINDOWS + extra_windows) window
+    sums aligned with ``codes``; the configured ``extra_windows`` columns are
+    returned under each row's ``windows`` map. ``olk`` is the monthly OLK
+    target per row. ``projection`` is the optional (rows x PROJECTION_FIELDS)
+    array from ``_eom_projection``. Returns the ``rows``, ``totals`` and
+    ``olk_totals`` payload sections.
+    """
+    n = len(codes)
+    width = len(METRIC_WINDOWS) + len(extra_windows)
+    schedule = np.trunc(plan_w).reshape(n, width)
+    production = np.asarray(prod_w, dtype=np.float64).reshape(n, width)
+    olk = np.asarray(olk, dtype=np.float64).reshape(n)
+    delta = production - schedule
+    adherence = _adherence_pct(delta, schedule)
+    mtd = METRIC_WINDOWS.index('mtd')
+    adh_olk = _olk_adherence_pct(production[:, mtd], olk)
+
+    sched_l = schedule.astype(np.int64).tolist()
+    prod_l = production.tolist()
+    delta_l = delta.tolist()
+    adh_l = adherence.tolist()
+    olk_l = olk.tolist()
+    adh_olk_l = adh_olk.tolist()
+    proj_l = _projection_rows(projection, olk)
 
     rows: list[dict[str, object]] = []
+    for i in range(n):
+        row: dict[str, object] = {'code': codes[i], 'line': lines[i], 'category': categories[i]}
+        for k in ('mtd', 'wtd', 'daily'):
+            j = METRIC_WINDOWS.index(k)
+            win = _window_out(sched_l[i][j], prod_l[i][j], delta_l[i][j], adh_l[i][j])
+            if k == 'mtd':
+                win = {'olk': int(round(olk_l[i])), 'adh_olk_pct': round(adh_olk_l[i], 1), **win}
+            row[k] = win
+        if extra_windows:
+            row['windows'] = {
+                name: _window_out(sched_l[i][j], prod_l[i][j], delta_l[i][j], adh_l[i][j])
+                for j, name in enumerate(extra_windows, start=len(METRIC_WINDOWS))
+            }
+        if proj_l is not None:
+            row['projection'] = _projection_out(*proj_l[i])
+        rows.append(row)
+
+    # Totals are built from the rounded per-row values shown on the dashboard.
+    buckets = ('sew', 'assy', 'other')
+    cat_ids = np.fromiter(
+        (buckets.index(c.lower()) if c.lower() in buckets[:2] else 2 for c in categories),
+        dtype=np.intp,
+        count=n,
+    )
+    prod_rounded = np.array([[round(v, 2) for v in r] for r in prod_l], dtype=np.float64).reshape(n, width)
+    sched_cat = _segment_sum(cat_ids, schedule, len(buckets))
+    prod_cat = _segment_sum(cat_ids, prod_rounded, len(buckets))
+    count_cat = np.bincount(cat_ids, minlength=len(buckets))
+    zeros = np.zeros(n, dtype=np.intp)
+    sched_all = _segment_sum(zeros, schedule, 1)[0]
+    prod_all = _segment_sum(zeros, prod_rounded, 1)[0]
+
+    def _bucket(sched_row, prod_row, count) -> dict[str, dict[str, object]]:
+        out = {
+            k: {
+                'schedule': int(sched_row[METRIC_WINDOWS.index(k)]),
+                'production': float(prod_row[METRIC_WINDOWS.index(k)]) if count else 0,
+            }
+            for k in ('mtd', 'wtd', 'daily')
+        }
+        if extra_windows:
+            out['windows'] = {
+                name: {'schedule': int(sched_row[j]), 'production': float(prod_row[j]) if count else 0}
+                for j, name in enumerate(extra_windows, start=len(METRIC_WINDOWS))
+            }
+        return out
 
-    label_order_sew = {_norm_key(v): i for i, v in enumerate(canonical_sew)} if canonical_sew else {}
-    label_order_assy = {_norm_key(v): i for i, v in enumerate(canonical_assy)} if canonical_assy else {}
-
-    def _sorted_labels(category: str, labels: set[str]) -> list[str]:
-        if category == 'SEW' and label_order_sew:
-            return sorted(labels, key=lambda s: (label_order_sew.get(_norm_key(str(s)), 10**9), _norm_key(str(s))))
-        if category == 'ASSY' and label_order_assy:
-            return sorted(labels, key=lambda s: (label_order_assy.get(_norm_key(str(s)), 10**9), _norm_key(str(s))))
-        return sorted(labels, key=lambda s: _norm_key(str(s)))
-
-    def _append_rows(category: str, planned: dict[str, dict[date, float]], produced: dict[str, dict[date, float]]):
-        labels = _sorted_labels(category, set(planned.keys()) | set(produced.keys()))
-        for label in labels:
-            plan_days = planned.get(label, {})
-            prod_days = produced.get(label, {})
-
-            plan_day = int(aggregate(plan_days, daily_start, as_of))
-            plan_wtd = int(aggregate(plan_days, start_week, as_of))
-            plan_mtd = int(aggregate(plan_days, start_month, as_of))
-
-            prod_day = float(aggregate(prod_days, daily_start, as_of))
-            prod_wtd = float(aggregate(prod_days, start_week, as_of))
-            prod_mtd = float(aggregate(prod_days, start_month, as_of))
-
-            d_day = prod_day - plan_day
-            d_wtd = prod_wtd - plan_wtd
-            d_mtd = prod_mtd - plan_mtd
-
-            line_olk = float(_olk_lookup(str(label), olk_norm) or 0.0)
-            if line_olk > 0:
-                adh_olk_pct = (prod_mtd / line_olk) * 100.0
+    totals: dict[str, object] = {
+        name: _bucket(sched_cat[b], prod_cat[b], count_cat[b]) for b, name in enumerate(buckets)
+    }
+    totals['all'] = _bucket(sched_all, prod_all, n)
+
+    olk_rounded = np.array([int(round(v)) for v in olk_l], dtype=np.float64)
+    has_olk = olk_rounded != 0
+    olk_cat = _segment_sum(cat_ids[has_olk], olk_rounded[has_olk], len(buckets))[:, 0]
+    olk_prod_cat = _segment_sum(cat_ids[has_olk], prod_rounded[has_olk, mtd], len(buckets))[:, 0]
+    olk_adh_cat = _olk_adherence_pct(olk_prod_cat, olk_cat)
+    olk_totals = {
+        name: {
+            'olk': int(round(float(olk_cat[b]))),
+            'production': round(float(olk_prod_cat[b]), 2),
+            'adh_olk_pct': round(float(olk_adh_cat[b]), 1),
+        }
+        for b, name in enumerate(buckets[:2])
+    }
+    return rows, totals, olk_totals
+
+
+def _projection_rows(projection: np.ndarray | None, olk: np.ndarray) -> list[list[float]] | None:
+    """``_projection_out`` arguments per row: the projection fields plus both adherences."""
+    if projection is None:
+        return None
+    projection = np.asarray(projection, dtype=np.float64).reshape(-1, len(PROJECTION_FIELDS))
+    schedule, production = projection[:, 0], projection[:, 1]
+    adherence = _adherence_pct(production - schedule, schedule)
+    adh_olk = _olk_adherence_pct(production, np.asarray(olk, dtype=np.float64).reshape(-1))
+    return np.column_stack([projection, adherence, adh_olk]).tolist()
+
+
+def _compute_group_totals(
+    table: GroupTable,
+    members: list[str],
+    plan_w: np.ndarray,
+    prod_w: np.ndarray,
+    olk: np.ndarray,
+    projection: np.ndarray | None = None,
+    extra_windows: tuple[str, ...] = (),
+) -> list[dict[str, object]]:
+    """Roll member window sums up to groups with one segmented reduction.
+
+    ``table`` maps each of ``members`` to its group and (group, OLK project
+    key) pair; columns of ``plan_w``/``prod_w`` follow METRIC_WINDOWS +
+    ``extra_windows``. A group's OLK target is the sum over its distinct
+    project keys of the largest member OLK for that key. Member projections
+    are summed per group; a group's remaining days are those of its
+    longest-running member. Groups are returned sorted by name.
+    """
+    if not members:
+        return []
+    member_groups, pair_ids = table.index(members)
+    names = sorted((table.groups[g], g) for g in np.unique(member_groups).tolist())
+    n_groups = len(names)
+    seg_of = np.zeros(len(table.groups), dtype=np.intp)
+    seg_of[[g for _name, g in names]] = np.arange(n_groups)
+    group_ids = seg_of[member_groups]
+    sched = _segment_sum(group_ids, np.asarray(plan_w, dtype=np.float64), n_groups)
+    prod = _segment_sum(group_ids, np.asarray(prod_w, dtype=np.float64), n_groups)
+    delta = prod - sched
+    adherence = _adherence_pct(delta, sched)
+
+    # Pairs of groups absent from ``members`` keep a zero maximum.
+    pair_max = np.zeros(int(pair_ids.max()) + 1, dtype=np.float64)
+    np.maximum.at(pair_max, pair_ids, np.asarray(olk, dtype=np.float64))
+    pair_group = seg_of[np.asarray(table.pair_group[:len(pair_max)], dtype=np.intp)]
+    olk_group = np.bincount(pair_group, weights=pair_max, minlength=n_groups)
+    mtd = METRIC_WINDOWS.index('mtd')
+    adh_olk = _olk_adherence_pct(prod[:, mtd], olk_group)
+    proj_l = None
+    if projection is not None:
+        projection = np.asarray(projection, dtype=np.float64).reshape(-1, len(PROJECTION_FIELDS))
+        proj_group = _segment_sum(group_ids, projection, n_groups)
+        remaining = np.zeros(n_groups, dtype=np.float64)
+        np.maximum.at(remaining, group_ids, projection[:, PROJECTION_FIELDS.index('remaining_days')])
+        proj_group[:, PROJECTION_FIELDS.index('remaining_days')] = remaining
+        proj_l = _projection_rows(proj_group, olk_group)
+
+    sched_l, prod_l, delta_l, adh_l = sched.tolist(), prod.tolist(), delta.tolist(), adherence.tolist()
+    out: list[dict[str, object]] = []
+    for g, (name, _gid) in enumerate(names):
+        agg: dict[str, object] = {'group': name}
+        for k in ('mtd', 'wtd', 'daily'):
+            j = METRIC_WINDOWS.index(k)
+            win = _window_out(int(round(sched_l[g][j])), prod_l[g][j], delta_l[g][j], adh_l[g][j])
+            if k == 'mtd':
+                win['olk'] = int(round(float(olk_group[g])))
+                win['adh_olk_pct'] = round(float(adh_olk[g]), 1)
+            agg[k] = win
+        if extra_windows:
+            agg['windows'] = {
+                name: _window_out(int(round(sched_l[g][j])), prod_l[g][j], delta_l[g][j], adh_l[g][j])
+                for j, name in enumerate(extra_windows, start=len(METRIC_WINDOWS))
+            }
+        if proj_l is not None:
+            agg['projection'] = _projection_out(*proj_l[g])
+        out.append(agg)
+    return out
+
+
+def _row_window_values(row: dict[str, object], field: str, extra_windows: tuple[str, ...] = ()) -> list[float]:
+    """One row's ``field`` per window, in METRIC_WINDOWS + ``extra_windows`` column order."""
+    windows = row.get('windows') or {}
+    return [row[k][field] for k in METRIC_WINDOWS] + [windows[name][field] for name in extra_windows]  # type: ignore[index]
+
+
+def _page_store_files() -> list[str]:
+    """Relative paths making up one generation: the binary series store plus the optional CSV export."""
+    files = [
+        f"series/{side}_{kind}.{ext}"
+        for side in ('plan', 'prod')
+        for kind in PAGE_KINDS
+        for ext in ('npy', 'json')
+    ]
+    if PVS_EXPORT_PAGE_CSVS:
+        files.extend(f"{sub}/{name}" for sub in PAGE_CSV_DIRS for name in PAGE_CSV_NAMES.values())
+    return files
+
+
+def _publish_page_store(rendered: dict[str, str | bytes]):
+    """Publish rendered page files (``{'series/plan_SEW.npy': content, ...}``) as a new generation.
+
+    Files whose content hash matches the previous generation are hard-linked
+    (or copied) instead of rewritten and are not fsynced; pages this run did
+    not render are carried over, so every generation is complete. When
+    nothing changed at all, no generation is created.
+    """
+    prev_dir = _current_generation_dir()
+    prev_root = prev_dir or os.path.join(_BASE_DIR, 'PVS')
+    prev_files = _generation_manifest(prev_dir).get('files') or {}
+
+    hashes = {rel: content_hash(content) for rel, content in rendered.items()}
+    if prev_dir and all(prev_files.get(rel) == digest for rel, digest in hashes.items()):
+        print(f"[PVS] Page store unchanged; keeping generation {os.path.basename(prev_dir)}")
+        return
+
+    gen_dir = _new_generation_dir()
+    try:
+        files: dict[str, str] = {}
+        written = 0
+        for rel in _page_store_files():
+            dst_path = os.path.join(gen_dir, *rel.split('/'))
+            src_path = os.path.join(prev_root, *rel.split('/'))
+            digest = hashes.get(rel)
+            if digest is not None and digest != (prev_files.get(rel) or _file_content_hash(src_path)):
+                content = rendered[rel]
+                os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+                with open(dst_path, 'wb') as f:
+                    f.write(content.encode('utf-8') if isinstance(content, str) else content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                written += 1
+            elif os.path.exists(src_path):
+                os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+                try:
+                    os.link(src_path, dst_path)
+                except OSError:
+                    shutil.copy2(src_path, dst_path)
+                digest = digest or prev_files.get(rel) or _file_content_hash(src_path)
             else:
-                adh_olk_pct = 0.0
-
-            adh_mtd = adherence(d_mtd, plan_mtd)
-            adh_wtd = adherence(d_wtd, plan_wtd)
-            adh_day = adherence(d_day, plan_day)
-
-            rows.append({
-                'code': str(label),
-                'line': str(label),
-                'category': category,
-                'mtd': {
-                    'olk': int(round(line_olk)),
-                    'adh_olk_pct': round(adh_olk_pct, 1),
-                    'schedule': plan_mtd,
-                    'production': round(prod_mtd, 2),
-                    'delta': round(d_mtd, 2),
-                    'adherence_pct': round(adh_mtd, 1) if adh_mtd is not None else None,
-                },
-                'wtd': {
-                    'schedule': plan_wtd,
-                    'production': round(prod_wtd, 2),
-                    'delta': round(d_wtd, 2),
-                    'adherence_pct': round(adh_wtd, 1) if adh_wtd is not None else None,
-                },
-                'daily': {
-                    'schedule': plan_day,
-                    'production': round(prod_day, 2),
-                    'delta': round(d_day, 2),
-                    'adherence_pct': round(adh_day, 1) if adh_day is not None else None,
-                },
-            })
+                continue
+            files[rel] = digest
 
-    _append_rows('SEW', planned_sew, produced_sew)
-    _append_rows('ASSY', planned_assy, produced_assy)
+        manifest = {
+            'generation': os.path.basename(gen_dir),
+            'content_hash': content_hash(json.dumps(files, sort_keys=True)),
+            'files': files,
+        }
+        with open(os.path.join(gen_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        print(f"[PVS] Wrote {written} changed page file(s), reused {len(files) - written}")
+        _publish_generation(gen_dir)
+    except Exception as e:
+        print(f"[PVS] WARNING: Could not publish page store: {e}")
+        shutil.rmtree(gen_dir, ignore_errors=True)
 
-    category_order = {'SEW': 0, 'ASSY': 1, 'OTHER': 2}
-    def _row_sort_key(r: dict[str, object]):
-        cat = str(r.get('category', 'OTHER'))
-        line = str(r.get('line', ''))
-        if cat == 'SEW' and label_order_sew:
-            return (category_order.get(cat, 2), label_order_sew.get(_norm_key(line), 10**9), line)
-        if cat == 'ASSY' and label_order_assy:
-            return (category_order.get(cat, 2), label_order_assy.get(_norm_key(line), 10**9), line)
-        return (category_order.get(cat, 2), line)
-    rows.sort(key=_row_sort_key)
 
-    expected_anoms: list[str] = []
-    expected_sew_norm = {_norm_key(x) for x in canonical_sew}
-    expected_assy_norm = {_norm_key(x) for x in canonical_assy}
+def _export_page_store(
+    planned_pages: dict[str, SeriesMatrix] | None,
+    produced_rows: dict[str, list[tuple[str, list[float]]]] | None,
+    month_start: date,
+    produced_month: date | None = None,
+):
+    """Publish this run's page series as a new generation.
+
+    Always writes the binary series store (series/{plan,prod}_<PAGE>.npy with
+    a .json label index); the Planned/{Day,Week,Month} and Production CSVs
+    are added when behavior.exportPageCsvsOnCompute is on. The same series
+    are appended to the month-partitioned history store, plan from
+    ``month_start`` onward and production filed under ``produced_month``
+    (the calendar month the SQL pivot covered). Also refreshes the LTP ref extract.
+    """
+    if produced_rows or planned_pages:
+        rendered: dict[str, str | bytes] = {}
+        try:
+            if produced_rows:
+                for kind, rows in produced_rows.items():
+                    month = _page_series_from_rows(rows, month_start)
+                    rendered[f"series/prod_{kind}.npy"] = _render_series_npy(month)
+                    rendered[f"series/prod_{kind}.json"] = _render_series_index(month)
+                    if PVS_EXPORT_PAGE_CSVS:
+                        rendered[f"Production/{PAGE_CSV_NAMES[kind]}"] = _render_production_csv(rows)
+            if planned_pages:
+                for kind in PAGE_KINDS:
+                    month = _month_page_series(planned_pages[kind], month_start)
+                    rendered[f"series/plan_{kind}.npy"] = _render_series_npy(month)
+                    rendered[f"series/plan_{kind}.json"] = _render_series_index(month)
+                if PVS_EXPORT_PAGE_CSVS:
+                    for sub, render in (
+                        ('Day', _render_monthly_csv_by_label),
+                        ('Week', _render_weekly_csv_by_label),
+                        ('Month', _render_month_total_csv_by_label),
+                    ):
+                        for kind in PAGE_KINDS:
+                            rendered[f"Planned/{sub}/{PAGE_CSV_NAMES[kind]}"] = render(planned_pages[kind], month_start)
+        except Exception as e:
+            print(f"[PVS] WARNING: Could not render page store: {e}")
+            rendered = {}
+
+        if rendered:
+            with _PAGE_STORE_LOCK:
+                _publish_page_store(rendered)
+
+    if PVS_HISTORY_ENABLED:
+        try:
+            for kind in PAGE_KINDS:
+                if planned_pages and kind in planned_pages and planned_pages[kind].end >= month_start:
+                    # The LTP only states the current plan; months already past keep the plan recorded then.
+                    HISTORY.append('plan', kind, planned_pages[kind], (month_start, planned_pages[kind].end))
+                if produced_rows and kind in produced_rows:
+                    prod_month = produced_month or month_start
+                    HISTORY.append('prod', kind, _page_series_from_rows(produced_rows[kind], prod_month))
+        except Exception as e:
+            print(f"[HISTORY] WARNING: Could not append to history store: {e}")
+
+    if PVS_REGENERATE_INPUTS and PVS_EXPORT_LTP_REF_EXTRACT:
+        try:
+            _export_ltp_ref_extract_csv(
+                PVS_LTP_REF_EXTRACT_CSV,
+                PVS_LTP_DIR,
+                PVS_LTP_SHEET,
+                PVS_LTP_LABEL,
+                PVS_LTP_REF_CSV,
+                PVS_LTP_KEYWORDS,
+                PVS_LTP_DATE_ROW,
+                PVS_LTP_DATE_START_COL,
+                PVS_LTP_DATE_END_COL,
+            )
+        except Exception as e:
+            print(f"[LTP-EXTRACT] WARNING: export failed: {e}")
+
+
+# Background page-store, history and diagnostics writes still in flight. They
+# run on daemon threads, so anything that exits after compute_metrics() must
+# flush_exports() first (registered with atexit for plain script exits).
+_BACKGROUND_WRITES: list[threading.Thread] = []
+_BACKGROUND_WRITES_LOCK = threading.Lock()
+
+
+def _start_background_write(target, name: str) -> threading.Thread:
+    t = threading.Thread(target=target, name=name, daemon=True)
+    with _BACKGROUND_WRITES_LOCK:
+        _BACKGROUND_WRITES[:] = [w for w in _BACKGROUND_WRITES if w.is_alive()]
+        _BACKGROUND_WRITES.append(t)
+    t.start()
+    return t
+
+
+def flush_exports(timeout: float | None = None) -> None:
+    """Wait for pending background page-store, history and diagnostics writes."""
+    with _BACKGROUND_WRITES_LOCK:
+        pending = list(_BACKGROUND_WRITES)
+    for t in pending:
+        t.join(timeout)
+
+
+atexit.register(flush_exports)
+
+
+def _export_page_store_async(
+    planned_pages,
+    produced_rows,
+    month_start: date,
+    produced_month: date | None = None,
+) -> threading.Thread:
+    """Run _export_page_store on a background thread so file writes stay off the request path."""
+    def _run():
+        try:
+            _export_page_store(planned_pages, produced_rows, month_start, produced_month)
+        except Exception as e:
+            print(f"[PVS] WARNING: page store export failed: {e}")
+
+    return _start_background_write(_run, 'pvs-page-export')
+
+
+def _load_page_series(
+    planned_pages: dict[str, SeriesMatrix] | None,
+    produced_pages: dict[str, SeriesMatrix] | None,
+    start_month: date,
+) -> tuple[dict[str, SeriesMatrix], dict[str, SeriesMatrix]]:
+    """Page series for the metrics engine, falling back to the published page store.
+
+    Pages handed over in memory by compute_metrics() are used as-is; any page
+    missing from the handoff (LTP or SQL stage failed or disabled) is
+    memory-mapped from the current generation's binary store, or parsed
+    from its CSV export when the store has no such page (legacy PVS/ folders).
+    """
+    root = _page_store_root()
+    prod_dir = os.path.join(root, 'Production')
+    plan_dir = os.path.join(root, 'Planned', 'Day')
+    if not os.path.exists(os.path.join(plan_dir, PAGE_CSV_NAMES['PROJECT'])):
+        plan_dir = os.path.join(root, 'Planned')
+    days_in_month = calendar.monthrange(start_month.year, start_month.month)[1]
+    month_end = start_month.replace(day=days_in_month)
+
+    def _stored(side: str, kind: str, csv_dir: str) -> SeriesMatrix:
+        series = _load_series_npy(os.path.join(root, 'series', f"{side}_{kind}.npy"))
+        if series is not None:
+            return series.reindex(start_month, month_end)
+        return _load_monthly_per_day_csv(os.path.join(csv_dir, PAGE_CSV_NAMES[kind]), start_month)
+
+    planned: dict[str, SeriesMatrix] = {}
+    produced: dict[str, SeriesMatrix] = {}
+    for kind in PAGE_KINDS:
+        if planned_pages is not None and kind in planned_pages:
+            planned[kind] = planned_pages[kind]
+        else:
+            planned[kind] = _stored('plan', kind, plan_dir)
+        if produced_pages is not None and kind in produced_pages:
+            produced[kind] = produced_pages[kind]
+        else:
+            produced[kind] = _stored('prod', kind, prod_dir)
+    return planned, produced
+
+
+# Data-quality report of the latest metrics run; rebuilt only when its inputs change.
+PVS_QUALITY_REPORT_JSON = os.path.join(_BASE_DIR, 'PVS', 'Debug', 'data_quality.json')
+PVS_DIAGNOSTIC_CSV = os.path.join(_BASE_DIR, 'PVS', 'Debug', 'dashboard_diagnostic.csv')
+# Published whole under _QUALITY_LOCK and never modified afterwards
+_QUALITY_REPORT: dict[str, object] = {}
+_QUALITY_LOCK = threading.Lock()
+
+
+def _series_digest(series: SeriesMatrix) -> bytes:
+    head = json.dumps([series.labels, series.start.isoformat()]).encode('utf-8')
+    return head + np.ascontiguousarray(series.values).tobytes()
+
+
+def _build_quality_report(
+    as_of: date,
+    inputs_key: str,
+    master: dict[str, list[str]],
+    planned: dict[str, SeriesMatrix],
+    produced: dict[str, SeriesMatrix],
+    rows: list[dict[str, object]],
+) -> dict[str, object]:
+    """Missing/extra rows against master_list.csv, unmapped LTP rows and zero anomalies.
+
+    Findings are printed as they were on every request before and returned
+    as a structured report.
+    """
+    pages: dict[str, dict[str, list[str]]] = {}
+    for kind in PAGE_KINDS:
+        canonical = master.get(kind) or []
+        if not canonical:
+            continue
+        canon_norm = LABELS.norm_ids(canonical)
+        found: dict[str, list[str]] = {}
+        for side, series in (('planned', planned.get(kind)), ('production', produced.get(kind))):
+            labels = series.labels if series is not None else []
+            have = LABELS.norm_ids(labels)
+            found[f"missing_{side}"] = [c for c in canonical if LABELS.norm_id(c) not in have]
+            found[f"extra_{side}"] = [k for k in labels if LABELS.norm_id(k) not in canon_norm]
+        for side in ('planned', 'production'):
+            if found[f"missing_{side}"]:
+                print(f"[CSV] Missing {side} {kind} rows: {found[f'missing_{side}']}")
+        for side in ('planned', 'production'):
+            if found[f"extra_{side}"]:
+                print(f"[CSV] Extra {side} {kind} rows (not in master): {found[f'extra_{side}']}")
+        pages[kind] = found
+
+    anomalies: list[dict[str, object]] = []
+    expected = {kind: LABELS.norm_ids(master.get(kind) or []) for kind in ('SEW', 'ASSY')}
     for r in rows:
         cat = str(r.get('category', ''))
         line = str(r.get('line', ''))
-        if cat == 'SEW' and expected_sew_norm and _norm_key(line) not in expected_sew_norm:
-            continue
-        if cat == 'ASSY' and expected_assy_norm and _norm_key(line) not in expected_assy_norm:
+        if expected.get(cat) and LABELS.norm_id(line) not in expected[cat]:
             continue
         for win_key in ('daily', 'wtd', 'mtd'):
             win = r.get(win_key) or {}
@@ -1928,208 +3664,382 @@ def _compute_metrics_from_page_csvs(
                 continue
             sched = float(win.get('schedule', 0) or 0)
             prod = float(win.get('production', 0) or 0)
-            if sched <= 0 and prod > 0:
-                expected_anoms.append(f"{cat} {line} {win_key}: schedule=0 production={prod}")
-            elif sched > 0 and prod <= 0:
-                expected_anoms.append(f"{cat} {line} {win_key}: schedule={sched} production=0")
-    if expected_anoms:
+            if (sched <= 0 and prod > 0) or (sched > 0 and prod <= 0):
+                anomalies.append({'category': cat, 'line': line, 'window': win_key, 'schedule': sched, 'production': prod})
+    if anomalies:
         print('[CSV] Zero anomalies (expected rows):')
-        for s in expected_anoms:
-            print(f"[CSV] {s}")
-
-    def _empty_bucket():
-        return {'schedule': 0, 'production': 0}
+        for a in anomalies:
+            if a['schedule'] <= 0:
+                print(f"[CSV] {a['category']} {a['line']} {a['window']}: schedule=0 production={a['production']}")
+            else:
+                print(f"[CSV] {a['category']} {a['line']} {a['window']}: schedule={a['schedule']} production=0")
 
-    totals = {
-        'sew': {'mtd': _empty_bucket(), 'wtd': _empty_bucket(), 'daily': _empty_bucket()},
-        'assy': {'mtd': _empty_bucket(), 'wtd': _empty_bucket(), 'daily': _empty_bucket()},
-        'other': {'mtd': _empty_bucket(), 'wtd': _empty_bucket(), 'daily': _empty_bucket()},
-        'all': {'mtd': _empty_bucket(), 'wtd': _empty_bucket(), 'daily': _empty_bucket()},
+    ltp_unmapped = [{'loader': loader, **u} for loader, items in _LTP_UNMAPPED.items() for u in items]
+    return {
+        'success': True,
+        'date': as_of.strftime('%Y-%m-%d'),
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'inputs_key': inputs_key,
+        'summary': {
+            'missing_rows': sum(len(v) for f in pages.values() for k, v in f.items() if k.startswith('missing_')),
+            'extra_rows': sum(len(v) for f in pages.values() for k, v in f.items() if k.startswith('extra_')),
+            'ltp_unmapped': len(ltp_unmapped),
+            'zero_anomalies': len(anomalies),
+        },
+        'pages': pages,
+        'ltp_unmapped': ltp_unmapped,
+        'zero_anomalies': anomalies,
     }
 
-    olk_totals = {
-        'sew': {'olk': 0.0, 'production': 0.0},
-        'assy': {'olk': 0.0, 'production': 0.0},
+
+def _data_quality_stage(
+    as_of: date,
+    master: dict[str, list[str]],
+    planned: dict[str, SeriesMatrix],
+    produced: dict[str, SeriesMatrix],
+    rows: list[dict[str, object]],
+) -> dict[str, object]:
+    """Return the data-quality report, rebuilding it only when its inputs changed.
+
+    The inputs key covers what the findings are read from: the report date,
+    the master list, the page labels, the unmapped LTP rows and the metric
+    rows. Series values only reach the report through the rows, so they are
+    not hashed themselves.
+    """
+    global _QUALITY_REPORT
+    inputs_key = content_hash(json.dumps([
+        as_of.isoformat(),
+        master,
+        {side: {kind: pages[kind].labels for kind in pages} for side, pages in (('plan', planned), ('prod', produced))},
+        _LTP_UNMAPPED,
+        rows,
+    ], sort_keys=True, default=str))
+    with _QUALITY_LOCK:
+        report = _QUALITY_REPORT
+    if report.get('inputs_key') == inputs_key:
+        return report
+    report = _build_quality_report(as_of, inputs_key, master, planned, produced, rows)
+    with _QUALITY_LOCK:
+        _QUALITY_REPORT = report
+    return report
+
+
+def _latest_quality_report() -> dict[str, object]:
+    with _QUALITY_LOCK:
+        return _QUALITY_REPORT
+
+
+def _load_quality_report(path: str = PVS_QUALITY_REPORT_JSON) -> dict[str, object]:
+    """Last written report, for requests served before this process computed one."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _render_diagnostic_csv(group_totals: list[dict[str, object]], rows: list[dict[str, object]]) -> str:
+    with io.StringIO() as df:
+        df.write('Page,Label,Daily_Sched,Daily_Prod,Daily_Delta,WTD_Sched,WTD_Prod,WTD_Delta,MTD_Sched,MTD_Prod,MTD_Delta,MTD_Adh%,OLK,OLK_Adh%\n')
+        # Page 1 – PROJECT group totals
+        for gt in group_totals:
+            name = gt.get('group', '')
+            mtd = gt.get('mtd', {})
+            wtd = gt.get('wtd', {})
+            daily = gt.get('daily', {})
+            df.write(','.join([
+                'PROJECT', str(name),
+                str(daily.get('schedule', 0)), f"{daily.get('production', 0):.2f}", f"{daily.get('delta', 0):.2f}",
+                str(wtd.get('schedule', 0)), f"{wtd.get('production', 0):.2f}", f"{wtd.get('delta', 0):.2f}",
+                str(mtd.get('schedule', 0)), f"{mtd.get('production', 0):.2f}", f"{mtd.get('delta', 0):.2f}",
+                str(mtd.get('adherence_pct', '') if mtd.get('adherence_pct') is not None else ''),
+                str(mtd.get('olk', 0)), str(mtd.get('adh_olk_pct', 0)),
+            ]) + '\n')
+        # Pages 2 & 3 – SEW / ASSY detail rows
+        for r in rows:
+            cat = str(r.get('category', ''))
+            line = str(r.get('line', ''))
+            mtd = r.get('mtd', {})
+            wtd = r.get('wtd', {})
+            daily = r.get('daily', {})
+            df.write(','.join([
+                cat, line,
+                str(daily.get('schedule', 0)), f"{daily.get('production', 0):.2f}", f"{daily.get('delta', 0):.2f}",
+                str(wtd.get('schedule', 0)), f"{wtd.get('production', 0):.2f}", f"{wtd.get('delta', 0):.2f}",
+                str(mtd.get('schedule', 0)), f"{mtd.get('production', 0):.2f}", f"{mtd.get('delta', 0):.2f}",
+                str(mtd.get('adherence_pct', '') if mtd.get('adherence_pct') is not None else ''),
+                str(mtd.get('olk', 0)), str(mtd.get('adh_olk_pct', 0)),
+            ]) + '\n')
+        return df.getvalue()
+
+
+def _write_diagnostics(quality: dict[str, object], group_totals, rows) -> None:
+    os.makedirs(os.path.dirname(PVS_DIAGNOSTIC_CSV), exist_ok=True)
+    try:
+        if write_if_changed(PVS_DIAGNOSTIC_CSV, _render_diagnostic_csv(group_totals, rows)):
+            print(f"[DIAG] Wrote diagnostic CSV: {PVS_DIAGNOSTIC_CSV}")
+        else:
+            print(f"[DIAG] Diagnostic CSV unchanged: {PVS_DIAGNOSTIC_CSV}")
+    except Exception as e:
+        print(f"[DIAG] WARNING: Could not write diagnostic CSV: {e}")
+    try:
+        if write_if_changed(PVS_QUALITY_REPORT_JSON, json.dumps(quality, indent=1)):
+            print(f"[DIAG] Wrote data-quality report: {PVS_QUALITY_REPORT_JSON}")
+    except Exception as e:
+        print(f"[DIAG] WARNING: Could not write data-quality report: {e}")
+
+
+# Latest diagnostics waiting for the writer. At most one writer thread runs; it
+# drains this slot until empty, so runs never write the files concurrently and a
+# run superseded before its turn is skipped.
+_DIAG_PENDING: tuple | None = None
+_DIAG_WRITER: threading.Thread | None = None
+_DIAG_LOCK = threading.Lock()
+
+
+def _write_diagnostics_async(quality: dict[str, object], group_totals, rows) -> threading.Thread:
+    """Hand the diagnostic CSV and data-quality report to the background diagnostics writer."""
+    global _DIAG_PENDING, _DIAG_WRITER
+    with _DIAG_LOCK:
+        _DIAG_PENDING = (quality, group_totals, rows)
+        if _DIAG_WRITER is None:
+            _DIAG_WRITER = _start_background_write(_drain_diagnostics, 'pvs-diagnostics')
+        return _DIAG_WRITER
+
+
+def _drain_diagnostics() -> None:
+    global _DIAG_PENDING, _DIAG_WRITER
+    while True:
+        with _DIAG_LOCK:
+            payload, _DIAG_PENDING = _DIAG_PENDING, None
+            if payload is None:
+                _DIAG_WRITER = None
+                return
+        try:
+            _write_diagnostics(*payload)
+        except Exception as e:
+            print(f"[DIAG] WARNING: diagnostics write failed: {e}")
+
+
+def _compute_metrics_from_pages(
+    as_of: date,
+    daily_start: date,
+    start_week: date,
+    start_month: date,
+    planned_pages: dict[str, SeriesMatrix] | None = None,
+    produced_pages: dict[str, SeriesMatrix] | None = None,
+) -> dict[str, object] | None:
+    planned_raw, produced_raw = _load_page_series(planned_pages, produced_pages, start_month)
+    if not any(len(planned_raw[kind]) or len(produced_raw[kind]) for kind in PAGE_KINDS):
+        return None
+
+    master = _load_master_list(PVS_MASTER_LIST_CSV)
+    planned = {kind: _canonicalize_series(planned_raw[kind], master.get(kind) or []) for kind in PAGE_KINDS}
+    produced = {kind: _canonicalize_series(produced_raw[kind], master.get(kind) or []) for kind in PAGE_KINDS}
+
+    global _LATEST_PAGES
+    _LATEST_PAGES = {'plan': dict(planned), 'prod': dict(produced)}
+
+    # Windows reaching back before this month read the earlier days from history.
+    extra_bounds = _extra_window_bounds(as_of)
+    history_start = min([start_month] + [lo for lo, _hi in extra_bounds.values()])
+    if history_start < start_month:
+        for kind in PAGE_KINDS:
+            planned[kind] = _with_history(planned[kind], 'plan', kind, history_start, master.get(kind) or [])
+            produced[kind] = _with_history(produced[kind], 'prod', kind, history_start, master.get(kind) or [])
+
+    rows, totals, olk_totals_out, group_totals = _metrics_from_series(
+        as_of, (daily_start, start_week, start_month), planned, produced, master, _olk_norm_by_label(),
+    )
+
+    quality = _data_quality_stage(as_of, master, planned_raw, produced_raw, rows)
+    _write_diagnostics_async(quality, group_totals, rows)
+
+    out: dict[str, object] = {
+        'success': True,
+        'date': as_of.strftime('%Y-%m-%d'),
+        'rows': rows,
+        'totals': totals,
+        'group_totals': group_totals,
+        'olk_totals': olk_totals_out,
     }
+    if extra_bounds:
+        out['window_coverage'] = _window_coverage(as_of, start_month, PAGE_KINDS)
+    return out
 
-    def _accumulate(bucket: dict, key: str, sched: int | float, prod: int | float) -> None:
-        b = bucket[key]
-        b['schedule'] += int(sched or 0)
-        b['production'] += float(prod or 0.0)
 
-    for r in rows:
-        cat = str(r.get('category', 'OTHER'))
-        _accumulate(totals['all'], 'mtd', r['mtd']['schedule'], r['mtd']['production'])
-        _accumulate(totals['all'], 'wtd', r['wtd']['schedule'], r['wtd']['production'])
-        _accumulate(totals['all'], 'daily', r['daily']['schedule'], r['daily']['production'])
-
-        if cat == 'SEW':
-            bucket = totals['sew']
-            olk_key = 'sew'
-        elif cat == 'ASSY':
-            bucket = totals['assy']
-            olk_key = 'assy'
-        else:
-            bucket = totals['other']
-            olk_key = None
+def _metrics_from_series(
+    as_of: date,
+    window_starts: tuple[date, date, date],
+    planned: dict[str, SeriesMatrix],
+    produced: dict[str, SeriesMatrix],
+    master: dict[str, list[str]],
+    olk_norm: dict[str, float],
+    sums: dict[tuple[str, str], WindowSums] | None = None,
+    labels: dict[str, list[str]] | None = None,
+):
+    """(rows, totals, olk_totals, group_totals) for ``as_of`` from canonicalized page series.
+
+    ``window_starts`` are the daily/WTD/MTD starts. ``sums`` caches the
+    prefix sums of each (side, page) series, so several report dates over
+    the same series build them once; ``labels`` overrides each page's row
+    labels (default: every label of its plan and production series).
+    """
+    sums = {} if sums is None else sums
+
+    def _sums(side: str, kind: str) -> WindowSums:
+        ws = sums.get((side, kind))
+        if ws is None:
+            ws = sums[(side, kind)] = WindowSums((planned if side == 'plan' else produced)[kind])
+        return ws
+
+    def _page_labels(kind: str):
+        if labels is not None:
+            return labels.get(kind) or []
+        return set(planned[kind].labels) | set(produced[kind].labels)
+
+    canonical_project = master.get('PROJECT') or []
+    canonical_sew = master.get('SEW') or []
+    canonical_assy = master.get('ASSY') or []
 
-        _accumulate(bucket, 'mtd', r['mtd']['schedule'], r['mtd']['production'])
-        _accumulate(bucket, 'wtd', r['wtd']['schedule'], r['wtd']['production'])
-        _accumulate(bucket, 'daily', r['daily']['schedule'], r['daily']['production'])
+    label_order_sew = {LABELS.norm_id(v): i for i, v in enumerate(canonical_sew)} if canonical_sew else {}
+    label_order_assy = {LABELS.norm_id(v): i for i, v in enumerate(canonical_assy)} if canonical_assy else {}
 
-        if olk_key is not None:
-            line_olk = float(r['mtd'].get('olk', 0) or 0.0)
-            if line_olk:
-                cat_olk = olk_totals[olk_key]
-                cat_olk['olk'] += line_olk
-                cat_olk['production'] += float(r['mtd'].get('production', 0.0) or 0.0)
+    category_order = {'SEW': 0, 'ASSY': 1, 'OTHER': 2}
+    def _row_sort_key(cat: str, line: str):
+        if cat == 'SEW' and label_order_sew:
+            return (category_order.get(cat, 2), label_order_sew.get(LABELS.norm_id(line), 10**9), line)
+        if cat == 'ASSY' and label_order_assy:
+            return (category_order.get(cat, 2), label_order_assy.get(LABELS.norm_id(line), 10**9), line)
+        return (category_order.get(cat, 2), line)
+
+    extra_bounds = _extra_window_bounds(as_of)
+    extra_windows = tuple(extra_bounds)
+    window_bounds = [(start_d, as_of) for start_d in window_starts] + list(extra_bounds.values())
+    row_lines: list[str] = []
+    row_categories: list[str] = []
+    plan_parts: list[np.ndarray] = []
+    prod_parts: list[np.ndarray] = []
+    proj_parts: list[np.ndarray] = []
+    for category in ('SEW', 'ASSY'):
+        page_labels = sorted(_page_labels(category), key=lambda s: _row_sort_key(category, str(s)))
+        row_lines.extend(str(lbl) for lbl in page_labels)
+        row_categories.extend(category for _ in page_labels)
+        plan_parts.append(_sums('plan', category).windows(window_bounds, page_labels))
+        prod_parts.append(_sums('prod', category).windows(window_bounds, page_labels))
+        proj_parts.append(_eom_projection(planned[category], produced[category], page_labels, as_of))
+
+    row_olk = np.array([_olk_lookup(line, olk_norm) for line in row_lines], dtype=np.float64)
+    rows, totals, olk_totals_out = _compute_row_metrics(
+        row_lines,
+        row_lines,
+        row_categories,
+        np.vstack(plan_parts),
+        np.vstack(prod_parts),
+        row_olk,
+        np.vstack(proj_parts),
+        extra_windows,
+    )
 
     base_olk_by_project: dict[str, float] = {}
     for r in rows:
-        base = _base_label_name(str(r.get('line', '')))
+        base = LABELS.base_name(str(r.get('line', '')))
         if not base:
             continue
         v = float(r.get('mtd', {}).get('olk', 0.0) or 0.0)  # type: ignore[union-attr]
         if v > float(base_olk_by_project.get(base, 0.0) or 0.0):
             base_olk_by_project[base] = v
 
-    group_buckets: dict[str, dict[str, dict[str, object]]] = {}
     if canonical_project:
         project_labels = list(canonical_project)
     else:
-        project_labels = sorted(set(planned_project.keys()) | set(produced_project.keys()), key=lambda s: _norm_key(str(s)))
-    for label in project_labels:
-        base = _base_label_name(str(label))
-        if not base:
-            continue
-        group_name = GROUP_OVERRIDES.get(base) or base
-
-        plan_days = planned_project.get(label, {})
-        prod_days = produced_project.get(label, {})
-
-        plan_day = float(aggregate(plan_days, daily_start, as_of))
-        plan_wtd = float(aggregate(plan_days, start_week, as_of))
-        plan_mtd = float(aggregate(plan_days, start_month, as_of))
-
-        prod_day = float(aggregate(prod_days, daily_start, as_of))
-        prod_wtd = float(aggregate(prod_days, start_week, as_of))
-        prod_mtd = float(aggregate(prod_days, start_month, as_of))
-
-        grp = group_buckets.setdefault(group_name, {
-            'mtd': {'schedule': 0.0, 'production': 0.0, 'olk_projects': {}},
-            'wtd': {'schedule': 0.0, 'production': 0.0},
-            'daily': {'schedule': 0.0, 'production': 0.0},
-        })
-
-        grp['daily']['schedule'] = float(grp['daily']['schedule']) + plan_day
-        grp['daily']['production'] = float(grp['daily']['production']) + prod_day
-        grp['wtd']['schedule'] = float(grp['wtd']['schedule']) + plan_wtd
-        grp['wtd']['production'] = float(grp['wtd']['production']) + prod_wtd
-        grp['mtd']['schedule'] = float(grp['mtd']['schedule']) + plan_mtd
-        grp['mtd']['production'] = float(grp['mtd']['production']) + prod_mtd
-
-        olk_val = float(base_olk_by_project.get(base, 0.0) or 0.0)
-        if olk_val:
-            olk_projects = grp['mtd'].setdefault('olk_projects', {})
-            if isinstance(olk_projects, dict):
-                prev = float(olk_projects.get(base, 0.0) or 0.0)
-                if olk_val > prev:
-                    olk_projects[base] = olk_val
-
-    group_totals: list[dict[str, object]] = []
-    for name in sorted(group_buckets.keys()):
-        src = group_buckets[name]
-        agg: dict[str, object] = {'group': name}
-        for key in ('mtd', 'wtd', 'daily'):
-            win = src[key]
-            sched = float(win.get('schedule', 0.0) or 0.0)
-            prod = float(win.get('production', 0.0) or 0.0)
-            delta = prod - sched
-            adh = adherence(delta, sched)
-            win_out: dict[str, object] = {
-                'schedule': int(round(sched)),
-                'production': round(prod, 2),
-                'delta': round(delta, 2),
-                'adherence_pct': round(adh, 1) if adh is not None else None,
-            }
-            if key == 'mtd':
-                olk_projects = win.get('olk_projects')
-                if isinstance(olk_projects, dict) and olk_projects:
-                    olk_qty = sum(float(v or 0.0) for v in olk_projects.values())
-                else:
-                    olk_qty = 0.0
-                if olk_qty > 0:
-                    adh_olk_pct = (prod / olk_qty) * 100.0
-                else:
-                    adh_olk_pct = 0.0
-                win_out['olk'] = int(round(olk_qty))
-                win_out['adh_olk_pct'] = round(adh_olk_pct, 1)
-            agg[key] = win_out
-        group_totals.append(agg)
-
-    olk_totals_out: dict[str, dict[str, float]] = {}
-    for key in ('sew', 'assy'):
-        src = olk_totals.get(key, {})
-        olk_qty = float(src.get('olk', 0.0) or 0.0)
-        prod_qty = float(src.get('production', 0.0) or 0.0)
-        if olk_qty > 0:
-            adh_olk_pct = (prod_qty / olk_qty) * 100.0
-        else:
-            adh_olk_pct = 0.0
-        olk_totals_out[key] = {
-            'olk': int(round(olk_qty)),
-            'production': round(prod_qty, 2),
-            'adh_olk_pct': round(adh_olk_pct, 1),
-        }
+        project_labels = sorted(_page_labels('PROJECT'), key=LABELS.norm_key)
+    project_labels = [label for label in project_labels if LABELS.base_name(label)]
+    group_totals = _compute_group_totals(
+        _page_group_table(),
+        project_labels,
+        _sums('plan', 'PROJECT').windows(window_bounds, project_labels),
+        _sums('prod', 'PROJECT').windows(window_bounds, project_labels),
+        np.array([base_olk_by_project.get(LABELS.base_name(label), 0.0) for label in project_labels], dtype=np.float64),
+        _eom_projection(planned['PROJECT'], produced['PROJECT'], project_labels, as_of),
+        extra_windows,
+    )
+    return rows, totals, olk_totals_out, group_totals
 
-    # --- Diagnostic CSV export ---------------------------------------------------
-    try:
-        diag_dir = os.path.join(_BASE_DIR, 'PVS', 'Debug')
-        os.makedirs(diag_dir, exist_ok=True)
-        diag_path = os.path.join(diag_dir, 'dashboard_diagnostic.csv')
-        with open(diag_path, 'w', newline='', encoding='utf-8') as df:
-            df.write('Page,Label,Daily_Sched,Daily_Prod,Daily_Delta,WTD_Sched,WTD_Prod,WTD_Delta,MTD_Sched,MTD_Prod,MTD_Delta,MTD_Adh%,OLK,OLK_Adh%\n')
-            # Page 1 – PROJECT group totals
-            for gt in group_totals:
-                name = gt.get('group', '')
-                mtd = gt.get('mtd', {})
-                wtd = gt.get('wtd', {})
-                daily = gt.get('daily', {})
-                df.write(','.join([
-                    'PROJECT', str(name),
-                    str(daily.get('schedule', 0)), f"{daily.get('production', 0):.2f}", f"{daily.get('delta', 0):.2f}",
-                    str(wtd.get('schedule', 0)), f"{wtd.get('production', 0):.2f}", f"{wtd.get('delta', 0):.2f}",
-                    str(mtd.get('schedule', 0)), f"{mtd.get('production', 0):.2f}", f"{mtd.get('delta', 0):.2f}",
-                    str(mtd.get('adherence_pct', '') if mtd.get('adherence_pct') is not None else ''),
-                    str(mtd.get('olk', 0)), str(mtd.get('adh_olk_pct', 0)),
-                ]) + '\n')
-            # Pages 2 & 3 – SEW / ASSY detail rows
-            for r in rows:
-                cat = str(r.get('category', ''))
-                line = str(r.get('line', ''))
-                mtd = r.get('mtd', {})
-                wtd = r.get('wtd', {})
-                daily = r.get('daily', {})
-                df.write(','.join([
-                    cat, line,
-                    str(daily.get('schedule', 0)), f"{daily.get('production', 0):.2f}", f"{daily.get('delta', 0):.2f}",
-                    str(wtd.get('schedule', 0)), f"{wtd.get('production', 0):.2f}", f"{wtd.get('delta', 0):.2f}",
-                    str(mtd.get('schedule', 0)), f"{mtd.get('production', 0):.2f}", f"{mtd.get('delta', 0):.2f}",
-                    str(mtd.get('adherence_pct', '') if mtd.get('adherence_pct') is not None else ''),
-                    str(mtd.get('olk', 0)), str(mtd.get('adh_olk_pct', 0)),
-                ]) + '\n')
-        print(f"[DIAG] Wrote diagnostic CSV: {diag_path}")
-    except Exception as e:
-        print(f"[DIAG] WARNING: Could not write diagnostic CSV: {e}")
 
-    return {
-        'success': True,
-        'date': as_of.strftime('%Y-%m-%d'),
-        'rows': rows,
-        'totals': totals,
-        'group_totals': group_totals,
-        'olk_totals': olk_totals_out,
-    }
+def _as_of_window_starts(as_of: date) -> tuple[date, date, date]:
+    """(daily_start, start_week, start_month) of the report for ``as_of``, as _report_dates() sets them."""
+    daily_start = as_of - timedelta(days=1) if as_of.weekday() == 5 and PVS_SHOW_WEEKEND_ON_MONDAY else as_of
+    return daily_start, monday_of_week(as_of), as_of.replace(day=1)
+
+
+def snapshot_span(dates) -> tuple[date, date]:
+    """Days the page series must cover for compute_snapshots(dates): earliest window start to last month end."""
+    lo = min(
+        min([_as_of_window_starts(d)[0], d.replace(day=1)] + [s for s, _e in _extra_window_bounds(d).values()])
+        for d in dates
+    )
+    return lo, max(_month_bounds(d)[1] for d in dates)
+
+
+def _month_labels(planned: SeriesMatrix, produced: SeriesMatrix, canonical: list[str], as_of: date) -> list[str]:
+    """Row labels of one page for ``as_of``: the canonical labels plus any other label active in that month."""
+    month_start, month_end = _month_bounds(as_of)
+    labels = list(canonical)
+    seen = set(labels)
+    for series in (planned, produced):
+        lo = max((month_start - series.start).days, 0)
+        hi = max(min((month_end - series.start).days + 1, series.n_days), lo)
+        active = (series.values[:, lo:hi] != 0).any(axis=1)
+        for i in np.flatnonzero(active):
+            lbl = series.labels[i]
+            if lbl not in seen:
+                seen.add(lbl)
+                labels.append(lbl)
+    return labels
+
+
+def compute_snapshots(
+    dates,
+    planned: dict[str, SeriesMatrix],
+    produced: dict[str, SeriesMatrix],
+    live_from: date | None = None,
+) -> dict[str, dict[str, object]]:
+    """Snapshots for several report dates in one pass, keyed by ISO date.
+
+    ``planned``/``produced`` map each page to its series over (at least)
+    snapshot_span(dates). They are canonicalized and their prefix sums built
+    once for all dates; each date then only costs its window lookups. Rows
+    are the canonical labels plus labels active in the date's month.
+    ``live_from`` is the first day of production not read from history
+    (None: all of it was), used for the configured windows' coverage flags.
+    """
+    master = _load_master_list(PVS_MASTER_LIST_CSV)
+    planned = {kind: _canonicalize_series(planned[kind], master.get(kind) or []) for kind in PAGE_KINDS}
+    produced = {kind: _canonicalize_series(produced[kind], master.get(kind) or []) for kind in PAGE_KINDS}
+    olk_norm = _olk_norm_by_label()
+    sums: dict[tuple[str, str], WindowSums] = {}
+    out: dict[str, dict[str, object]] = {}
+    for as_of in sorted(set(dates)):
+        labels = {
+            kind: _month_labels(planned[kind], produced[kind], master.get(kind) or [], as_of)
+            for kind in PAGE_KINDS
+        }
+        rows, totals, olk_totals_out, group_totals = _metrics_from_series(
+            as_of, _as_of_window_starts(as_of), planned, produced, master, olk_norm, sums, labels,
+        )
+        snap: dict[str, object] = {
+            'success': True,
+            'date': as_of.strftime('%Y-%m-%d'),
+            'rows': rows,
+            'totals': totals,
+            'group_totals': group_totals,
+            'olk_totals': olk_totals_out,
+        }
+        if PVS_WINDOW_DEFS:
+            snap['window_coverage'] = _window_coverage(as_of, live_from, PAGE_KINDS)
+        out[as_of.isoformat()] = snap
+    return out
 
 
 def _find_ltp_workbook(directory: str, keywords) -> Path | None:
@@ -2196,6 +4106,8 @@ def load_planned_from_ltp(
     fallback_csv: str | None = None,
 ):
     planned: dict[str, dict[date, int]] = {}
+    unmapped: list[dict[str, str]] = []
+    _LTP_UNMAPPED['codes'] = unmapped
     workbook_path = _find_ltp_workbook(directory, keywords)
     if not workbook_path:
         print("[LTP] No workbook found; falling back to CSV")
@@ -2354,12 +4266,14 @@ def load_planned_from_ltp(
             codes = sorted(set(codes))
             if len(codes) > 1 and not row_type:
                 print(f"[LTP] WARNING: Multiple prod lines for {project_key}/{model_key} (UNKNOWN type); row skipped")
+                unmapped.append({'project': project_key, 'model': model_key, 'type': '', 'reason': f"multiple prod lines: {codes}"})
                 continue
             if len(codes) > 1:
                 print(f"[LTP] INFO: Multiple prod lines for {project_key}/{model_key} ({row_type}): {codes}")
 
             if not codes:
                 print(f"[LTP] WARNING: No prod line mapping for {project_key}/{model_key} ({row_type or 'UNKNOWN'})")
+                unmapped.append({'project': project_key, 'model': model_key, 'type': row_type or '', 'reason': 'no prod line mapping'})
                 continue
 
             per_day: dict[date, int] = {}
@@ -2435,6 +4349,70 @@ def fetch_produced_by_day(start_d: date, end_d: date):
     return data
 
 
+# (start, end, probe, data) of the last fetch_produced_by_day call made through the probe gate
+_PRODUCED_BY_DAY_CACHE: tuple[date, date, list, dict] | None = None
+
+
+def fetch_produced_by_day_if_changed(start_d: date, end_d: date):
+    """fetch_produced_by_day(), skipped when the change probe matches the previous fetch of the same range."""
+    global _PRODUCED_BY_DAY_CACHE
+    probe = _production_probe(start_d, end_d, PVS_PROD_TR_TYPES or ['RCT-WO'])
+    hit = _PRODUCED_BY_DAY_CACHE
+    if probe is not None and hit is not None and hit[:3] == (start_d, end_d, probe):
+        print(f"[DB] Production unchanged for {start_d}..{end_d}; reusing last result")
+        return hit[3]
+    data = fetch_produced_by_day(start_d, end_d)
+    _PRODUCED_BY_DAY_CACHE = (start_d, end_d, probe, data) if probe is not None else None
+    return data
+
+
+def _produced_pages_from_codes(
+    by_code: dict[str, dict[date, float]],
+    start_d: date,
+    end_d: date,
+) -> dict[str, SeriesMatrix]:
+    """Page production series from fetch_produced_by_day() results, mapped through ref.csv.
+
+    A line code's quantity counts toward its PROJECT group and, by its
+    SEW/ASSY type, its SEW or ASSY label. Codes missing from ref.csv are
+    reported and skipped.
+    """
+    meta = _load_ref_meta(PVS_LTP_REF_CSV)
+    n_days = (end_d - start_d).days + 1
+    per_page: dict[str, dict[str, np.ndarray]] = {kind: {} for kind in PAGE_KINDS}
+    unmapped: list[str] = []
+    for code, by_day in by_code.items():
+        m = meta.get(code)
+        if not m:
+            unmapped.append(code)
+            continue
+        vec = np.zeros(n_days, dtype=np.float64)
+        for d, qty in by_day.items():
+            j = (d - start_d).days
+            if 0 <= j < n_days:
+                vec[j] += qty
+        row_type = m.get('type') or ('SEW' if m.get('sew') else 'ASSY' if m.get('assy') else '')
+        targets = [('PROJECT', m.get('project_group'))]
+        if row_type == 'SEW':
+            targets.append(('SEW', m.get('sew')))
+        elif row_type == 'ASSY':
+            targets.append(('ASSY', m.get('assy')))
+        for kind, label in targets:
+            if not label:
+                continue
+            acc = per_page[kind]
+            acc[label] = acc[label] + vec if label in acc else vec.copy()
+    if unmapped:
+        print(f"[DB] WARNING: {len(unmapped)} line code(s) not in ref.csv: {', '.join(sorted(unmapped))}")
+    out: dict[str, SeriesMatrix] = {}
+    for kind, acc in per_page.items():
+        if acc:
+            out[kind] = SeriesMatrix(list(acc), start_d, np.vstack(list(acc.values())))
+        else:
+            out[kind] = SeriesMatrix.empty(start_d, end_d)
+    return out
+
+
 def daterange(d0: date, d1: date):
     d = d0
     while d <= d1:
@@ -2453,8 +4431,8 @@ def aggregate(values_by_day: dict[date, float], start_d: date, end_d: date) -> f
     return total
 
 
-def compute_metrics():
-    today = date.today()
+def _report_dates(today: date) -> tuple[date, date, date, date]:
+    """Return (as_of, daily_start, start_week, start_month) for a report run on ``today``."""
     wd = today.weekday()  # Monday=0 ... Sunday=6
     # Daily window:
     # - By default: yesterday only
@@ -2465,101 +4443,349 @@ def compute_metrics():
     else:
         as_of = today - timedelta(days=1)
         daily_start = as_of
+    return as_of, daily_start, monday_of_week(as_of), as_of.replace(day=1)
+
+
+def _extra_window_bounds(as_of: date) -> dict[str, tuple[date, date]]:
+    """Configured windows (settings.json ``windows.definitions``) as inclusive ranges ending at ``as_of``.
+
+    ``rolling`` covers the last ``days`` days, ``week`` the last ``weeks``
+    calendar weeks (default 1, i.e. the current CW), and ``qtd``/``ytd``
+    run from the start of the fiscal quarter/year set by
+    ``windows.fiscalYearStartMonth``.
+    """
+    month_no = as_of.year * 12 + as_of.month - 1
+    into_fy = (as_of.month - PVS_FISCAL_YEAR_START_MONTH) % 12
+    out: dict[str, tuple[date, date]] = {}
+    for name, spec in PVS_WINDOW_DEFS.items():
+        kind = spec['type']
+        if kind == 'rolling':
+            start_d = as_of - timedelta(days=int(spec['days']) - 1)
+        elif kind == 'week':
+            start_d = monday_of_week(as_of) - timedelta(weeks=max(int(spec.get('weeks', 1) or 1), 1) - 1)
+        else:
+            m = month_no - (into_fy % 3 if kind == 'qtd' else into_fy)
+            start_d = date(m // 12, m % 12 + 1, 1)
+        out[name] = (start_d, as_of)
+    return out
+
+
+def _window_coverage(as_of: date, live_from: date | None, kinds) -> dict[str, dict[str, object]]:
+    """Per configured window: its range and whether production is recorded for all of it.
+
+    Days from ``live_from`` on come from this run's own query; earlier days
+    need a history partition holding production of every page in ``kinds``.
+    """
+    out: dict[str, dict[str, object]] = {}
+    recorded: set[date] | None = None
+    for name, (lo, hi) in _extra_window_bounds(as_of).items():
+        need_to = hi if live_from is None else min(hi, live_from - timedelta(days=1))
+        months: list[date] = []
+        month = lo.replace(day=1)
+        while month <= need_to:
+            months.append(month)
+            month = _month_bounds(month)[1] + timedelta(days=1)
+        if months and recorded is None:
+            recorded = set.intersection(*(HISTORY.recorded('prod', kind) for kind in kinds)) if PVS_HISTORY_ENABLED else set()
+        out[name] = {'from': lo.isoformat(), 'to': hi.isoformat(), 'complete': all(m in (recorded or ()) for m in months)}
+    return out
+
+
+def _with_history(series: SeriesMatrix, side: str, kind: str, start_d: date, canonical: list[str]) -> SeriesMatrix:
+    """Extend ``series`` back to ``start_d`` from the history store, keeping its labels."""
+    if not PVS_HISTORY_ENABLED or start_d >= series.start:
+        return series
+    before = series.start - timedelta(days=1)
+    hist = _canonicalize_series(HISTORY.query(side, kind, start_d, before), canonical)
+    past = SeriesMatrix(series.labels, start_d, hist.reindex(start_d, before).take(series.labels))
+    return past.merge(series)
+
+
+class PipelineStage:
+    """One step of the compute pipeline.
+
+    ``inputs(ctx, *upstream)`` describes everything the stage reads besides
+    upstream outputs (file fingerprints, DB high-water mark, settings, dates)
+    as a JSON-able value, or returns None when that cannot be told cheaply,
+    in which case the stage always runs. ``run(ctx, *upstream)`` computes the
+    output. ``digest(output)`` is the content key downstream stages see;
+    without one the input key is used. ``ok(output)`` tells a successful run
+    from a failed one; a failed output is passed downstream but not memoized,
+    so the stage runs again next time even if its inputs are unchanged.
+    """
+
+    __slots__ = ('name', 'deps', 'inputs', 'run', 'digest', 'ok')
+
+    def __init__(self, name: str, run, inputs, deps: tuple[str, ...] = (), digest=None, ok=None):
+        self.name = name
+        self.deps = tuple(deps)
+        self.inputs = inputs
+        self.run = run
+        self.digest = digest
+        self.ok = ok
+
+
+class Pipeline:
+    """Stage graph with memoized outputs.
+
+    A stage reruns only when its input key (its own inputs plus the content
+    keys of its upstream outputs) differs from the last run; otherwise its
+    previous output is reused. Stages are listed in dependency order; a stage
+    starts on a bounded thread pool as soon as all of its upstream stages
+    are done, so independent stages run concurrently. The pool lives for one
+    run, so an idle service keeps no stage threads.
+    """
+
+    def __init__(self, stages: list[PipelineStage], max_workers: int = PVS_PIPELINE_WORKERS):
+        seen: set[str] = set()
+        for st in stages:
+            missing = [d for d in st.deps if d not in seen]
+            if missing:
+                raise ValueError(f"stage {st.name} depends on undeclared stage(s): {missing}")
+            seen.add(st.name)
+        self.stages = list(stages)
+        self._lock = threading.Lock()
+        self.max_workers = max_workers
+        self._memo: dict[str, tuple[str | None, str, object]] = {}
+        self.last_run: dict[str, object] = {'ran': [], 'reused': [], 'seconds': {}, 'total_seconds': 0.0}
+
+    def _execute(self, st: PipelineStage, ctx: dict[str, object], upstream: list, dep_keys: list[str]):
+        """Run one stage (or reuse its memo); returns (input key, output key, output, reused, seconds)."""
+        t0 = time.perf_counter()
+        parts = st.inputs(ctx, *upstream)
+        key = None
+        if parts is not None:
+            key = content_hash(json.dumps([st.name, parts, dep_keys], sort_keys=True, default=str))
+        memo = self._memo.get(st.name)
+        if key is not None and memo is not None and memo[0] == key:
+            return key, memo[1], memo[2], True, time.perf_counter() - t0
+        out = st.run(ctx, *upstream)
+        out_key = st.digest(out) if st.digest else (key or f"{st.name}:{time.time_ns()}")
+        return key, out_key, out, False, time.perf_counter() - t0
+
+    def run(self, ctx: dict[str, object]) -> dict[str, object]:
+        with self._lock, ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pvs-stage') as pool:
+            t0 = time.perf_counter()
+            outputs: dict[str, object] = {}
+            out_keys: dict[str, str] = {}
+            ran: list[str] = []
+            reused: list[str] = []
+            seconds: dict[str, float] = {}
+            pending = list(self.stages)
+            running: dict = {}
+            while pending or running:
+                for st in [st for st in pending if all(d in out_keys for d in st.deps)]:
+                    pending.remove(st)
+                    fut = pool.submit(
+                        self._execute, st, ctx, [outputs[d] for d in st.deps], [out_keys[d] for d in st.deps]
+                    )
+                    running[fut] = st
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    st = running.pop(fut)
+                    try:
+                        key, out_key, out, was_reused, secs = fut.result()
+                    except BaseException:
+                        # Let sibling stages finish before the error leaves run(): the next
+                        # run must not overlap them, and their outputs are simply dropped.
+                        for other in running:
+                            other.cancel()
+                        wait(running)
+                        raise
+                    if not was_reused:
+                        if st.ok is None or st.ok(out):
+                            self._memo[st.name] = (key, out_key, out)
+                        else:
+                            self._memo.pop(st.name, None)
+                            print(f"[PIPELINE] {st.name} failed; it will run again next time")
+                    out_keys[st.name], outputs[st.name] = out_key, out
+                    (reused if was_reused else ran).append(st.name)
+                    seconds[st.name] = round(secs, 3)
+            total = round(time.perf_counter() - t0, 3)
+            self.last_run = {'ran': ran, 'reused': reused, 'seconds': seconds, 'total_seconds': total}
+            timing = ', '.join(f"{st.name} {seconds[st.name]:.2f}s" for st in self.stages)
+            print(f"[PIPELINE] ran: {', '.join(ran) or '-'}; reused: {', '.join(reused) or '-'}")
+            print(f"[PIPELINE] {timing}; total {total:.2f}s")
+            return outputs
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memo.clear()
+
+
+def _dir_fingerprint(directory: str, exts=('.xlsx', '.xlsm')) -> list[tuple[str, int, int]]:
+    """(name, mtime_ns, size) of the workbooks in ``directory``; changes whenever the LTP pick could."""
+    try:
+        with os.scandir(directory) as it:
+            return sorted(
+                (e.name, e.stat().st_mtime_ns, e.stat().st_size)
+                for e in it
+                if e.is_file() and os.path.splitext(e.name)[1].lower() in exts and not e.name.startswith('~$')
+            )
+    except (OSError, TypeError, ValueError):
+        return []
+
+
+def _files_fingerprint(*paths: str) -> list[tuple[int, int] | None]:
+    return [REFERENCE.fingerprint(p) if p else None for p in paths]
+
+
+def _production_stage_inputs(ctx: dict[str, object]):
+    if not PVS_REGENERATE_INPUTS:
+        return {'regenerate': False}
+    # PVS-Production.sql always reports the current calendar month.
+    month_start, month_end = _month_bounds(ctx['today'])
+    # Probe the receipt types PVS-Production.sql itself filters on.
+    probe = _production_probe(month_start, month_end, _production_sql_tr_types())
+    if probe is None:
+        return None
+    return {
+        'probe': probe,
+        'month': month_start,
+        'files': _files_fingerprint(PVS_PROD_SQL_PATH, PVS_MASTER_LIST_CSV),
+    }
+
+
+def _production_stage(ctx: dict[str, object]):
+    if not PVS_REGENERATE_INPUTS:
+        return None
+    try:
+        return _run_production_sql(PVS_PROD_SQL_PATH)
+    except Exception as e:
+        print(f"[SQL] WARNING: Production SQL regeneration failed: {e}")
+        return None
+
+
+def _ltp_pages_stage_inputs(ctx: dict[str, object]):
+    return {
+        'workbooks': _dir_fingerprint(PVS_LTP_DIR),
+        'files': _files_fingerprint(PVS_LTP_REF_CSV, PVS_MASTER_LIST_CSV, PVS_LTP_FALLBACK_CSV),
+        'settings': [PVS_LTP_SHEET, PVS_LTP_LABEL, PVS_LTP_KEYWORDS, PVS_LTP_DATE_ROW,
+                     PVS_LTP_DATE_START_COL, PVS_LTP_DATE_END_COL, PVS_LTP_WORKDAYS_PER_WEEK],
+        'start_month': ctx['start_month'],
+    }
+
+
+def _production_stage_ok(rows) -> bool:
+    return rows is not None or not PVS_REGENERATE_INPUTS
+
+
+def _ltp_pages_stage(ctx: dict[str, object]) -> dict[str, SeriesMatrix] | None:
+    try:
+        ltp_pages = load_planned_pages_from_ltp(
+            PVS_LTP_DIR,
+            PVS_LTP_SHEET,
+            PVS_LTP_LABEL,
+            PVS_LTP_REF_CSV,
+            PVS_LTP_KEYWORDS,
+            PVS_LTP_DATE_ROW,
+            PVS_LTP_DATE_START_COL,
+            PVS_LTP_DATE_END_COL,
+            PVS_LTP_WORKDAYS_PER_WEEK,
+            PVS_LTP_FALLBACK_CSV,
+        )
+
+        master = _load_master_list(PVS_MASTER_LIST_CSV)
+        return {
+            kind: _canonicalize_series(
+                ltp_pages.get(kind) or SeriesMatrix.empty(ctx['start_month']),
+                master.get(kind) or [],
+            )
+            for kind in PAGE_KINDS
+        }
+    except Exception as e:
+        print(f"[PVS] WARNING: Could not build planned pages: {e}")
+        return None
+
+
+def _ltp_pages_stage_ok(pages) -> bool:
+    # An unreadable workbook yields None or all-empty pages; read it again next run.
+    return pages is not None and any(series.values.any() for series in pages.values())
+
+
+def _export_stage_inputs(ctx: dict[str, object], produced_rows, planned_pages):
+    return {
+        'start_month': ctx['start_month'],
+        'produced_month': ctx['today'].replace(day=1),
+        'csvs': PVS_EXPORT_PAGE_CSVS,
+        'history': PVS_HISTORY_ENABLED,
+    }
+
+
+def _export_stage(ctx: dict[str, object], produced_rows, planned_pages):
+    _export_page_store_async(planned_pages, produced_rows, ctx['start_month'], ctx['today'].replace(day=1))
+
+
+def _reference_stage_inputs(ctx: dict[str, object]):
+    return {'files': _files_fingerprint(PVS_OLK_CSV, PVS_OLK_XLSX, PVS_MAP_CSV, PVS_LTP_REF_CSV, PVS_MASTER_LIST_CSV)}
+
 
-    start_month = as_of.replace(day=1)
-    start_week = monday_of_week(as_of)
+def _reference_stage(ctx: dict[str, object]) -> None:
+    """Warm the reference registry (line map, ref.csv, OLK, master list) alongside the data stages."""
+    _load_master_list(PVS_MASTER_LIST_CSV)
+    _olk_norm_by_label()
+    _olk_by_code()
+    _code_group_table()
 
-    if PVS_REGENERATE_INPUTS:
-        try:
-            _run_production_sql_and_overwrite_csvs(PVS_PROD_SQL_PATH)
-        except Exception as e:
-            print(f"[SQL] WARNING: Production SQL regeneration failed: {e}")
-        if PVS_EXPORT_LTP_REF_EXTRACT:
-            try:
-                _export_ltp_ref_extract_csv(
-                    PVS_LTP_REF_EXTRACT_CSV,
-                    PVS_LTP_DIR,
-                    PVS_LTP_SHEET,
-                    PVS_LTP_LABEL,
-                    PVS_LTP_REF_CSV,
-                    PVS_LTP_KEYWORDS,
-                    PVS_LTP_DATE_ROW,
-                    PVS_LTP_DATE_START_COL,
-                    PVS_LTP_DATE_END_COL,
-                )
-            except Exception as e:
-                print(f"[LTP-EXTRACT] WARNING: export failed: {e}")
 
-    try:
-        planned_pages = load_planned_pages_from_ltp(
-            PVS_LTP_DIR,
-            PVS_LTP_SHEET,
-            PVS_LTP_LABEL,
-            PVS_LTP_REF_CSV,
-            PVS_LTP_KEYWORDS,
-            PVS_LTP_DATE_ROW,
-            PVS_LTP_DATE_START_COL,
-            PVS_LTP_DATE_END_COL,
-            PVS_LTP_WORKDAYS_PER_WEEK,
-            PVS_LTP_FALLBACK_CSV,
-        )
+def _metrics_stage_inputs(ctx: dict[str, object], produced_rows, planned_pages, _reference=None):
+    # Only the partitions before this month feed the configured windows; this month comes from the run.
+    history_start = min([ctx['start_month']] + [lo for lo, _hi in _extra_window_bounds(ctx['as_of']).values()])
+    return {
+        'dates': [ctx['as_of'], ctx['daily_start'], ctx['start_week'], ctx['start_month']],
+        'files': _files_fingerprint(PVS_OLK_CSV, PVS_OLK_XLSX, PVS_MAP_CSV, PVS_LTP_REF_CSV, PVS_MASTER_LIST_CSV),
+        'windows': PVS_WINDOW_DEFS,
+        'history': HISTORY.version(history_start, ctx['start_month'] - timedelta(days=1)) if PVS_HISTORY_ENABLED else '',
+        # Pages missing from memory are read back from the published page store.
+        'page_store': None if (produced_rows and planned_pages) else page_store_version(),
+    }
 
-        master = _load_master_list(os.path.join(_BASE_DIR, 'PVS', 'master_list.csv'))
-        planned_project = _canonicalize_series(planned_pages.get('PROJECT', {}), master.get('PROJECT') or [])
-        planned_sew = _canonicalize_series(planned_pages.get('SEW', {}), master.get('SEW') or [])
-        planned_assy = _canonicalize_series(planned_pages.get('ASSY', {}), master.get('ASSY') or [])
 
-        _write_monthly_csv_by_label(
-            os.path.join(_BASE_DIR, 'PVS', 'Planned', 'Day', '1_PVS_per_Project.csv'),
-            planned_project,
-            start_month,
-        )
-        _write_monthly_csv_by_label(
-            os.path.join(_BASE_DIR, 'PVS', 'Planned', 'Day', '2_PVS_per_SEW.csv'),
-            planned_sew,
-            start_month,
-        )
-        _write_monthly_csv_by_label(
-            os.path.join(_BASE_DIR, 'PVS', 'Planned', 'Day', '3_PVS_per_ASSY.csv'),
-            planned_assy,
-            start_month,
-        )
+def _metrics_stage(ctx: dict[str, object], produced_rows, planned_pages, _reference=None):
+    start_month = ctx['start_month']
+    return _compute_metrics_from_pages(
+        ctx['as_of'],
+        ctx['daily_start'],
+        ctx['start_week'],
+        start_month,
+        planned_pages={k: _month_page_series(v, start_month) for k, v in planned_pages.items()} if planned_pages else None,
+        produced_pages={k: _page_series_from_rows(v, start_month) for k, v in produced_rows.items()} if produced_rows else None,
+    )
 
-        _write_weekly_csv_by_label(
-            os.path.join(_BASE_DIR, 'PVS', 'Planned', 'Week', '1_PVS_per_Project.csv'),
-            planned_project,
-            start_month,
-        )
-        _write_weekly_csv_by_label(
-            os.path.join(_BASE_DIR, 'PVS', 'Planned', 'Week', '2_PVS_per_SEW.csv'),
-            planned_sew,
-            start_month,
-        )
-        _write_weekly_csv_by_label(
-            os.path.join(_BASE_DIR, 'PVS', 'Planned', 'Week', '3_PVS_per_ASSY.csv'),
-            planned_assy,
-            start_month,
-        )
 
-        _write_month_total_csv_by_label(
-            os.path.join(_BASE_DIR, 'PVS', 'Planned', 'Month', '1_PVS_per_Project.csv'),
-            planned_project,
-            start_month,
-        )
-        _write_month_total_csv_by_label(
-            os.path.join(_BASE_DIR, 'PVS', 'Planned', 'Month', '2_PVS_per_SEW.csv'),
-            planned_sew,
-            start_month,
-        )
-        _write_month_total_csv_by_label(
-            os.path.join(_BASE_DIR, 'PVS', 'Planned', 'Month', '3_PVS_per_ASSY.csv'),
-            planned_assy,
-            start_month,
-        )
-    except Exception as e:
-        print(f"[PVS] WARNING: Could not export planned CSVs: {e}")
+def _pages_digest(pages: dict[str, SeriesMatrix] | None) -> str:
+    if not pages:
+        return content_hash('none')
+    return content_hash(b'\0'.join(kind.encode('utf-8') + _series_digest(pages[kind]) for kind in sorted(pages)))
+
+
+# SQL regeneration, the LTP workbook read and the reference loads are
+# independent and run concurrently; page export and metrics depend on them.
+# A tr_hist-only change skips the Excel stage, an OLK.csv-only change reruns
+# only the metrics stage, and an unchanged production probe skips the SQL and
+# everything downstream.
+PIPELINE = Pipeline([
+    PipelineStage('production', _production_stage, _production_stage_inputs,
+                  digest=lambda rows: content_hash(json.dumps(rows)), ok=_production_stage_ok),
+    PipelineStage('ltp_pages', _ltp_pages_stage, _ltp_pages_stage_inputs, digest=_pages_digest, ok=_ltp_pages_stage_ok),
+    PipelineStage('reference', _reference_stage, _reference_stage_inputs),
+    PipelineStage('export', _export_stage, _export_stage_inputs, deps=('production', 'ltp_pages')),
+    PipelineStage('metrics', _metrics_stage, _metrics_stage_inputs, deps=('production', 'ltp_pages', 'reference')),
+])
 
-    csv_res = _compute_metrics_from_page_csvs(as_of, daily_start, start_week, start_month)
+
+def compute_metrics():
+    today = date.today()
+    as_of, daily_start, start_week, start_month = _report_dates(today)
+
+    outputs = PIPELINE.run({
+        'today': today,
+        'as_of': as_of,
+        'daily_start': daily_start,
+        'start_week': start_week,
+        'start_month': start_month,
+    })
+    csv_res = outputs['metrics']
     if csv_res is not None:
         return csv_res
 
@@ -2605,409 +4831,907 @@ def compute_metrics():
         planned = load_planned_xlsx(PVS_PLANNED_XLSX)
 
     # LTP sources are weekly buckets (Monday dates). Expand to daily so Daily/WTD/MTD schedules work.
+    planned = SeriesMatrix.from_dict(planned)
     if PVS_PLAN_SOURCE in ('ltp', 'ltp_csv', 'ltp_formulas') and _ltp_looks_weekly(planned):
         print(f"[COMPUTE] Expanding weekly LTP plan to daily using {PVS_LTP_WORKDAYS_PER_WEEK} workdays/week")
         planned = _expand_weekly_plan_to_daily(planned, PVS_LTP_WORKDAYS_PER_WEEK)
     # Fetch production from the earliest window we need (daily/WTD/MTD) to avoid undercounting
     # when week spans a month boundary or when daily view uses Fri+Sat.
-    produced_start = min(start_month, start_week, daily_start)
-    produced = fetch_produced_by_day(produced_start, as_of)
-    mapping = load_map_csv(PVS_MAP_CSV)
-    ref_meta = _load_ref_meta(PVS_LTP_REF_CSV)
-
+    extra_bounds = _extra_window_bounds(as_of)
+    extra_windows = tuple(extra_bounds)
+    produced_start = min([start_month, start_week, daily_start])
+    produced = SeriesMatrix.from_dict(fetch_produced_by_day_if_changed(produced_start, as_of), produced_start, as_of)
+    # Configured windows reaching further back read the earlier days from history,
+    # where each run files its per-code production, instead of querying tr_hist.
+    history_start = min([produced_start] + [lo for lo, _hi in extra_bounds.values()])
+    if PVS_HISTORY_ENABLED:
+        try:
+            if len(produced):
+                HISTORY.append('prod', LEGACY_HISTORY_KIND, produced)
+            if history_start < produced_start:
+                past = HISTORY.query('prod', LEGACY_HISTORY_KIND, history_start, produced_start - timedelta(days=1))
+                produced = past.merge(produced)
+        except Exception as e:
+            print(f"[HISTORY] WARNING: Could not use the per-code history: {e}")
     # Monthly OLK targets by prod line (for OLK column and OLK adherence)
-    # OLK targets: prefer PVS/OLK.csv (display labels); fall back to Monthly_OLK.xlsx
-    raw_olk = load_olk_csv(PVS_OLK_CSV)
-    if not raw_olk:
-        raw_olk = load_monthly_olk(PVS_OLK_XLSX)
-    olk_by_code: dict[str, float] = {}
-    if raw_olk:
-        # Build reverse map: display name -> code
-        display_to_code: dict[str, str] = {}
-        for code_key, disp_name in mapping.items():
-            if not disp_name:
-                continue
-            display_to_code[disp_name.upper()] = code_key
+    olk_by_code = _olk_by_code()
 
-        for code_key, m in ref_meta.items():
-            for label in (m.get('sew'), m.get('assy'), m.get('project_group')):
-                if label:
-                    display_to_code[str(label).strip().upper()] = code_key
+    # Build union of all line codes seen in plan or production
+    codes = sorted(set(planned.labels) | set(produced.labels))
 
-        code_keys = list(mapping.keys())
+    group_table = _code_group_table()
+    displays = group_table.displays(codes)
+    categories = group_table.categories(codes)
 
-        for key, val in raw_olk.items():
-            if not val:
-                continue
+    # Sort: SEW first, then ASSY, then OTHER; within each category sort by line name
+    category_order = {'SEW': 0, 'ASSY': 1, 'OTHER': 2}
+    order = sorted(range(len(codes)), key=lambda i: (category_order.get(categories[i], 2), displays[i]))
+    codes = [codes[i] for i in order]
+    displays = [displays[i] for i in order]
+    categories = [categories[i] for i in order]
+
+    # Plans and production for the previous business day (or Fri+Sat), WTD and MTD
+    window_starts = {'daily': daily_start, 'wtd': start_week, 'mtd': start_month}
+    window_bounds = [(window_starts[k], as_of) for k in METRIC_WINDOWS] + list(extra_bounds.values())
+    # Monthly OLK qty for each prod line (whole-month target)
+    line_olk = np.array([float(olk_by_code.get(code, 0.0) or 0.0) for code in codes], dtype=np.float64)
+    line_projection = _eom_projection(planned, produced, codes, as_of)
+    rows, totals, olk_totals_out = _compute_row_metrics(
+        codes,
+        displays,
+        categories,
+        WindowSums(planned).windows(window_bounds, codes),
+        WindowSums(produced).windows(window_bounds, codes),
+        line_olk,
+        line_projection,
+        extra_windows,
+    )
 
-            key_norm = (key or "").strip().upper()
-            target_code: str | None = None
+    # Grouped totals (pairs, CV, Nissan, singles)
+    width = len(METRIC_WINDOWS) + len(extra_windows)
+    group_totals = _compute_group_totals(
+        group_table,
+        codes,
+        np.array([_row_window_values(r, 'schedule', extra_windows) for r in rows], dtype=np.float64).reshape(-1, width),
+        np.array([_row_window_values(r, 'production', extra_windows) for r in rows], dtype=np.float64).reshape(-1, width),
+        np.array([r['mtd']['olk'] for r in rows], dtype=np.float64),
+        line_projection,
+        extra_windows,
+    )
 
-            # 1) Exact match on prod line code
-            if key_norm in mapping:
-                target_code = key_norm
-            else:
-                # 2) Exact match on display / project name
-                target_code = display_to_code.get(key_norm)
-
-            # 3) Fuzzy match: key contains a known code (e.g. "Z_FG - CDPO")
-            if target_code is None:
-                for code_key in code_keys:
-                    if code_key in key_norm:
-                        target_code = code_key
-                        break
+    out: dict[str, object] = {
+        'success': True,
+        'date': as_of.strftime('%Y-%m-%d'),
+        'rows': rows,
+        'totals': totals,
+        'group_totals': group_totals,
+        'olk_totals': olk_totals_out,
+    }
+    if extra_bounds:
+        out['window_coverage'] = _window_coverage(as_of, produced_start, (LEGACY_HISTORY_KIND,))
+    return out
 
-            # 4) Fuzzy match: key contains a known display name
-            if target_code is None:
-                for code_key, disp_name in mapping.items():
-                    if not disp_name:
-                        continue
-                    if disp_name.upper() in key_norm:
-                        target_code = code_key
-                        break
 
-            if target_code is not None:
-                olk_by_code[target_code] = olk_by_code.get(target_code, 0.0) + float(val or 0.0)
-            else:
-                # Fallback: keep under original key so at least it's not lost
-                olk_by_code[key_norm] = olk_by_code.get(key_norm, 0.0) + float(val or 0.0)
-
-        def _base_project_name(name: str) -> str:
-            s = (name or '').strip().upper()
-            for suf in (' - SEW', '- SEW', ' - ASSY', '- ASSY'):
-                if s.endswith(suf):
-                    s = s[:-len(suf)]
-                    break
-            s = s.strip()
-            while s.endswith('-'):
-                s = s[:-1].strip()
-            return s
-
-        pairs: dict[str, dict[str, str]] = {}
-        for code_key, disp_name in mapping.items():
-            if not disp_name:
-                continue
-            disp_u = disp_name.strip().upper()
-            if 'SEW' in disp_u:
-                base = _base_project_name(disp_u)
-                pairs.setdefault(base, {})['SEW'] = code_key
-            elif 'ASSY' in disp_u:
-                base = _base_project_name(disp_u)
-                pairs.setdefault(base, {})['ASSY'] = code_key
-
-        for pair in pairs.values():
-            sew_code = pair.get('SEW')
-            assy_code = pair.get('ASSY')
-            if not sew_code or not assy_code:
-                continue
-            sew_val = float(olk_by_code.get(sew_code, 0.0) or 0.0)
-            assy_val = float(olk_by_code.get(assy_code, 0.0) or 0.0)
-            if sew_val <= 0 and assy_val > 0:
-                olk_by_code[sew_code] = assy_val
-            elif assy_val <= 0 and sew_val > 0:
-                olk_by_code[assy_code] = sew_val
-    else:
-        olk_by_code = {}
+def _rss_bytes() -> int | None:
+    """Current resident set size of this process, or None without psutil."""
+    if psutil is None:
+        return None
+    return int(psutil.Process().memory_info().rss)
 
-    # Build union of all line codes seen in plan or production
-    codes = sorted(set(planned.keys()) | set(produced.keys()))
-
-    rows = []
-    for code in codes:
-        m = ref_meta.get(code, {})
-        t = (m.get('type') or '').strip().upper()
-        if t == 'SEW':
-            disp = m.get('sew') or mapping.get(code, code)
-        elif t == 'ASSY':
-            disp = m.get('assy') or mapping.get(code, code)
-        else:
-            disp = mapping.get(code, code)
-        plan_days = planned.get(code, {})
-        prod_days = produced.get(code, {})
-
-        # Plans (previous business day or Fri+Sat)
-        plan_day = int(aggregate(plan_days, daily_start, as_of))
-        plan_wtd = int(aggregate(plan_days, start_week, as_of))
-        plan_mtd = int(aggregate(plan_days, start_month, as_of))
-
-        # Produced (previous business day or Fri+Sat)
-        prod_day = float(aggregate(prod_days, daily_start, as_of))
-        prod_wtd = float(aggregate(prod_days, start_week, as_of))
-        prod_mtd = float(aggregate(prod_days, start_month, as_of))
-
-        # Deltas
-        d_day = prod_day - plan_day
-        d_wtd = prod_wtd - plan_wtd
-        d_mtd = prod_mtd - plan_mtd
-
-        def adherence(delta: float, schedule: float) -> float | None:
-            if schedule <= 0:
-                return None
-            pct = (delta / schedule) * 100.0
-            # Clamp extreme outliers instead of zeroing them
-            if pct > PVS_ADHERENCE_CLAMP:
-                return PVS_ADHERENCE_CLAMP
-            if pct < -PVS_ADHERENCE_CLAMP:
-                return -PVS_ADHERENCE_CLAMP
-            return pct
-
-        # Determine category (SEW, ASSY, or OTHER)
-        if t in ('SEW', 'ASSY'):
-            category = t
-        else:
-            disp_upper = str(disp).upper()
-            normalized_name = disp_upper.replace('-', ' ').strip()
-            if normalized_name in SEW_NAME_OVERRIDES or 'SEW' in disp_upper:
-                category = 'SEW'
-            elif 'ASSY' in disp_upper:
-                category = 'ASSY'
-            else:
-                category = 'OTHER'
 
-        # Monthly OLK qty for this prod line (whole-month target) and OLK adherence (ratio)
-        line_olk = float(olk_by_code.get(code, 0.0) or 0.0)
-        if line_olk > 0:
-            adh_olk_pct = (prod_mtd / line_olk) * 100.0
+def _compute_worker_main(conn) -> None:
+    """Worker process loop: run one of _WORKER_CALLS per request and send back its JSON result."""
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            break
+        if not isinstance(msg, tuple) or msg[0] not in _WORKER_CALLS:
+            break
+        name, args = msg
+        try:
+            reply = {'ok': True, 'result': json.dumps(_WORKER_CALLS[name](*args))}
+        except Exception as e:
+            reply = {'ok': False, 'error': str(e)}
+        reply['rss'] = _rss_bytes()
+        conn.send(reply)
+    # Child processes skip atexit; let the last run's exports land before exiting.
+    flush_exports()
+
+
+_SPAWN_ENV_LOCK = threading.Lock()
+
+
+class ComputeWorker:
+    """Supervised worker process running the compute pipeline.
+
+    Each call() hands one request (a pipeline run, or the trends or batch
+    computation of the plant it serves) to the worker and waits at most
+    ``timeout_s``; a worker that times out or dies is killed and restarted
+    on the next call. The worker is also recycled after ``max_runs`` runs or
+    once its RSS exceeds ``max_rss_mb``. ``env`` is set in the worker's
+    environment: PVS_PLANT for a registered plant's worker.
+    """
+
+    def __init__(self, timeout_s: float, max_rss_mb: float, max_runs: int, env: dict[str, str] | None = None):
+        self.timeout_s = timeout_s
+        self.env = env or {}
+        self.max_rss_mb = max_rss_mb
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+        self._mp = multiprocessing.get_context('spawn')
+        self._proc = None
+        self._conn = None
+        self._runs = 0
+        self._rss_warned = False
+
+    def _start(self) -> None:
+        parent, child = self._mp.Pipe()
+        self._proc = self._mp.Process(target=_compute_worker_main, args=(child,), name='pvs-compute', daemon=True)
+        # A spawned child inherits os.environ at start; this is how a plant
+        # worker gets PVS_PLANT before it imports this module.
+        with _SPAWN_ENV_LOCK:
+            saved = {k: os.environ.get(k) for k in self.env}
+            os.environ.update(self.env)
+            try:
+                self._proc.start()
+            finally:
+                for k, v in saved.items():
+                    if v is None:
+                        os.environ.pop(k, None)
+                    else:
+                        os.environ[k] = v
+        child.close()
+        self._conn = parent
+        self._runs = 0
+        print(f"[WORKER] Started compute worker pid={self._proc.pid}")
+
+    def _stop(self, reason: str, graceful: bool = True, wait: bool = False) -> None:
+        """Detach the worker (caller holds self._lock) and let it exit.
+
+        The exit is awaited in a reaper thread unless ``wait`` is set, so the
+        next call does not queue behind a worker finishing its exports.
+        """
+        proc, conn = self._proc, self._conn
+        self._proc = self._conn = None
+        if proc is None:
+            return
+        print(f"[WORKER] Stopping compute worker pid={proc.pid}: {reason}")
+        if wait:
+            self._reap(proc, conn, graceful)
         else:
-            adh_olk_pct = 0.0
-
-        adh_mtd = adherence(d_mtd, plan_mtd)
-        adh_wtd = adherence(d_wtd, plan_wtd)
-        adh_day = adherence(d_day, plan_day)
-
-        rows.append({
-            'code': code,
-            'line': disp,
-            'category': category,
-            'mtd': {
-                'olk': int(round(line_olk)),
-                'adh_olk_pct': round(adh_olk_pct, 1),
-                'schedule': plan_mtd,
-                'production': round(prod_mtd, 2),
-                'delta': round(d_mtd, 2),
-                # Use cumulative planned as denominator for MTD adherence
-                'adherence_pct': round(adh_mtd, 1) if adh_mtd is not None else None,
-            },
-            'wtd': {
-                'schedule': plan_wtd,
-                'production': round(prod_wtd, 2),
-                'delta': round(d_wtd, 2),
-                # Use cumulative planned as denominator for WTD adherence
-                'adherence_pct': round(adh_wtd, 1) if adh_wtd is not None else None,
-            },
-            'daily': {
-                'schedule': plan_day,
-                'production': round(prod_day, 2),
-                'delta': round(d_day, 2),
-                'adherence_pct': round(adh_day, 1) if adh_day is not None else None,
-            }
-        })
+            threading.Thread(
+                target=self._reap, args=(proc, conn, graceful), name='pvs-worker-reaper', daemon=True
+            ).start()
 
-    # Sort: SEW first, then ASSY, then OTHER; within each category sort by line name
-    category_order = {'SEW': 0, 'ASSY': 1, 'OTHER': 2}
-    rows.sort(key=lambda r: (category_order.get(r['category'], 2), r['line']))
+    @staticmethod
+    def _reap(proc, conn, graceful: bool) -> None:
+        try:
+            if graceful and proc.is_alive():
+                conn.send('stop')
+                proc.join(60)
+        except (OSError, ValueError):
+            pass
+        if proc.is_alive():
+            proc.kill()
+            proc.join(5)
+        conn.close()
 
-    # Compute totals for pie charts (MTD, WTD, Daily) per category
-    def _empty_bucket():
-        return {'schedule': 0, 'production': 0}
+    def compute(self) -> dict[str, object]:
+        """Run one pipeline pass in the worker and return its snapshot."""
+        return self.call('compute')
 
-    totals = {
-        'sew': {
-            'mtd': _empty_bucket(),
-            'wtd': _empty_bucket(),
-            'daily': _empty_bucket(),
-        },
-        'assy': {
-            'mtd': _empty_bucket(),
-            'wtd': _empty_bucket(),
-            'daily': _empty_bucket(),
-        },
-        'other': {
-            'mtd': _empty_bucket(),
-            'wtd': _empty_bucket(),
-            'daily': _empty_bucket(),
-        },
-        'all': {
-            'mtd': _empty_bucket(),
-            'wtd': _empty_bucket(),
-            'daily': _empty_bucket(),
-        },
-    }
+    def call(self, name: str, *args) -> dict[str, object]:
+        """Run _WORKER_CALLS[name](*args) in the worker and return its result."""
+        with self._lock:
+            if self._proc is None or not self._proc.is_alive():
+                self._stop('not running')
+                self._start()
+            try:
+                self._conn.send((name, args))
+                reply = self._conn.recv() if self._conn.poll(self.timeout_s) else None
+            except (EOFError, OSError) as e:
+                self._stop(f"worker failed: {e}", graceful=False)
+                raise RuntimeError(f"compute worker failed: {e}")
+            if reply is None:
+                self._stop(f"no result after {self.timeout_s:.0f}s", graceful=False)
+                raise TimeoutError(f"compute worker timed out after {self.timeout_s:.0f}s")
+            self._runs += 1
+            rss = reply.get('rss')
+            if rss is None and self.max_rss_mb and not self._rss_warned:
+                self._rss_warned = True
+                print(
+                    f"[WORKER] WARNING: worker RSS cannot be measured (install psutil); "
+                    f"the {self.max_rss_mb:.0f} MB workerMaxRssMb cap is OFF, recycling only every {self.max_runs} runs"
+                )
+            if self._runs >= self.max_runs:
+                self._stop(f"recycling after {self._runs} runs")
+            elif rss and self.max_rss_mb and rss > self.max_rss_mb * 1024 * 1024:
+                self._stop(f"recycling at {rss / (1024 * 1024):.0f} MB RSS")
+            if not reply.get('ok'):
+                raise RuntimeError(reply.get('error') or f"{name} failed")
+            return json.loads(reply['result'])
 
-    # OLK totals per category (for OLK pies on SEW/ASSY pages, MTD only)
-    olk_totals = {
-        'sew': {'olk': 0.0, 'production': 0.0},
-        'assy': {'olk': 0.0, 'production': 0.0},
-    }
+    def close(self) -> None:
+        with self._lock:
+            self._stop('shutdown', wait=True)
 
-    def _accumulate(bucket: dict, key: str, sched: int | float, prod: int | float) -> None:
-        b = bucket[key]
-        b['schedule'] += int(sched or 0)
-        b['production'] += float(prod or 0.0)
 
-    # Buckets for grouped totals (pairs, CV, Nissan, singles)
-    def _empty_group_window() -> dict[str, float]:
-        return {
-            'schedule': 0.0,
-            'production': 0.0,
-            'delta': 0.0,
-            'adherence_pct': 0.0,
-            'olk': 0.0,
-            'olk_projects': {},
-        }
+COMPUTE_WORKER = ComputeWorker(PVS_WORKER_TIMEOUT_S, PVS_WORKER_MAX_RSS_MB, PVS_WORKER_MAX_RUNS)
 
-    group_buckets: dict[str, dict[str, dict[str, float]]] = {}
 
-    def _group_project_key(disp_name: str) -> str:
-        s = (disp_name or '').strip().upper()
-        if ' - ' in s:
-            s = s.split(' - ')[0].strip()
-        for suf in (' - SEW', '- SEW', ' - ASSY', '- ASSY'):
-            if s.endswith(suf):
-                s = s[:-len(suf)].strip()
-                break
-        while s.endswith('-'):
-            s = s[:-1].strip()
-        return s
+# Latest published snapshot of each plant: from this process's last refresh, or
+# loaded from its snapshot.json by warm_start() until the first refresh replaces it.
+PVS_SNAPSHOT_JSON = os.path.join(PVS_SNAPSHOT_DIR, 'snapshot.json')
+# Refreshes running at once across all plants (each one is a full pipeline pass)
+PVS_MAX_CONCURRENT_REFRESHES = max(int(_PLANTS.get('maxConcurrentRefreshes', 2) or 2), 1)
+_REFRESH_SLOTS = threading.BoundedSemaphore(PVS_MAX_CONCURRENT_REFRESHES)
 
-    for r in rows:
-        cat = r['category']
-
-        # All categories combined
-        _accumulate(totals['all'], 'mtd', r['mtd']['schedule'], r['mtd']['production'])
-        _accumulate(totals['all'], 'wtd', r['wtd']['schedule'], r['wtd']['production'])
-        _accumulate(totals['all'], 'daily', r['daily']['schedule'], r['daily']['production'])
-
-        # Category-specific buckets
-        if cat == 'SEW':
-            bucket = totals['sew']
-            olk_key = 'sew'
-        elif cat == 'ASSY':
-            bucket = totals['assy']
-            olk_key = 'assy'
-        else:
-            bucket = totals['other']
-            olk_key = None
-
-        _accumulate(bucket, 'mtd', r['mtd']['schedule'], r['mtd']['production'])
-        _accumulate(bucket, 'wtd', r['wtd']['schedule'], r['wtd']['production'])
-        _accumulate(bucket, 'daily', r['daily']['schedule'], r['daily']['production'])
-
-        # Accumulate OLK totals per category (MTD only)
-        if olk_key is not None:
-            line_olk = float(r['mtd'].get('olk', 0) or 0.0)
-            if line_olk:
-                cat_olk = olk_totals[olk_key]
-                cat_olk['olk'] += line_olk
-                cat_olk['production'] += float(r['mtd'].get('production', 0.0) or 0.0)
-
-        # Grouped totals logic
-        code = r.get('code', '')
-        m = ref_meta.get(str(code), {}) if code else {}
-        group_name = (m.get('project_group') or '').strip()
-        if not group_name:
-            disp = r['line']
-            disp_upper = disp.upper()
-            base = disp.split(' - ')[0].strip().upper() if ' - ' in disp else disp_upper
-            group_name = GROUP_OVERRIDES.get(base)
-            if not group_name:
-                # If no override, for SEW/ASSY pairs use base (e.g. CDPO, JLR, ...)
-                if ' - ' in disp and (cat in ('SEW', 'ASSY')):
-                    group_name = base
-                else:
-                    # Single line group (BJA, FIAT, etc.)
-                    group_name = base
-
-        grp = group_buckets.setdefault(group_name, {
-            'mtd': _empty_group_window(),
-            'wtd': _empty_group_window(),
-            'daily': _empty_group_window(),
-        })
-
-        # Accumulate group OLK on MTD window
-        proj_key = _group_project_key(disp)
-        line_olk = float(r['mtd'].get('olk', 0) or 0.0)
-        if line_olk:
-            olk_projects = grp['mtd'].setdefault('olk_projects', {})
-            prev = float(olk_projects.get(proj_key, 0.0) or 0.0)
-            if line_olk > prev:
-                olk_projects[proj_key] = line_olk
-
-        for key in ('mtd', 'wtd', 'daily'):
-            win = grp[key]
-            src = r[key]
-            win['schedule'] += float(src['schedule'] or 0.0)
-            win['production'] += float(src['production'] or 0.0)
-
-    # Finalize grouped totals: compute delta and adherence for each window
-    group_totals: list[dict[str, object]] = []
-    for name in sorted(group_buckets.keys()):
-        src = group_buckets[name]
-        agg: dict[str, object] = {'group': name}
-        for key in ('mtd', 'wtd', 'daily'):
-            win = src[key]
-            sched = float(win['schedule'])
-            prod = float(win['production'])
-            delta = prod - sched
-            adh = adherence(delta, sched)
-            win_out = {
-                'schedule': int(round(sched)),
-                'production': round(prod, 2),
-                'delta': round(delta, 2),
-                'adherence_pct': round(adh, 1) if adh is not None else None,
+
+def _load_persisted_snapshot(path: str) -> dict[str, object] | None:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(snapshot, dict) or not snapshot.get('success'):
+        return None
+    return snapshot
+
+
+def _served_snapshot(snapshot: dict[str, object], **extra) -> dict[str, object]:
+    """``snapshot`` with its age in seconds (from ``computed_at``) and any ``extra`` flags."""
+    age = None
+    try:
+        age = round((datetime.now() - datetime.fromisoformat(str(snapshot.get('computed_at')))).total_seconds())
+    except ValueError:
+        pass
+    return {**snapshot, 'age_seconds': age, **extra}
+
+
+class SnapshotFollower:
+    """Follower-side view of the snapshot file a leader publishes.
+
+    The file's (mtime_ns, size) is re-checked at most every ``poll_s``
+    seconds and the snapshot re-read only when it changed, so followers put
+    no load on SQL Server or the LTP share and little on the snapshot share.
+    """
+
+    def __init__(self, path: str, poll_s: float):
+        self.path = path
+        self.poll_s = poll_s
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self._fp = None
+        self._snapshot: dict[str, object] | None = None
+
+    def current(self) -> dict[str, object] | None:
+        if self._snapshot is not None and time.monotonic() - self._checked < self.poll_s:
+            return self._snapshot
+        with self._lock:
+            self._checked = time.monotonic()
+            fp = ReferenceRegistry.fingerprint(self.path)
+            if fp is not None and fp != self._fp:
+                snapshot = _load_persisted_snapshot(self.path)
+                if snapshot is not None:
+                    self._snapshot, self._fp = snapshot, fp
+                    print(
+                        f"[FOLLOWER] Loaded snapshot: report date {snapshot.get('date')}, "
+                        f"computed {snapshot.get('computed_at')}"
+                    )
+            return self._snapshot
+
+
+class SnapshotService:
+    """Published snapshot of one plant: refreshed through its compute worker, persisted, served.
+
+    ``worker`` is the plant's ComputeWorker; None runs compute_metrics()
+    in-process (default plant only). Refreshes of all plants share
+    _REFRESH_SLOTS. Requests that arrive while a refresh is running get the
+    latest published snapshot at once. A snapshot loaded by warm_start() is
+    served with ``stale`` set while a background refresh brings it up to
+    date; when a refresh fails, the previous snapshot is served stale with
+    the error. Followers only serve the leader's latest published snapshot.
+    """
+
+    def __init__(self, plant: str | None, snapshot_path: str, worker: ComputeWorker | None):
+        self.plant = plant
+        self.path = snapshot_path
+        self.worker = worker
+        self.follower = SnapshotFollower(snapshot_path, PVS_FOLLOWER_POLL_S)
+        self._lock = threading.Lock()
+        self.last: dict[str, object] | None = None
+        self.warm = False
+        self._tag = f"[SNAPSHOT{':' + plant if plant else ''}]"
+
+    def _persist(self, snapshot: dict[str, object]) -> None:
+        """Write the published snapshot for the next warm start (temp file + atomic replace)."""
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"{self._tag} WARNING: could not persist snapshot: {e}")
+
+    def _refresh(self) -> dict[str, object]:
+        """Run one pipeline pass (caller holds self._lock), then publish and persist its snapshot."""
+        with _REFRESH_SLOTS:
+            snapshot = self.worker.compute() if self.worker is not None else compute_metrics()
+        snapshot = {**snapshot, 'computed_at': datetime.now().isoformat(timespec='seconds')}
+        if self.plant:
+            snapshot['plant'] = self.plant
+        self.last = snapshot
+        self.warm = False
+        self._persist(snapshot)
+        return snapshot
+
+    def _refresh_in_background(self) -> None:
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._refresh()
+        except Exception as e:
+            print(f"{self._tag} WARNING: background refresh failed: {e}")
+        finally:
+            self._lock.release()
+
+    def refresh_async(self) -> threading.Thread:
+        """Refresh in the background; a no-op if a refresh is already running."""
+        t = threading.Thread(target=self._refresh_in_background, name='pvs-refresh', daemon=True)
+        t.start()
+        return t
+
+    def serve(self) -> dict[str, object]:
+        if PVS_ROLE == 'follower':
+            snapshot = self.follower.current()
+            if snapshot is None:
+                raise RuntimeError(f"no published snapshot at {self.path} yet")
+            return _served_snapshot(snapshot)
+        cached = self.last
+        if cached is not None and self.warm:
+            self.refresh_async()
+            return _served_snapshot(cached, stale=True)
+        if not self._lock.acquire(blocking=cached is None):
+            return _served_snapshot(cached)  # type: ignore[arg-type]
+        try:
+            return _served_snapshot(self._refresh())
+        except Exception as e:
+            print(f"{self._tag} WARNING: refresh failed: {e}")
+            cached = self.last
+            if cached is None:
+                raise
+            return _served_snapshot(cached, stale=True, error=str(e))
+        finally:
+            self._lock.release()
+
+    def warm_start(self) -> dict[str, object] | None:
+        """Load the last persisted snapshot so the first request is answered at once, and refresh it in the background.
+
+        Returns the loaded snapshot, or None when there is none (the first
+        request then computes as before).
+        """
+        if not PVS_WARM_START or PVS_ROLE == 'follower':
+            return None
+        snapshot = _load_persisted_snapshot(self.path)
+        if snapshot is None:
+            print(f"{self._tag} No persisted snapshot at {self.path}; first request computes")
+            return None
+        self.last = snapshot
+        self.warm = True
+        print(f"{self._tag} Warm start: report date {snapshot.get('date')}, computed {snapshot.get('computed_at')}")
+        self.refresh_async()
+        return snapshot
+
+    def _scheduler_loop(self, interval_s: float) -> None:
+        while True:
+            time.sleep(interval_s)
+            self._refresh_in_background()
+
+    def start(self, interval_s: float = 0) -> None:
+        """Service startup: warm start, plus a refresh every ``interval_s`` seconds when it is set."""
+        if PVS_ROLE == 'follower':
+            self.follower.current()
+            return
+        if self.warm_start() is None and interval_s:
+            self.refresh_async()
+        if interval_s:
+            name = f"pvs-scheduler-{self.plant}" if self.plant else 'pvs-scheduler'
+            threading.Thread(target=self._scheduler_loop, args=(interval_s,), name=name, daemon=True).start()
+
+
+SNAPSHOTS = SnapshotService(None, PVS_SNAPSHOT_JSON, COMPUTE_WORKER if PVS_COMPUTE_WORKER else None)
+
+
+def _resolve_path(base_dir: str, path: str) -> str:
+    return path if os.path.isabs(path) else os.path.join(base_dir, path)
+
+
+class PlantContext:
+    """One plant's configuration and state.
+
+    ``settings`` is settings.json with the plant's overrides applied,
+    ``base_dir`` its data directory and ``db_config`` its connection
+    settings; the snapshot, page-store, history and quality-report paths
+    derive from them as the module-level ones do for the default plant.
+    ``reference``, ``history`` and ``snapshots`` are the plant's reference
+    registry, history store and snapshot service. ``pipeline`` is the
+    Pipeline computing the plant in this process; it is None for a
+    registered plant, which computes in its own ComputeWorker (started with
+    PVS_PLANT, so REFERENCE, HISTORY and PIPELINE in that process are the
+    plant's). Trends and batch requests then go to the same worker.
+    """
+
+    def __init__(
+        self,
+        name: str | None,
+        settings: dict,
+        base_dir: str,
+        db_config: dict[str, str],
+        snapshots: SnapshotService,
+        reference: ReferenceRegistry,
+        history: HistoryStore,
+        pipeline: Pipeline | None,
+    ):
+        self.name = name
+        self.settings = settings
+        self.base_dir = base_dir
+        self.db_config = db_config
+        self.snapshots = snapshots
+        self.reference = reference
+        self.history = history
+        self.pipeline = pipeline
+        self.generations_dir = os.path.join(base_dir, 'PVS', '_generations')
+        self.quality_path = os.path.join(base_dir, 'PVS', 'Debug', 'data_quality.json')
+
+    @classmethod
+    def for_site(cls, name: str) -> 'PlantContext':
+        """Context of registered plant ``name``, computing in a worker started with PVS_PLANT=name."""
+        settings, base_dir = _plant_settings(name)
+        data_sources = settings.get('dataSources') or {}
+        database = settings.get('database') or {}
+        db_config = {**DB_CONFIG, **{k: v for k, v in database.items() if k in ('server', 'database') and v}}
+        snapshot_dir = _resolve_path(base_dir, str(data_sources.get('snapshotDir') or 'PVS'))
+        history_dir = _resolve_path(base_dir, str(data_sources.get('historyDir') or os.path.join('PVS', 'History')))
+        worker = ComputeWorker(PVS_WORKER_TIMEOUT_S, PVS_WORKER_MAX_RSS_MB, PVS_WORKER_MAX_RUNS, env={'PVS_PLANT': name})
+        return cls(
+            name,
+            settings,
+            base_dir,
+            db_config,
+            SnapshotService(name, os.path.join(snapshot_dir, 'snapshot.json'), worker),
+            ReferenceRegistry(),
+            HistoryStore(history_dir),
+            None,
+        )
+
+    def _call(self, name: str, *args):
+        if self.pipeline is None:
+            return self.snapshots.worker.call(name, *args)
+        return _WORKER_CALLS[name](*args)
+
+    def trends(self, start_d: date, end_d: date, pages, labels=None) -> dict[str, object]:
+        return self._call('trends', start_d, end_d, pages, labels)
+
+    def batch(self, dates: list[date]) -> dict[str, object]:
+        return self._call('batch', dates)
+
+    def quality(self) -> dict[str, object]:
+        """Data-quality report of this process's last run, else the last one written to disk."""
+        report = _latest_quality_report() if self.pipeline is not None else {}
+        if report:
+            return report
+        return self.reference.get('quality_report', self.quality_path, _load_quality_report)
+
+    def version(self) -> dict[str, object]:
+        if PVS_ROLE == 'follower':
+            snapshot = self.snapshots.follower.current() or {}
+            return {
+                'success': True,
+                'role': PVS_ROLE,
+                'computed_at': snapshot.get('computed_at'),
+                'etag': _snapshot_etag(snapshot) if snapshot else None,
             }
-            if key == 'mtd':
-                olk_projects = win.get('olk_projects')
-                if isinstance(olk_projects, dict) and olk_projects:
-                    olk_qty = sum(float(v or 0.0) for v in olk_projects.values())
-                else:
-                    olk_qty = float(win.get('olk', 0.0) or 0.0)
-                if olk_qty > 0:
-                    adh_olk_pct = (prod / olk_qty) * 100.0
-                else:
-                    adh_olk_pct = 0.0
-                win_out['olk'] = int(round(olk_qty))
-                win_out['adh_olk_pct'] = round(adh_olk_pct, 1)
-            agg[key] = win_out
-        group_totals.append(agg)
-
-    # Compute category-level OLK totals for SEW/ASSY (for OLK pies)
-    olk_totals_out: dict[str, dict[str, float]] = {}
-    for key in ('sew', 'assy'):
-        src = olk_totals.get(key, {})
-        olk_qty = float(src.get('olk', 0.0) or 0.0)
-        prod_qty = float(src.get('production', 0.0) or 0.0)
-        if olk_qty > 0:
-            adh_olk_pct = (prod_qty / olk_qty) * 100.0
-        else:
-            adh_olk_pct = 0.0
-        olk_totals_out[key] = {
-            'olk': int(round(olk_qty)),
-            'production': round(prod_qty, 2),
-            'adh_olk_pct': round(adh_olk_pct, 1),
-        }
+        return {'success': True, 'role': PVS_ROLE, **page_store_version(self.generations_dir)}
+
+
+# The plant this process runs: the default one, or PVS_PLANT's in a plant worker or script.
+CONTEXT = PlantContext(
+    PVS_PLANT or None, SETTINGS, _BASE_DIR, DB_CONFIG, SNAPSHOTS, REFERENCE, HISTORY, PIPELINE
+)
+# Registered plants, each computing in its own worker process.
+PLANTS: dict[str, PlantContext] = {
+    name: PlantContext.for_site(name)
+    for name, site in PVS_PLANT_SITES.items()
+    if isinstance(site, dict) and not PVS_PLANT
+}
 
+
+def compute_snapshot() -> dict[str, object]:
+    """Metrics for /api/pvs: computed in the worker process, or in-process when it is disabled."""
+    return SNAPSHOTS.serve()
+
+
+def warm_start() -> dict[str, object] | None:
+    return SNAPSHOTS.warm_start()
+
+
+def _plant_refresh_seconds(site: dict[str, object]) -> float:
+    default = PVS_LEADER_REFRESH_S if PVS_ROLE == 'leader' else 0
+    return float(site.get('refreshSeconds', default) or 0)
+
+
+def startup() -> None:
+    """Service startup for the configured role: warm start and refresh schedules of every plant."""
+    print(f"[PVS] Role: {PVS_ROLE}, snapshot: {PVS_SNAPSHOT_JSON}")
+    SNAPSHOTS.start(PVS_LEADER_REFRESH_S if PVS_ROLE == 'leader' else 0)
+    for name, ctx in PLANTS.items():
+        print(f"[PVS] Plant {name}: snapshot {ctx.snapshots.path}")
+        ctx.snapshots.start(_plant_refresh_seconds(PVS_PLANT_SITES[name]))
+
+
+PVS_GZIP_MIN_BYTES = 1024
+# plant -> (computed_at, etag) of the last snapshot an ETag was derived for
+_SNAPSHOT_ETAGS: dict[object, tuple[object, str]] = {}
+
+
+def _snapshot_etag(snapshot: dict[str, object]) -> str:
+    """Content hash of a published snapshot (age and stale flags excluded), equal on leader and followers."""
+    key = snapshot.get('computed_at')
+    cached = _SNAPSHOT_ETAGS.get(snapshot.get('plant'))
+    if key is not None and cached is not None and cached[0] == key:
+        return cached[1]
+    body = {k: v for k, v in snapshot.items() if k not in ('age_seconds', 'stale', 'error')}
+    etag = content_hash(json.dumps(body, sort_keys=True))[:32]
+    _SNAPSHOT_ETAGS[snapshot.get('plant')] = (key, etag)
+    return etag
+
+
+def _snapshot_response(snapshot: dict[str, object]):
+    """JSON response for a served snapshot: weak ETag, 304 on If-None-Match, gzip when accepted."""
+    etag = _snapshot_etag(snapshot)
+    if request.if_none_match.contains_weak(etag):
+        resp = app.response_class(status=304)
+        resp.set_etag(etag, weak=True)
+        return resp
+    resp = jsonify(snapshot)
+    resp.set_etag(etag, weak=True)
+    resp.vary.add('Accept-Encoding')
+    body = resp.get_data()
+    if len(body) >= PVS_GZIP_MIN_BYTES and request.accept_encodings['gzip']:
+        resp.set_data(gzip.compress(body, 6))
+        resp.headers['Content-Encoding'] = 'gzip'
+    return resp
+
+
+# Canonicalized page series of the most recent metrics run, served by the trend API
+_LATEST_PAGES: dict[str, dict[str, SeriesMatrix]] = {}
+# (generation, pages) read back from the page store when metrics run in the worker process
+_STORE_PAGES: tuple[object, dict[str, dict[str, SeriesMatrix]]] | None = None
+PVS_TREND_MAX_DAYS = 366
+
+
+def _latest_pages() -> dict[str, dict[str, SeriesMatrix]]:
+    """Pages of the latest metrics run; read from the published page store if it ran in another process."""
+    global _STORE_PAGES
+    if _LATEST_PAGES:
+        return _LATEST_PAGES
+    generation = page_store_version().get('generation')
+    cached = _STORE_PAGES
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    planned, produced = _load_page_series(None, None, _report_dates(date.today())[3])
+    pages = {'plan': planned, 'prod': produced}
+    _STORE_PAGES = (generation, pages)
+    return pages
+
+
+# Assembled trend series keyed by the page-store generation, page, range and the
+# versions of the history and master list they were built from; least recently used first
+_TREND_SERIES: OrderedDict[tuple, SeriesMatrix] = OrderedDict()
+_TREND_SERIES_LOCK = threading.Lock()
+_TREND_SERIES_MAX = 64
+
+
+def _trend_page_series(side: str, kind: str, start_d: date, end_d: date) -> SeriesMatrix:
+    """Per-day series for ``start_d..end_d``: history partitions overlaid with the latest run's month.
+
+    Results are reused until the page-store generation (published by every
+    run), the history partitions of the range or the master list change;
+    the least recently used of _TREND_SERIES_MAX results is dropped first.
+    """
+    key = (
+        page_store_version().get('generation'),
+        side,
+        kind,
+        start_d,
+        end_d,
+        HISTORY.version(start_d, end_d) if PVS_HISTORY_ENABLED else '',
+        REFERENCE.fingerprint(PVS_MASTER_LIST_CSV),
+    )
+    with _TREND_SERIES_LOCK:
+        series = _TREND_SERIES.get(key)
+        if series is not None:
+            _TREND_SERIES.move_to_end(key)
+            return series
+    latest = (_latest_pages().get(side) or {}).get(kind)
+    series = _read_trend_page_series(side, kind, start_d, end_d, latest)
+    with _TREND_SERIES_LOCK:
+        _TREND_SERIES[key] = series
+        while len(_TREND_SERIES) > _TREND_SERIES_MAX:
+            _TREND_SERIES.popitem(last=False)
+    return series
+
+
+def _read_trend_page_series(
+    side: str,
+    kind: str,
+    start_d: date,
+    end_d: date,
+    latest: SeriesMatrix | None,
+) -> SeriesMatrix:
+    if PVS_HISTORY_ENABLED:
+        series = HISTORY.query(side, kind, start_d, end_d)
+    else:
+        series = SeriesMatrix.empty(start_d, end_d)
+    if latest is not None and latest.n_days:
+        series = HistoryStore._apply(series, latest, (latest.start, latest.end))
+    master = _load_master_list(PVS_MASTER_LIST_CSV)
+    return _canonicalize_series(series, master.get(kind) or []).reindex(start_d, end_d)
+
+
+def compute_trends(
+    start_d: date,
+    end_d: date,
+    pages=PAGE_KINDS,
+    labels: list[str] | None = None,
+) -> dict[str, object]:
+    """Per-day plan, production and cumulative adherence for every label of ``pages``.
+
+    Each page is one (labels x days) slice; cumulative sums and adherence
+    are computed for all labels at once. ``labels`` restricts the result to
+    the given labels (matched the way _norm_key folds spellings; they come
+    from the URL, so they are not interned into LABELS).
+    """
+    wanted = {_norm_key(str(lbl)) for lbl in labels} if labels else None
+    dates = [start_d + timedelta(days=j) for j in range((end_d - start_d).days + 1)]
+    out: list[dict[str, object]] = []
+    for kind in pages:
+        plan = _trend_page_series('plan', kind, start_d, end_d)
+        prod = _trend_page_series('prod', kind, start_d, end_d)
+        page_labels = list(plan.labels) + [lbl for lbl in prod.labels if lbl not in plan.index]
+        if wanted is not None:
+            page_labels = [lbl for lbl in page_labels if LABELS.norm_key(lbl) in wanted]
+        if not page_labels:
+            continue
+        plan_v = plan.take(page_labels)
+        prod_v = prod.take(page_labels)
+        cum_plan = np.cumsum(plan_v, axis=1)
+        cum_prod = np.cumsum(prod_v, axis=1)
+        adh = np.round(_adherence_pct(cum_prod - cum_plan, cum_plan), 1)
+        for i, lbl in enumerate(page_labels):
+            out.append({
+                'label': lbl,
+                'page': kind,
+                'plan': np.round(plan_v[i], 2).tolist(),
+                'production': np.round(prod_v[i], 2).tolist(),
+                'cum_adherence_pct': [None if np.isnan(v) else float(v) for v in adh[i]],
+            })
     return {
         'success': True,
-        'date': as_of.strftime('%Y-%m-%d'),
-        'rows': rows,
-        'totals': totals,
-        'group_totals': group_totals,
-        'olk_totals': olk_totals_out,
+        'from': start_d.isoformat(),
+        'to': end_d.isoformat(),
+        'dates': [d.isoformat() for d in dates],
+        'series': out,
+    }
+
+
+def _trend_range_from_request() -> tuple[date, date]:
+    """Parse ?from=&to= (ISO dates); defaults to the 30 days ending on the report date."""
+    end_raw = (request.args.get('to') or '').strip()
+    start_raw = (request.args.get('from') or '').strip()
+    end_d = date.fromisoformat(end_raw) if end_raw else _report_dates(date.today())[0]
+    start_d = date.fromisoformat(start_raw) if start_raw else end_d - timedelta(days=29)
+    if start_d > end_d:
+        raise ValueError("'from' must not be after 'to'")
+    if (end_d - start_d).days + 1 > PVS_TREND_MAX_DAYS:
+        raise ValueError(f"range is limited to {PVS_TREND_MAX_DAYS} days")
+    return start_d, end_d
+
+
+PVS_BATCH_MAX_DATES = 31
+
+
+def _dates_from_request() -> list[date]:
+    """Parse ?dates= (comma-separated ISO report dates)."""
+    raw = [d.strip() for d in (request.args.get('dates') or '').split(',') if d.strip()]
+    if not raw:
+        raise ValueError("'dates' is required")
+    dates = sorted({date.fromisoformat(d) for d in raw})
+    if len(dates) > PVS_BATCH_MAX_DATES:
+        raise ValueError(f"at most {PVS_BATCH_MAX_DATES} dates per request")
+    if dates[-1] >= date.today():
+        raise ValueError("dates must be in the past")
+    start_d, end_d = snapshot_span(dates)
+    if (end_d - start_d).days + 1 > PVS_TREND_MAX_DAYS:
+        raise ValueError(f"the dates' windows span {start_d}..{end_d}; at most {PVS_TREND_MAX_DAYS} days per request")
+    return dates
+
+
+def compute_batch(dates: list[date]) -> dict[str, object]:
+    """Snapshots for several report dates from one load of history plus the latest run's pages."""
+    start_d, end_d = snapshot_span(dates)
+    planned = {kind: _trend_page_series('plan', kind, start_d, end_d) for kind in PAGE_KINDS}
+    produced = {kind: _trend_page_series('prod', kind, start_d, end_d) for kind in PAGE_KINDS}
+    return {
+        'success': True,
+        'dates': [d.isoformat() for d in dates],
+        'snapshots': compute_snapshots(dates, planned, produced, _report_dates(date.today())[3]),
     }
 
 
+# What a ComputeWorker runs on request (see ComputeWorker.call)
+_WORKER_CALLS = {'compute': compute_metrics, 'trends': compute_trends, 'batch': compute_batch}
+
+
+def _pages_from_request() -> tuple[str, ...]:
+    raw = (request.args.get('page') or '').strip().upper()
+    if not raw:
+        return PAGE_KINDS
+    pages = tuple(p.strip() for p in raw.split(',') if p.strip())
+    unknown = [p for p in pages if p not in PAGE_KINDS]
+    if unknown:
+        raise ValueError(f"unknown page(s): {', '.join(unknown)}")
+    return pages
+
+
 @app.route('/')
 def index():
     return render_template('pvs.html', version=str(int(datetime.now().timestamp())))
 
 
+def _follower_unavailable():
+    return jsonify({'success': False, 'error': 'not available on a follower instance'}), 503
+
+
 @app.route('/api/pvs')
 def api_pvs():
     try:
-        return jsonify(compute_metrics())
+        snapshot = compute_snapshot()
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+    return _snapshot_response(snapshot)
+
+
+def _unknown_plant(plant: str):
+    return jsonify({'success': False, 'error': f"unknown plant: {plant}"}), 404
+
+
+@app.route('/api/<plant>/pvs')
+def api_plant_pvs(plant: str):
+    ctx = PLANTS.get(plant)
+    if ctx is None:
+        return _unknown_plant(plant)
+    try:
+        snapshot = ctx.snapshots.serve()
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+    return _snapshot_response(snapshot)
+
+
+@app.route('/api/plants')
+def api_plants():
+    return jsonify({'success': True, 'plants': sorted(PLANTS)})
+
+
+def _trends_response(ctx: PlantContext):
+    if PVS_ROLE == 'follower':
+        return _follower_unavailable()
+    try:
+        start_d, end_d = _trend_range_from_request()
+        pages = _pages_from_request()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    try:
+        return jsonify(ctx.trends(start_d, end_d, pages))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+
+def _batch_response(ctx: PlantContext):
+    if PVS_ROLE == 'follower':
+        return _follower_unavailable()
+    try:
+        dates = _dates_from_request()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    try:
+        return jsonify(ctx.batch(dates))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+
+def _line_series_response(ctx: PlantContext, label: str):
+    if PVS_ROLE == 'follower':
+        return _follower_unavailable()
+    try:
+        start_d, end_d = _trend_range_from_request()
+        pages = _pages_from_request()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    try:
+        res = ctx.trends(start_d, end_d, pages, labels=[label])
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
+    if not res['series']:
+        return jsonify({'success': False, 'error': f"unknown line: {label}"}), 404
+    return jsonify(res)
+
+
+def _quality_response(ctx: PlantContext):
+    report = ctx.quality()
+    if not report:
+        return jsonify({'success': False, 'error': 'no data-quality report yet'}), 404
+    return jsonify(report)
+
+
+@app.route('/api/pvs/trends')
+def api_pvs_trends():
+    return _trends_response(CONTEXT)
+
+
+@app.route('/api/pvs/batch')
+def api_pvs_batch():
+    return _batch_response(CONTEXT)
+
+
+@app.route('/api/pvs/line/<path:label>/series')
+def api_pvs_line_series(label: str):
+    return _line_series_response(CONTEXT, label)
+
+
+@app.route('/api/pvs/quality')
+def api_pvs_quality():
+    return _quality_response(CONTEXT)
+
+
+@app.route('/api/pvs/version')
+def api_pvs_version():
+    return jsonify(CONTEXT.version())
+
+
+# A registered plant's endpoints; its trends and batch requests run in the plant's worker.
+@app.route('/api/<plant>/pvs/trends')
+def api_plant_pvs_trends(plant: str):
+    ctx = PLANTS.get(plant)
+    return _trends_response(ctx) if ctx is not None else _unknown_plant(plant)
+
+
+@app.route('/api/<plant>/pvs/batch')
+def api_plant_pvs_batch(plant: str):
+    ctx = PLANTS.get(plant)
+    return _batch_response(ctx) if ctx is not None else _unknown_plant(plant)
+
+
+@app.route('/api/<plant>/pvs/line/<path:label>/series')
+def api_plant_pvs_line_series(plant: str, label: str):
+    ctx = PLANTS.get(plant)
+    return _line_series_response(ctx, label) if ctx is not None else _unknown_plant(plant)
+
+
+@app.route('/api/<plant>/pvs/quality')
+def api_plant_pvs_quality(plant: str):
+    ctx = PLANTS.get(plant)
+    return _quality_response(ctx) if ctx is not None else _unknown_plant(plant)
+
+
+@app.route('/api/<plant>/pvs/version')
+def api_plant_pvs_version(plant: str):
+    ctx = PLANTS.get(plant)
+    return jsonify(ctx.version()) if ctx is not None else _unknown_plant(plant)
 
 
 @app.route('/api/health')
@@ -3020,4 +5744,5 @@ if __name__ == '__main__':
     print('=' * 70)
     print(f'Running PVS app at http://{FLASK_HOST}:{PVS_PORT}')
     print('=' * 70)
+    startup()
     serve(app, host=FLASK_HOST, port=PVS_PORT, threads=4)
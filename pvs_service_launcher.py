@@ -1,5 +1,6 @@
 import os
 import sys
+import multiprocessing
 from waitress import serve
 
 # Resolve paths before importing to ensure .env and CSV resolve next to the EXE
@@ -24,7 +25,10 @@ HOST = os.getenv('FLASK_HOST', '0.0.0.0')
 PORT = int(os.getenv('PVS_PORT', '5051'))
 
 if __name__ == '__main__':
+    # In the frozen exe a spawned compute worker re-runs this file; this turns it into the worker.
+    multiprocessing.freeze_support()
     print('=' * 70)
     print(f'Running Adient PVS via Waitress at http://{HOST}:{PORT}')
     print('=' * 70)
+    ps.startup()
     serve(ps.app, host=HOST, port=PORT, threads=4)
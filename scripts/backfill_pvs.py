@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+
+# Resolve project root (this script is in scripts/)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+
+# Ensure we can import pvs_server
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import pvs_server as ps  # type: ignore  # noqa: E402
+
+# Page series shared by every date a pool worker computes (set by _init_worker)
+_PLANNED: dict | None = None
+_PRODUCED: dict | None = None
+
+
+def _init_worker(planned, produced) -> None:
+    global _PLANNED, _PRODUCED
+    _PLANNED, _PRODUCED = planned, produced
+
+
+def _compute_chunk(dates: list[date]) -> dict:
+    return ps.compute_snapshots(dates, _PLANNED, _PRODUCED)
+
+
+def _months(start_d: date, end_d: date) -> list[date]:
+    out = []
+    month = start_d.replace(day=1)
+    while month <= end_d:
+        out.append(month)
+        month = ps._month_bounds(month)[1] + timedelta(days=1)
+    return out
+
+
+def _day_runs(days: list[date]) -> list[tuple[date, date]]:
+    """Consecutive runs of sorted ``days`` as (first, last) pairs."""
+    runs: list[tuple[date, date]] = []
+    for d in days:
+        if runs and runs[-1][1] + timedelta(days=1) == d:
+            runs[-1] = (runs[-1][0], d)
+        else:
+            runs.append((d, d))
+    return runs
+
+
+def load_series(start_d: date, end_d: date, last_as_of: date, use_db: bool):
+    """Plan and production page series for ``start_d..end_d``.
+
+    Both come from history. Months without any recorded plan take the
+    current LTP, parsed once and kept in memory only (it is not that
+    month's plan). Days up to ``last_as_of`` that history has no
+    production record for (a recorded zero counts as recorded) are filled
+    from one tr_hist query (unless ``use_db`` is False) and recorded;
+    recorded days are left as they are.
+    """
+    planned = {kind: ps.HISTORY.query('plan', kind, start_d, end_d) for kind in ps.PAGE_KINDS}
+    produced = {kind: ps.HISTORY.query('prod', kind, start_d, end_d) for kind in ps.PAGE_KINDS}
+
+    missing = []
+    for month in _months(start_d, end_d):
+        bounds = ps._month_bounds(month)
+        if not any(planned[kind].reindex(*bounds).values.any() for kind in ps.PAGE_KINDS):
+            missing.append(bounds)
+    if missing:
+        print(f"[BACKFILL] No recorded plan for {len(missing)} month(s); using the current LTP")
+        ltp = ps._ltp_pages_stage({'start_month': start_d}) or {}
+        for kind, series in ltp.items():
+            for bounds in missing:
+                planned[kind] = ps.HistoryStore._apply(planned[kind], series, bounds)
+
+    last_d = min(end_d, last_as_of)
+    if use_db and last_d >= start_d:
+        runs = {}
+        for kind in ps.PAGE_KINDS:
+            covered = ps.HISTORY.coverage('prod', kind, start_d, last_d)
+            runs[kind] = _day_runs([start_d + timedelta(days=int(i)) for i in np.flatnonzero(~covered)])
+        pending = [run for kind_runs in runs.values() for run in kind_runs]
+        if pending:
+            lo, hi = min(r[0] for r in pending), max(r[1] for r in pending)
+            print(f"[BACKFILL] No recorded production on {len(pending)} run(s) of days in {lo}..{hi}; querying tr_hist")
+            fresh = ps._produced_pages_from_codes(ps.fetch_produced_by_day(lo, hi), lo, hi)
+            for kind, series in fresh.items():
+                for run in runs.get(kind, []):
+                    produced[kind] = ps.HistoryStore._apply(produced[kind], series, run)
+                    ps.HISTORY.append('prod', kind, series, run)
+    return planned, produced
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compute PVS snapshots for a range of report dates into the history store.")
+    parser.add_argument('start', type=date.fromisoformat, help="first report date (YYYY-MM-DD)")
+    parser.add_argument('end', type=date.fromisoformat, help="last report date (YYYY-MM-DD)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes (default: CPU count)")
+    parser.add_argument('--no-db', action='store_true', help="use recorded production only, no tr_hist query")
+    args = parser.parse_args()
+    if args.start > args.end:
+        raise SystemExit("start must not be after end")
+
+    t0 = time.perf_counter()
+    dates = [args.start + timedelta(days=i) for i in range((args.end - args.start).days + 1)]
+    span = ps.snapshot_span(dates)
+    print(f"[BACKFILL] {len(dates)} report date(s) {args.start}..{args.end}; series span {span[0]}..{span[1]}")
+    planned, produced = load_series(span[0], span[1], args.end, not args.no_db)
+    t_load = time.perf_counter() - t0
+
+    workers = max(min(args.workers, len(dates)), 1)
+    size = -(-len(dates) // workers)
+    chunks = [dates[i:i + size] for i in range(0, len(dates), size)]
+    snapshots: dict = {}
+    if len(chunks) == 1:
+        snapshots.update(ps.compute_snapshots(dates, planned, produced))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=len(chunks),
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(planned, produced),
+        ) as pool:
+            for result in pool.map(_compute_chunk, chunks):
+                snapshots.update(result)
+
+    changed = sum(ps.HISTORY.write_snapshot(date.fromisoformat(d), snap) for d, snap in snapshots.items())
+    print(
+        f"[BACKFILL] Wrote {changed} changed of {len(snapshots)} snapshot(s) to {ps.PVS_HISTORY_DIR} "
+        f"(load {t_load:.1f}s, total {time.perf_counter() - t0:.1f}s, {len(chunks)} process(es))"
+    )
+
+
+if __name__ == "__main__":
+    main()
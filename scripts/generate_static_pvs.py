@@ -11,12 +11,39 @@ ROOT_DIR = os.path.dirname(SCRIPT_DIR)
 if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
-from pvs_server import compute_metrics  # type: ignore
+from pvs_server import compute_metrics, content_hash, flush_exports, report_version  # type: ignore
+
+
+def _record_version(path: str) -> None:
+    """Remember the page-store version this snapshot was built from (read after the run's own export)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report_version(), f)
 
 
 def main() -> None:
+    out_dir = os.path.join(ROOT_DIR, "netlify_static")
+    out_path = os.path.join(out_dir, "index.html")
+    hash_path = os.path.join(ROOT_DIR, "logs", "static_snapshot.hash")
+    version_path = os.path.join(ROOT_DIR, "logs", "static_snapshot.version.json")
+    force = "--force" in sys.argv
+
+    # Cheap check first: same report date and no newly published page data
+    # since the last snapshot means the full compute would change nothing.
+    version = report_version()
+    if not force and version.get("generation") and os.path.exists(out_path):
+        try:
+            with open(version_path, "r", encoding="utf-8") as f:
+                last_version = json.load(f)
+        except (OSError, ValueError):
+            last_version = None
+        if last_version == version:
+            print(f"[STATIC] Page store unchanged ({version.get('generation')}, {version.get('date')}); skipping")
+            return
+
     print("[STATIC] Computing metrics via pvs_server.compute_metrics()...")
     res = compute_metrics()
+    flush_exports()
     if not res.get("success"):
         raise SystemExit("compute_metrics() returned success = False")
 
@@ -30,6 +57,20 @@ def main() -> None:
         "olk_totals": res.get("olk_totals", {}),
     }
 
+    # Skip the rewrite (and downstream deploy churn) when the data is unchanged;
+    # generated_at is excluded so only real content changes count.
+    snapshot_hash = content_hash(json.dumps(
+        {k: v for k, v in snapshot.items() if k != "generated_at"},
+        ensure_ascii=False,
+        sort_keys=True,
+    ))
+    if not force and os.path.exists(out_path) and os.path.exists(hash_path):
+        with open(hash_path, "r", encoding="utf-8") as f:
+            if f.read().strip() == snapshot_hash:
+                print(f"[STATIC] Snapshot unchanged ({snapshot_hash[:12]}); skipping write")
+                _record_version(version_path)
+                return
+
     tmpl_path = os.path.join(ROOT_DIR, "templates", "pvs_static.html")
     if not os.path.exists(tmpl_path):
         raise SystemExit(f"Static template not found: {tmpl_path}")
@@ -40,9 +81,7 @@ def main() -> None:
     json_blob = json.dumps(snapshot, ensure_ascii=False)
     html = template.replace("__PVS_SNAPSHOT_JSON__", json_blob)
 
-    out_dir = os.path.join(ROOT_DIR, "netlify_static")
     os.makedirs(out_dir, exist_ok=True)
-    out_path = os.path.join(out_dir, "index.html")
 
     with open(out_path, "w", encoding="utf-8") as f:
         f.write(html)
@@ -59,6 +98,11 @@ def main() -> None:
     except Exception as e:
         print(f"[STATIC] WARNING: Could not write TV snapshot to {extra_path}: {e}")
 
+    os.makedirs(os.path.dirname(hash_path), exist_ok=True)
+    with open(hash_path, "w", encoding="utf-8") as f:
+        f.write(snapshot_hash)
+    _record_version(version_path)
+
 
 if __name__ == "__main__":
     main()
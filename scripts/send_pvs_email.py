@@ -24,7 +24,7 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
 sys.path.insert(0, PROJECT_DIR)
 
-from pvs_server import compute_metrics
+from pvs_server import compute_metrics, flush_exports
 
 # Email configuration
 EMAIL_CONFIG = {
@@ -258,6 +258,7 @@ def main():
     
     # Compute metrics (same data as dashboard)
     data = compute_metrics()
+    flush_exports()
     
     if not data.get('success'):
         print("[EMAIL] ERROR: Failed to compute metrics")
@@ -6,10 +6,11 @@ This script is designed to run on a VM as a scheduled task at 8:45 AM daily.
 It sends the PVS report via SMTP without requiring Outlook.
 
 Usage:
-    python send_pvs_email_auto.py [--test]
+    python send_pvs_email_auto.py [--test] [--force]
 
 Options:
     --test    Send to a test recipient instead of the full list
+    --force   Send even if an identical report was already sent
 """
 
 import os
@@ -43,7 +44,7 @@ logger = logging.getLogger(__name__)
 # Add parent directory to path so we can import pvs_server
 sys.path.insert(0, PROJECT_DIR)
 
-from pvs_server import compute_metrics
+from pvs_server import compute_metrics, content_hash, flush_exports, report_version
 
 try:
     from PIL import Image, ImageDraw, ImageFont  # type: ignore[import]
@@ -726,9 +727,25 @@ def send_email_smtp(subject: str, html_body: str, recipients: list[str], inline_
         return False
 
 
+LAST_SENT_PATH = os.path.join(LOG_DIR, 'email_last_sent.json')
+
+
+def _report_hash(data: dict) -> str:
+    return content_hash(json.dumps(data, sort_keys=True, default=str))
+
+
+def _last_sent() -> dict:
+    try:
+        with open(LAST_SENT_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
 def main():
     # Check for test mode
     test_mode = '--test' in sys.argv
+    force = '--force' in sys.argv
     
     logger.info("=" * 60)
     logger.info("PVS Automated Email Report")
@@ -744,11 +761,20 @@ def main():
             return 1
     
     logger.info(f"Recipients: {len(recipients)} addresses")
+
+    # Cheap check first: same report date and no newly published page data
+    # since the last sent report means the full compute would change nothing.
+    last_sent = _last_sent()
+    version = report_version()
+    if not test_mode and not force and version.get('generation') and last_sent.get('version') == version:
+        logger.info(f"Page store unchanged since last sent report ({version.get('generation')}); skipping (use --force to resend)")
+        return 0
     
     # Compute metrics
     logger.info("Computing PVS metrics...")
     try:
         data = compute_metrics()
+        flush_exports()
     except Exception as e:
         logger.error(f"Failed to compute metrics: {e}")
         return 1
@@ -759,6 +785,18 @@ def main():
     
     logger.info(f"Metrics computed for date: {data.get('date')}")
     logger.info(f"Total rows: {len(data.get('rows', []))}")
+
+    # Retried or duplicate scheduled runs should not resend an identical report
+    report_hash = _report_hash(data)
+    logger.info(f"Report content hash: {report_hash[:12]}")
+    if not test_mode and not force and report_hash == last_sent.get('content_hash'):
+        logger.info("Identical report already sent; skipping (use --force to resend)")
+        try:
+            with open(LAST_SENT_PATH, 'w', encoding='utf-8') as f:
+                json.dump({**last_sent, 'version': report_version()}, f)
+        except Exception as e:
+            logger.warning(f"Could not record page store version: {e}")
+        return 0
     
     # Generate email HTML
     logger.info("Generating email HTML...")
@@ -778,6 +816,12 @@ def main():
     
     if success:
         logger.info("Email sent successfully!")
+        if not test_mode:
+            try:
+                with open(LAST_SENT_PATH, 'w', encoding='utf-8') as f:
+                    json.dump({'content_hash': report_hash, 'date': data.get('date'), 'version': report_version()}, f)
+            except Exception as e:
+                logger.warning(f"Could not record sent report hash: {e}")
         return 0
     else:
         logger.error("Email sending failed")
@@ -0,0 +1,41 @@
+import os
+import sys
+import types
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+try:
+    import pyodbc  # noqa: F401
+except ImportError:
+    # pyodbc needs the ODBC driver manager; these tests never reach SQL Server.
+    _pyodbc = types.ModuleType('pyodbc')
+    _pyodbc.drivers = lambda: []
+
+    def _connect(*args, **kwargs):
+        raise RuntimeError("pyodbc is not available")
+
+    _pyodbc.connect = _connect
+    sys.modules['pyodbc'] = _pyodbc
+
+import pvs_server as ps  # noqa: E402
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    """An empty history store in tmp_path, used by the metrics code instead of PVS/History."""
+    store = ps.HistoryStore(str(tmp_path / 'History'), max_segments=2)
+    monkeypatch.setattr(ps, 'HISTORY', store)
+    monkeypatch.setattr(ps, 'PVS_HISTORY_ENABLED', True)
+    return store
+
+
+@pytest.fixture
+def no_outputs(tmp_path, monkeypatch):
+    """Keep metrics runs from writing diagnostics or replacing the latest pages of the module."""
+    monkeypatch.setattr(ps, '_write_diagnostics_async', lambda *args: None)
+    monkeypatch.setattr(ps, '_LATEST_PAGES', {})
+    monkeypatch.setattr(ps, '_QUALITY_REPORT', {})
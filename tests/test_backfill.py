@@ -0,0 +1,66 @@
+import importlib.util
+import os
+from datetime import date
+
+import numpy as np
+import pytest
+
+import pvs_server as ps
+
+_spec = importlib.util.spec_from_file_location(
+    'backfill_pvs', os.path.join(os.path.dirname(ps.__file__), 'scripts', 'backfill_pvs.py')
+)
+backfill = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(backfill)
+
+
+def _series(labels, start, n_days, value):
+    return ps.SeriesMatrix(labels, start, np.full((len(labels), n_days), float(value)))
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    """Current LTP of 1 per day on every page and tr_hist production of 5 per day, with the queried ranges."""
+    queried = []
+
+    def ltp(ctx):
+        return {kind: _series(['A'], date(2026, 3, 1), 31, 1) for kind in ps.PAGE_KINDS}
+
+    def fetch(start_d, end_d):
+        queried.append((start_d, end_d))
+        return {}
+
+    def pages(by_code, start_d, end_d):
+        return {kind: _series(['NEW'], start_d, (end_d - start_d).days + 1, 5) for kind in ps.PAGE_KINDS}
+
+    monkeypatch.setattr(ps, '_ltp_pages_stage', ltp)
+    monkeypatch.setattr(ps, 'fetch_produced_by_day', fetch)
+    monkeypatch.setattr(ps, '_produced_pages_from_codes', pages)
+    return queried
+
+
+def test_ltp_fallback_is_not_recorded(history, sources):
+    planned, _ = backfill.load_series(date(2026, 3, 1), date(2026, 3, 10), date(2026, 3, 10), use_db=False)
+    assert planned['SEW'].row('A').tolist() == [1] * 10
+    assert history.months() == []
+
+
+def test_only_days_without_production_are_filled(history, sources):
+    for kind in ps.PAGE_KINDS:
+        history.append('prod', kind, _series(['OLD'], date(2026, 3, 1), 3, 7))
+    _, produced = backfill.load_series(date(2026, 3, 1), date(2026, 3, 8), date(2026, 3, 6), use_db=True)
+    assert sources == [(date(2026, 3, 4), date(2026, 3, 6))]
+    assert produced['ASSY'].row('OLD').tolist() == [7, 7, 7, 0, 0, 0, 0, 0]
+    assert produced['ASSY'].row('NEW').tolist() == [0, 0, 0, 5, 5, 5, 0, 0]
+    recorded = history.query('prod', 'ASSY', date(2026, 3, 1), date(2026, 3, 8))
+    assert recorded.values.tolist() == produced['ASSY'].values.tolist()
+
+
+def test_recorded_zero_days_are_not_queried_again(history, sources, monkeypatch):
+    def no_production(by_code, start_d, end_d):
+        return {kind: ps.SeriesMatrix.empty(start_d, end_d) for kind in ps.PAGE_KINDS}
+
+    monkeypatch.setattr(ps, '_produced_pages_from_codes', no_production)
+    backfill.load_series(date(2026, 3, 1), date(2026, 3, 8), date(2026, 3, 8), use_db=True)
+    backfill.load_series(date(2026, 3, 1), date(2026, 3, 8), date(2026, 3, 8), use_db=True)
+    assert sources == [(date(2026, 3, 1), date(2026, 3, 8))]
@@ -0,0 +1,13 @@
+import pytest
+
+import pvs_server as ps
+
+
+def test_lock_held_elsewhere_times_out(tmp_path):
+    path = str(tmp_path / '.lock')
+    with ps._file_lock(path):
+        with pytest.raises(TimeoutError):
+            with ps._file_lock(path, timeout_s=0.2):
+                pass
+    with ps._file_lock(path, timeout_s=0.2):
+        pass
@@ -0,0 +1,95 @@
+import os
+import threading
+from datetime import date
+
+import numpy as np
+
+import pvs_server as ps
+
+
+def _series(labels, start, n_days, value):
+    return ps.SeriesMatrix(labels, start, np.full((len(labels), n_days), float(value)))
+
+
+def test_query_spans_month_partitions(history):
+    history.append('prod', 'SEW', _series(['A'], date(2026, 1, 30), 4, 7))
+    out = history.query('prod', 'SEW', date(2026, 1, 29), date(2026, 2, 3))
+    assert out.labels == ['A']
+    assert out.values.tolist() == [[0, 7, 7, 7, 7, 0]]
+    assert history.months() == [date(2026, 1, 1), date(2026, 2, 1)]
+
+
+def test_append_replaces_the_covered_days(history):
+    history.append('prod', 'SEW', _series(['A', 'B'], date(2026, 3, 1), 5, 1))
+    history.append('prod', 'SEW', _series(['A'], date(2026, 3, 1), 5, 9), (date(2026, 3, 2), date(2026, 3, 3)))
+    out = history.query('prod', 'SEW', date(2026, 3, 1), date(2026, 3, 5))
+    assert out.row('A').tolist() == [1, 9, 9, 1, 1]
+    # Labels missing from a segment are zero on the days it covers.
+    assert out.row('B').tolist() == [1, 0, 0, 1, 1]
+
+
+def test_identical_append_writes_nothing(history):
+    series = _series(['A'], date(2026, 3, 1), 3, 2)
+    history.append('plan', 'ASSY', series)
+    part = os.path.join(history.root, '2026-03')
+    before = sorted(os.listdir(part))
+    history.append('plan', 'ASSY', series)
+    assert sorted(os.listdir(part)) == before
+
+
+def test_compaction_folds_segments_without_changing_the_month(history):
+    for day in range(1, 6):
+        history.append('prod', 'PROJECT', _series(['A'], date(2026, 4, day), 1, day))
+    part = os.path.join(history.root, '2026-04')
+    assert len(history._segments(part, 'prod_PROJECT')) <= history.max_segments
+    assert os.path.exists(os.path.join(part, 'prod_PROJECT.npz'))
+    expected = history.query('prod', 'PROJECT', date(2026, 4, 1), date(2026, 4, 6)).values.tolist()
+    assert expected == [[1, 2, 3, 4, 5, 0]]
+
+    history.compact()
+    assert history._segments(part, 'prod_PROJECT') == []
+    assert history.query('prod', 'PROJECT', date(2026, 4, 1), date(2026, 4, 6)).values.tolist() == expected
+
+
+def test_query_of_unrecorded_range_is_empty(history):
+    out = history.query('prod', 'SEW', date(2025, 1, 1), date(2025, 1, 10))
+    assert len(out) == 0 and out.n_days == 10
+
+
+def test_version_follows_the_series_files(history):
+    assert history.version(date(2026, 5, 1), date(2026, 5, 31)) == ''
+    history.append('prod', 'SEW', _series(['A'], date(2026, 5, 1), 2, 1))
+    first = history.version(date(2026, 5, 1), date(2026, 5, 31))
+    history.append('prod', 'SEW', _series(['A'], date(2026, 5, 3), 1, 1))
+    second = history.version(date(2026, 5, 1), date(2026, 5, 31))
+    assert first and second != first
+    history.write_snapshot(date(2026, 5, 3), {'date': '2026-05-03'})
+    assert history.version(date(2026, 5, 1), date(2026, 5, 31)) == second
+    assert history.version(date(2026, 6, 1), date(2026, 6, 30)) == ''
+
+
+def test_concurrent_writers_with_compaction_lose_nothing(tmp_path):
+    # Separate stores share only the partition file lock, as separate processes would.
+    stores = [ps.HistoryStore(str(tmp_path / 'History'), max_segments=1) for _ in range(4)]
+
+    def write(i):
+        for day in range(i + 1, 29, 4):
+            stores[i].append('prod', 'SEW', _series(['A'], date(2026, 2, day), 1, day))
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    out = stores[0].query('prod', 'SEW', date(2026, 2, 1), date(2026, 2, 28))
+    assert out.row('A').tolist() == list(range(1, 29))
+
+
+def test_coverage_counts_recorded_zeros_and_survives_compaction(history):
+    history.append('prod', 'ASSY', _series(['A'], date(2026, 7, 2), 2, 0))
+    history.append('prod', 'ASSY', _series(['A'], date(2026, 7, 10), 1, 4))
+    expected = [d in (2, 3, 10) for d in range(1, 12)]
+    assert history.coverage('prod', 'ASSY', date(2026, 7, 1), date(2026, 7, 11)).tolist() == expected
+    history.compact()
+    assert history.coverage('prod', 'ASSY', date(2026, 7, 1), date(2026, 7, 11)).tolist() == expected
+    assert not history.coverage('prod', 'ASSY', date(2026, 8, 1), date(2026, 8, 3)).any()
@@ -0,0 +1,26 @@
+import pvs_server as ps
+
+
+def test_earliest_key_in_list_wins_over_earliest_position():
+    matcher = ps.SubstringMatcher([('SEAT', 'seat'), ('CDPO', 'cdpo'), ('BJA', 'bja')])
+    assert matcher.first('BJA CDPO SEAT') == 'seat'
+    assert matcher.first('BJA CDPO') == 'cdpo'
+
+
+def test_overlapping_keys_are_all_seen():
+    matcher = ps.SubstringMatcher([('JLR - SEW', 'sew'), ('JLR', 'jlr')])
+    assert matcher.first('JLR - SEW') == 'sew'
+    assert matcher.first('JLR - ASSY') == 'jlr'
+
+
+def test_matches_the_linear_scan_it_replaced():
+    pairs = [('AB', 1), ('B', 2), ('ABC', 3), ('C', 4), ('AB', 5)]
+    matcher = ps.SubstringMatcher(pairs)
+    for text in ('ABC', 'BC', 'C', 'XABX', 'XYZ', ''):
+        expected = next((v for k, v in pairs if k in text), None)
+        assert matcher.first(text) == expected
+
+
+def test_empty_keys_never_match():
+    assert ps.SubstringMatcher([('', 1)]).first('anything') is None
+    assert ps.SubstringMatcher([]).first('anything') is None
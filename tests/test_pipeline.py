@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+import pvs_server as ps
+
+
+def _pipeline(calls, state):
+    def source(ctx):
+        calls.append('source')
+        return state['source']
+
+    def derived(ctx, value):
+        calls.append('derived')
+        return None if value is None else value * 2
+
+    return ps.Pipeline([
+        ps.PipelineStage('source', source, lambda ctx: {'v': state['input']},
+                         digest=lambda out: ps.content_hash(repr(out)), ok=lambda out: out is not None),
+        ps.PipelineStage('derived', derived, lambda ctx, value: {}, deps=('source',)),
+    ], max_workers=2)
+
+
+def test_unchanged_inputs_reuse_every_stage():
+    calls = []
+    pipe = _pipeline(calls, {'input': 1, 'source': 3})
+    assert pipe.run({})['derived'] == 6
+    assert pipe.run({})['derived'] == 6
+    assert calls == ['source', 'derived']
+    assert pipe.last_run['reused'] == ['source', 'derived']
+
+
+def test_changed_input_reruns_the_stage_and_its_dependents():
+    calls = []
+    state = {'input': 1, 'source': 3}
+    pipe = _pipeline(calls, state)
+    pipe.run({})
+    state.update(input=2, source=4)
+    assert pipe.run({})['derived'] == 8
+    assert calls == ['source', 'derived', 'source', 'derived']
+
+
+def test_same_output_keeps_dependents_memoized():
+    calls = []
+    state = {'input': 1, 'source': 3}
+    pipe = _pipeline(calls, state)
+    pipe.run({})
+    state['input'] = 2
+    pipe.run({})
+    assert calls == ['source', 'derived', 'source']
+
+
+def test_failed_stage_is_not_memoized():
+    calls = []
+    state = {'input': 1, 'source': None}
+    pipe = _pipeline(calls, state)
+    assert pipe.run({})['derived'] is None
+    state['source'] = 5
+    assert pipe.run({})['derived'] == 10
+    assert calls == ['source', 'derived', 'source', 'derived']
+
+
+def test_undeclared_dependency_is_rejected():
+    with pytest.raises(ValueError):
+        ps.Pipeline([ps.PipelineStage('late', lambda ctx, x: x, lambda ctx, x: {}, deps=('early',))])
+
+
+def test_failure_waits_for_running_siblings():
+    finished = threading.Event()
+
+    def slow(ctx):
+        time.sleep(0.2)
+        finished.set()
+        return 1
+
+    def boom(ctx):
+        raise RuntimeError('stage failed')
+
+    pipe = ps.Pipeline([
+        ps.PipelineStage('slow', slow, lambda ctx: None),
+        ps.PipelineStage('boom', boom, lambda ctx: None),
+    ], max_workers=2)
+    with pytest.raises(RuntimeError):
+        pipe.run({})
+    assert finished.is_set()
+
+
+def test_run_leaves_no_stage_threads():
+    _pipeline([], {'input': 1, 'source': 3}).run({})
+    assert not [t for t in threading.enumerate() if t.name.startswith('pvs-stage')]
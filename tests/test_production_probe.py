@@ -0,0 +1,34 @@
+from datetime import date
+
+import pvs_server as ps
+
+
+def test_sql_tr_types_are_read_as_written(tmp_path):
+    sql = tmp_path / 'prod.sql'
+    sql.write_text("SET @q = N'... WHERE tr.[tr_type] = ''rct-wo'' AND x IN (1)'\n", encoding='utf-8')
+    assert ps._read_production_sql_tr_types(str(sql)) == ['rct-wo']
+    assert ps._read_production_sql_tr_types(ps.PVS_PROD_SQL_PATH) == ['rct-wo']
+
+
+def test_type_filter_leaves_the_column_bare():
+    sql, params = ps._tr_type_filter(['rct-wo', 'RCT-PO'])
+    assert sql == 'tr.tr_type IN (?,?)'
+    assert params == ['rct-wo', 'RCT-PO']
+
+
+def test_recent_probe_is_reused(monkeypatch):
+    calls = []
+
+    def query(start_d, end_d, tr_types):
+        calls.append(start_d)
+        return [str(len(calls)), None, None]
+
+    monkeypatch.setattr(ps, '_query_production_probe', query)
+    monkeypatch.setattr(ps, 'PVS_PRODUCTION_PROBE', True)
+    monkeypatch.setattr(ps, '_PROBE_RESULTS', {})
+    start, end = date(2026, 10, 1), date(2026, 10, 31)
+    monkeypatch.setattr(ps, 'PVS_PROBE_MAX_AGE_S', 60)
+    assert ps._production_probe(start, end, ['rct-wo']) == ['1', None, None]
+    assert ps._production_probe(start, end, ['rct-wo']) == ['1', None, None]
+    monkeypatch.setattr(ps, 'PVS_PROBE_MAX_AGE_S', 0)
+    assert ps._production_probe(start, end, ['rct-wo']) == ['2', None, None]
@@ -0,0 +1,33 @@
+from datetime import date
+
+import numpy as np
+
+import pvs_server as ps
+
+
+def _pages(labels):
+    return {'SEW': ps.SeriesMatrix(labels, date(2026, 3, 1), np.ones((len(labels), 3)))}
+
+
+def test_report_is_rebuilt_only_when_its_inputs_change(monkeypatch, no_outputs):
+    built = []
+    build = ps._build_quality_report
+
+    def counted(*args):
+        built.append(args[0])
+        return build(*args)
+
+    monkeypatch.setattr(ps, '_build_quality_report', counted)
+    master = {'SEW': ['A', 'B']}
+    rows = [{'category': 'SEW', 'line': 'A', 'mtd': {'schedule': 5, 'production': 0}}]
+    first = ps._data_quality_stage(date(2026, 3, 3), master, _pages(['A']), _pages(['A', 'C']), rows)
+    assert ps._data_quality_stage(date(2026, 3, 3), master, _pages(['A']), _pages(['A', 'C']), rows) is first
+    assert len(built) == 1
+    assert first['pages']['SEW']['missing_planned'] == ['B']
+    assert first['pages']['SEW']['extra_production'] == ['C']
+    assert first['summary']['zero_anomalies'] == 1
+    assert ps._latest_quality_report() is first
+
+    rows = [{'category': 'SEW', 'line': 'A', 'mtd': {'schedule': 5, 'production': 5}}]
+    second = ps._data_quality_stage(date(2026, 3, 3), master, _pages(['A']), _pages(['A', 'C']), rows)
+    assert len(built) == 2 and second['summary']['zero_anomalies'] == 0
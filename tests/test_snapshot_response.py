@@ -0,0 +1,55 @@
+import gzip
+import json
+
+import pytest
+
+import pvs_server as ps
+
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    monkeypatch.setattr(ps, '_SNAPSHOT_ETAGS', {})
+    return {
+        'success': True,
+        'date': '2026-02-17',
+        'computed_at': '2026-02-18T06:00:00',
+        'rows': [{'line': f"LINE {i}", 'mtd': {'schedule': i}} for i in range(50)],
+        'age_seconds': 3,
+        'stale': False,
+    }
+
+
+def _respond(snapshot, **headers):
+    with ps.app.test_request_context('/api/pvs', headers=headers):
+        return ps._snapshot_response(snapshot)
+
+
+def test_etag_ignores_age_and_stale_flags(snapshot):
+    etag, weak = _respond(snapshot).get_etag()
+    assert weak
+    assert _respond({**snapshot, 'age_seconds': 90, 'stale': True}).get_etag()[0] == etag
+
+
+def test_matching_if_none_match_gets_304(snapshot):
+    etag = _respond(snapshot).get_etag()[0]
+    resp = _respond({**snapshot, 'age_seconds': 60}, **{'If-None-Match': f'W/"{etag}"'})
+    assert resp.status_code == 304
+    assert resp.get_data() == b''
+    assert resp.get_etag() == (etag, True)
+
+
+def test_new_computation_gets_a_new_etag(snapshot):
+    etag = _respond(snapshot).get_etag()[0]
+    changed = {**snapshot, 'computed_at': '2026-02-18T06:05:00', 'rows': snapshot['rows'][:-1]}
+    resp = _respond(changed, **{'If-None-Match': f'W/"{etag}"'})
+    assert resp.status_code == 200
+    assert resp.get_etag()[0] != etag
+
+
+def test_gzip_only_when_accepted(snapshot, monkeypatch):
+    monkeypatch.setattr(ps, 'PVS_GZIP_MIN_BYTES', 0)
+    plain = _respond(snapshot)
+    assert 'Content-Encoding' not in plain.headers
+    packed = _respond(snapshot, **{'Accept-Encoding': 'gzip'})
+    assert packed.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(packed.get_data())) == json.loads(plain.get_data())
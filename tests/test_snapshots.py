@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+import pvs_server as ps
+
+
+def _pages(start, end, seed):
+    """Random page series over ``start..end`` for every canonical label."""
+    rng = np.random.default_rng(seed)
+    master = ps._load_master_list(ps.PVS_MASTER_LIST_CSV)
+    n_days = (end - start).days + 1
+    out = {}
+    for kind in ps.PAGE_KINDS:
+        labels = master.get(kind) or [f"{kind} LINE {i}" for i in range(3)]
+        out[kind] = ps.SeriesMatrix(labels, start, rng.integers(0, 400, (len(labels), n_days)).astype(np.float64))
+    return out
+
+
+@pytest.mark.parametrize('as_of', [date(2026, 2, 2), date(2026, 2, 17), date(2026, 2, 28)])
+def test_batch_matches_single_date(as_of, history, no_outputs):
+    start_d, end_d = ps.snapshot_span([as_of])
+    planned = _pages(start_d, end_d, 1)
+    produced = _pages(start_d, end_d, 2)
+    month_start, month_end = ps._month_bounds(as_of)
+    before = month_start - timedelta(days=1)
+    for kind in ps.PAGE_KINDS:
+        if start_d <= before:
+            history.append('plan', kind, planned[kind].reindex(start_d, before))
+            history.append('prod', kind, produced[kind].reindex(start_d, before))
+
+    single = ps._compute_metrics_from_pages(
+        as_of,
+        *ps._as_of_window_starts(as_of),
+        planned_pages={kind: s.reindex(month_start, month_end) for kind, s in planned.items()},
+        produced_pages={kind: s.reindex(month_start, month_end) for kind, s in produced.items()},
+    )
+    batch = ps.compute_snapshots([as_of], planned, produced, month_start)[as_of.isoformat()]
+
+    for key in ('rows', 'totals', 'group_totals', 'olk_totals'):
+        assert batch[key] == single[key], key
+
+
+def test_several_dates_match_one_at_a_time(no_outputs):
+    dates = [date(2026, 1, 30), date(2026, 2, 3), date(2026, 2, 20)]
+    start_d, end_d = ps.snapshot_span(dates)
+    planned = _pages(start_d, end_d, 3)
+    produced = _pages(start_d, end_d, 4)
+    together = ps.compute_snapshots(dates, planned, produced)
+    for d in dates:
+        assert together[d.isoformat()] == ps.compute_snapshots([d], planned, produced)[d.isoformat()]
+
+
+def test_batch_request_span_is_limited():
+    with ps.app.test_request_context('/api/pvs/batch?dates=2025-01-15,2025-01-20'):
+        assert ps._dates_from_request() == [date(2025, 1, 15), date(2025, 1, 20)]
+    with ps.app.test_request_context('/api/pvs/batch?dates=2024-01-15,2025-06-20'):
+        with pytest.raises(ValueError):
+            ps._dates_from_request()